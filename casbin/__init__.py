@@ -1,6 +1,9 @@
 from .enforcer import *
 from .synced_enforcer import SyncedEnforcer
+from .cached_enforcer import CachedEnforcer
 from .distributed_enforcer import DistributedEnforcer
+from .async_enforcer import AsyncEnforcer
+from .process_enforcer import ProcessPoolEnforcer
 from . import util
 from .persist import *
 from .effect import *
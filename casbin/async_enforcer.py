@@ -0,0 +1,605 @@
+import asyncio
+import inspect
+
+from casbin.enforcer import Enforcer
+from casbin.persist.adapters import AsyncFileAdapter
+
+
+class _PendingEnforcer(Enforcer):
+    """an enforcer that changes its policy right away but leaves the calls to the adapter and the watcher
+    to AsyncEnforcer, which awaits them."""
+
+    def __init__(self, model=None):
+        self.pending = []
+        super().__init__(model)
+
+    def _save_policy_change(self, save, *args):
+        self.pending.append((save, args))
+        return True
+
+    def copy(self, with_policy=True):
+        e = super().copy(with_policy)
+        e.pending = []
+        return e
+
+
+async def _await_result(result):
+    """awaits the result of a method of an adapter or a watcher, which may be async or not."""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+class AsyncEnforcer():
+
+    """AsyncEnforcer wraps Enforcer for asyncio applications.
+    The policy is loaded, saved and changed with coroutines that await the adapter and the watcher,
+    which can be AsyncAdapter and AsyncWatcher, while enforce decides from memory and stays synchronous.
+    The policy isn't loaded on creation, load_policy has to be awaited first.
+    """
+
+    def __init__(self, model=None, adapter=None):
+        if isinstance(adapter, str):
+            adapter = AsyncFileAdapter(adapter)
+
+        self._e = _PendingEnforcer(model)
+        self._e.adapter = adapter
+        self._save_lock = None
+        # the number of changes made to the policy, so that load_policy can tell whether it changed while loading
+        self._writes = 0
+
+    def _get_save_lock(self):
+        # created here, so that it belongs to the running event loop
+        if self._save_lock is None:
+            self._save_lock = asyncio.Lock()
+        return self._save_lock
+
+    async def _save(self, result):
+        """awaits the adapter and the watcher calls of the changes just made to the policy, in order.
+        Returns false if the adapter failed to save a change."""
+        self._writes += 1
+        pending, self._e.pending = self._e.pending, []
+        if not pending:
+            return result
+
+        async with self._get_save_lock():
+            for save, args in pending:
+                if await _await_result(save(*args)) is False:
+                    result = False
+                    continue
+
+                if self._e.watcher:
+                    await _await_result(self._e.watcher.update())
+
+        return result
+
+    def get_adapter(self):
+        """gets the current adapter."""
+        return self._e.get_adapter()
+
+    def set_adapter(self, adapter):
+        """sets the current adapter."""
+        self._e.set_adapter(adapter)
+
+    def set_watcher(self, watcher):
+        """sets the current watcher."""
+        self._e.set_watcher(watcher)
+
+    async def load_policy(self):
+        """reloads the policy from file/database.
+        The policy is loaded into a copy of the enforcer that replaces it once loaded, so enforce can be called meanwhile.
+        The policy is loaded again if it was changed while loading, once the adapter has saved the change.
+        """
+        async def load(e):
+            # read first, so that a change made while loading is seen by the next is_policy_changed
+            policy_version = await self._get_policy_version()
+            await _await_result(e.adapter.load_policy(e.model))
+            e._policy_version = policy_version
+
+        await self._load(load)
+
+    async def load_filtered_policy(self, filter):
+        """reloads a filtered policy from file/database."""
+        if not hasattr(self._e.adapter, "is_filtered"):
+            raise ValueError("filtered policies are not supported by this adapter")
+
+        async def load(e):
+            await _await_result(e.adapter.load_filtered_policy(e.model, filter))
+
+        await self._load(load)
+
+    async def _load(self, load):
+        """loads the policy into a copy of the enforcer with load, until no change was made to the policy meanwhile."""
+        while True:
+            writes = self._writes
+            e = self._e.copy(with_policy=False)
+            await load(e)
+            if self._writes == writes:
+                break
+
+            # the changes would be lost with the enforcer they were made to, wait until they are saved
+            async with self._get_save_lock():
+                pass
+
+        e.model.sort_policies_by_priority()
+        e.model.print_policy()
+        if e.auto_build_role_links:
+            e.build_role_links()
+
+        self._e = e
+
+    async def is_policy_changed(self):
+        """returns false if the adapter reports that the policy in the storage is the one loaded by load_policy."""
+        policy_version = await self._get_policy_version()
+        return policy_version is None or policy_version != self._e._policy_version
+
+    async def _get_policy_version(self):
+        if not hasattr(self._e.adapter, "get_policy_version"):
+            return None
+
+        return await _await_result(self._e.adapter.get_policy_version())
+
+    async def save_policy(self):
+        if self._e.is_filtered():
+            raise RuntimeError("cannot save a filtered policy")
+
+        await _await_result(self._e.adapter.save_policy(self._e.model))
+
+        if self._e.watcher:
+            await _await_result(self._e.watcher.update())
+
+    def get_model(self):
+        """gets the current model."""
+        return self._e.get_model()
+
+    def set_model(self, m):
+        """sets the current model."""
+        return self._e.set_model(m)
+
+    def load_model(self):
+        """reloads the model from the model CONF file.
+        Because the policy is attached to a model, so the policy is invalidated and needs to be reloaded by calling LoadPolicy().
+        """
+        return self._e.load_model()
+
+    def get_role_manager(self):
+        """gets the current role manager."""
+        return self._e.get_role_manager()
+
+    def set_role_manager(self, rm):
+        self._e.set_role_manager(rm)
+
+    def set_effector(self, eft):
+        """sets the current effector."""
+        self._e.set_effector(eft)
+
+    def clear_policy(self):
+        """ clears all policy."""
+        self._writes += 1
+        return self._e.clear_policy()
+
+    def save_snapshot(self, path):
+        """saves the loaded policy and the role links to a file that can be loaded by load_snapshot."""
+        return self._e.save_snapshot(path)
+
+    def load_snapshot(self, path):
+        """reloads the policy saved by save_snapshot instead of loading it from the adapter."""
+        return self._e.load_snapshot(path)
+
+    def build_role_links(self):
+        """manually rebuild the role inheritance relations."""
+        return self._e.build_role_links()
+
+    def enforce(self, *rvals):
+        """decides whether a "subject" can access a "object" with the operation "action",
+        input parameters are usually: (sub, obj, act).
+        """
+        return self._e.enforce(*rvals)
+
+    def enforce_ex(self, *rvals):
+        """decides whether a "subject" can access a "object" with the operation "action",
+        input parameters are usually: (sub, obj, act).
+        return judge result with reason
+        """
+        return self._e.enforce_ex(*rvals)
+
+    def enforce_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the results in the order of the requests
+        """
+        return self._e.enforce_batch(requests)
+
+    def enforce_ex_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the judge results with reasons in the order of the requests
+        """
+        return self._e.enforce_ex_batch(requests)
+
+    def get_all_subjects(self):
+        """gets the list of subjects that show up in the current policy."""
+        return self._e.get_all_subjects()
+
+    def get_all_named_subjects(self, ptype):
+        """gets the list of subjects that show up in the current named policy."""
+        return self._e.get_all_named_subjects(ptype)
+
+    def get_all_objects(self):
+        """gets the list of objects that show up in the current policy."""
+        return self._e.get_all_objects()
+
+    def get_all_named_objects(self, ptype):
+        """gets the list of objects that show up in the current named policy."""
+        return self._e.get_all_named_objects(ptype)
+
+    def get_all_actions(self):
+        """gets the list of actions that show up in the current policy."""
+        return self._e.get_all_actions()
+
+    def get_all_named_actions(self, ptype):
+        """gets the list of actions that show up in the current named policy."""
+        return self._e.get_all_named_actions(ptype)
+
+    def get_all_roles(self):
+        """gets the list of roles that show up in the current named policy."""
+        return self._e.get_all_roles()
+
+    def get_all_named_roles(self, ptype):
+        """gets all the authorization rules in the policy."""
+        return self._e.get_all_named_roles(ptype)
+
+    def get_policy(self):
+        """gets all the authorization rules in the policy."""
+        return self._e.get_policy()
+
+    def get_filtered_policy(self, field_index, *field_values):
+        """gets all the authorization rules in the policy, field filters can be specified."""
+        return self._e.get_filtered_policy(field_index, *field_values)
+
+    def get_named_policy(self, ptype):
+        """gets all the authorization rules in the named policy."""
+        return self._e.get_named_policy(ptype)
+
+    def get_filtered_named_policy(self, ptype, field_index, *field_values):
+        """gets all the authorization rules in the named policy, field filters can be specified."""
+        return self._e.get_filtered_named_policy(ptype, field_index, *field_values)
+
+    def get_grouping_policy(self):
+        """gets all the role inheritance rules in the policy."""
+        return self._e.get_grouping_policy()
+
+    def get_filtered_grouping_policy(self, field_index, *field_values):
+        """gets all the role inheritance rules in the policy, field filters can be specified."""
+        return self._e.get_filtered_grouping_policy(field_index, *field_values)
+
+    def get_named_grouping_policy(self, ptype):
+        """gets all the role inheritance rules in the policy."""
+        return self._e.get_named_grouping_policy(ptype)
+
+    def get_filtered_named_grouping_policy(self, ptype, field_index, *field_values):
+        """gets all the role inheritance rules in the policy, field filters can be specified."""
+        return self._e.get_filtered_named_grouping_policy(ptype, field_index, *field_values)
+
+    def has_policy(self, *params):
+        """determines whether an authorization rule exists."""
+        return self._e.has_policy(*params)
+
+    def has_named_policy(self, ptype, *params):
+        """determines whether a named authorization rule exists."""
+        return self._e.has_named_policy(ptype, *params)
+
+    async def add_policy(self, *params):
+        """adds an authorization rule to the current policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return await self._save(self._e.add_policy(*params))
+
+    async def add_named_policy(self, ptype, *params):
+        """adds an authorization rule to the current named policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return await self._save(self._e.add_named_policy(ptype, *params))
+
+    async def update_policy(self, old_rule, new_rule):
+        """updates an authorization rule from the current policy."""
+        return await self._save(self._e.update_policy(old_rule, new_rule))
+
+    async def update_policies(self, old_rules, new_rules):
+        """updates authorization rules from the current policy."""
+        return await self._save(self._e.update_policies(old_rules, new_rules))
+
+    async def update_named_policy(self, ptype, old_rule, new_rule):
+        """updates an authorization rule from the current named policy."""
+        return await self._save(self._e.update_named_policy(ptype, old_rule, new_rule))
+
+    async def update_named_policies(self, ptype, old_rules, new_rules):
+        """updates authorization rules from the current named policy."""
+        return await self._save(self._e.update_named_policies(ptype, old_rules, new_rules))
+
+    async def remove_policy(self, *params):
+        """removes an authorization rule from the current policy."""
+        return await self._save(self._e.remove_policy(*params))
+
+    async def remove_filtered_policy(self, field_index, *field_values):
+        """removes an authorization rule from the current policy, field filters can be specified."""
+        return await self._save(self._e.remove_filtered_policy(field_index, *field_values))
+
+    async def remove_named_policy(self, ptype, *params):
+        """removes an authorization rule from the current named policy."""
+        return await self._save(self._e.remove_named_policy(ptype, *params))
+
+    async def remove_filtered_named_policy(self, ptype, field_index, *field_values):
+        """removes an authorization rule from the current named policy, field filters can be specified."""
+        return await self._save(self._e.remove_filtered_named_policy(ptype, field_index, *field_values))
+
+    def has_grouping_policy(self, *params):
+        """determines whether a role inheritance rule exists."""
+        return self._e.has_grouping_policy(*params)
+
+    def has_named_grouping_policy(self, ptype, *params):
+        """determines whether a named role inheritance rule exists."""
+        return self._e.has_named_grouping_policy(ptype, *params)
+
+    async def add_grouping_policy(self, *params):
+        """adds a role inheritance rule to the current policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return await self._save(self._e.add_grouping_policy(*params))
+
+    async def add_named_grouping_policy(self, ptype, *params):
+        """adds a named role inheritance rule to the current policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return await self._save(self._e.add_named_grouping_policy(ptype, *params))
+
+    async def remove_grouping_policy(self, *params):
+        """removes a role inheritance rule from the current policy."""
+        return await self._save(self._e.remove_grouping_policy(*params))
+
+    async def remove_filtered_grouping_policy(self, field_index, *field_values):
+        """removes a role inheritance rule from the current policy, field filters can be specified."""
+        return await self._save(self._e.remove_filtered_grouping_policy(field_index, *field_values))
+
+    async def remove_named_grouping_policy(self, ptype, *params):
+        """removes a role inheritance rule from the current named policy."""
+        return await self._save(self._e.remove_named_grouping_policy(ptype, *params))
+
+    async def remove_filtered_named_grouping_policy(self, ptype, field_index, *field_values):
+        """removes a role inheritance rule from the current named policy, field filters can be specified."""
+        return await self._save(self._e.remove_filtered_named_grouping_policy(ptype, field_index, *field_values))
+
+    def add_function(self, name, func):
+        """adds a customized function."""
+        return self._e.add_function(name, func)
+
+    # enforcer.py
+
+    def get_roles_for_user(self, name):
+        """ gets the roles that a user has. """
+        return self._e.get_roles_for_user(name)
+
+    def get_users_for_role(self, name):
+        """ gets the users that has a role. """
+        return self._e.get_users_for_role(name)
+
+    def has_role_for_user(self, name, role):
+        """ determines whether a user has a role. """
+        return self._e.has_role_for_user(name, role)
+
+    async def add_role_for_user(self, user, role):
+        """
+        adds a role for a user.
+        Returns false if the user already has the role (aka not affected).
+        """
+        return await self._save(self._e.add_role_for_user(user, role))
+
+    async def delete_role_for_user(self, user, role):
+        """
+        deletes a role for a user.
+        Returns false if the user does not have the role (aka not affected).
+        """
+        return await self._save(self._e.delete_role_for_user(user, role))
+
+    async def delete_roles_for_user(self, user):
+        """
+        deletes all roles for a user.
+        Returns false if the user does not have any roles (aka not affected).
+        """
+        return await self._save(self._e.delete_roles_for_user(user))
+
+    async def delete_user(self, user):
+        """
+        deletes a user.
+        Returns false if the user does not exist (aka not affected).
+        """
+        return await self._save(self._e.delete_user(user))
+
+    async def delete_role(self, role):
+        """
+        deletes a role.
+        Returns false if the role does not exist (aka not affected).
+        """
+        return await self._save(self._e.delete_role(role))
+
+    async def delete_permission(self, *permission):
+        """
+        deletes a permission.
+        Returns false if the permission does not exist (aka not affected).
+        """
+        return await self._save(self._e.delete_permission(*permission))
+
+    async def add_permission_for_user(self, user, *permission):
+        """
+        adds a permission for a user or role.
+        Returns false if the user or role already has the permission (aka not affected).
+        """
+        return await self._save(self._e.add_permission_for_user(user, *permission))
+
+    async def delete_permission_for_user(self, user, *permission):
+        """
+        deletes a permission for a user or role.
+        Returns false if the user or role does not have the permission (aka not affected).
+        """
+        return await self._save(self._e.delete_permission_for_user(user, *permission))
+
+    async def delete_permissions_for_user(self, user):
+        """
+        deletes permissions for a user or role.
+        Returns false if the user or role does not have any permissions (aka not affected).
+        """
+        return await self._save(self._e.delete_permissions_for_user(user))
+
+    def get_permissions_for_user(self, user):
+        """
+        gets permissions for a user or role.
+        """
+        return self._e.get_permissions_for_user(user)
+
+    def has_permission_for_user(self, user, *permission):
+        """
+        determines whether a user has a permission.
+        """
+        return self._e.has_permission_for_user(user, *permission)
+
+    def get_implicit_roles_for_user(self, name, *domain):
+        """
+        gets implicit roles that a user has.
+        Compared to get_roles_for_user(), this function retrieves indirect roles besides direct roles.
+        For example:
+        g, alice, role:admin
+        g, role:admin, role:user
+
+        get_roles_for_user("alice") can only get: ["role:admin"].
+        But get_implicit_roles_for_user("alice") will get: ["role:admin", "role:user"].
+        """
+        return self._e.get_implicit_roles_for_user(name, *domain)
+
+    def get_implicit_permissions_for_user(self, user, *domain):
+        """
+        gets implicit permissions for a user or role.
+        Compared to get_permissions_for_user(), this function retrieves permissions for inherited roles.
+        For example:
+        p, admin, data1, read
+        p, alice, data2, read
+        g, alice, admin
+
+        get_permissions_for_user("alice") can only get: [["alice", "data2", "read"]].
+        But get_implicit_permissions_for_user("alice") will get: [["admin", "data1", "read"], ["alice", "data2", "read"]].
+        """
+        return self._e.get_implicit_permissions_for_user(user, *domain)
+
+    def get_implicit_users_for_permission(self, *permission):
+        """
+        gets implicit users for a permission.
+        For example:
+        p, admin, data1, read
+        p, bob, data1, read
+        g, alice, admin
+
+        get_implicit_users_for_permission("data1", "read") will get: ["alice", "bob"].
+        Note: only users will be returned, roles (2nd arg in "g") will be excluded.
+        """
+        return self._e.get_implicit_users_for_permission(*permission)
+
+    def get_roles_for_user_in_domain(self, name, domain):
+        """gets the roles that a user has inside a domain."""
+        return self._e.get_roles_for_user_in_domain(name, domain)
+
+    def get_users_for_role_in_domain(self, name, domain):
+        """gets the users that has a role inside a domain."""
+        return self._e.get_users_for_role_in_domain(name, domain)
+
+    async def add_role_for_user_in_domain(self, user, role, domain):
+        """adds a role for a user inside a domain."""
+        """Returns false if the user already has the role (aka not affected)."""
+        return await self._save(self._e.add_role_for_user_in_domain(user, role, domain))
+
+    async def delete_roles_for_user_in_domain(self, user, role, domain):
+        """deletes a role for a user inside a domain."""
+        """Returns false if the user does not have any roles (aka not affected)."""
+        return await self._save(self._e.delete_roles_for_user_in_domain(user, role, domain))
+
+    def get_permissions_for_user_in_domain(self, user, domain):
+        """gets permissions for a user or role inside domain."""
+        return self._e.get_permissions_for_user_in_domain(user, domain)
+
+    def enable_auto_build_role_links(self, auto_build_role_links):
+        """controls whether to rebuild the role inheritance relations when a role is added or deleted."""
+        return self._e.enable_auto_build_role_links(auto_build_role_links)
+
+    def enable_auto_save(self, auto_save):
+        """controls whether to save a policy rule automatically to the adapter when it is added or removed."""
+        return self._e.enable_auto_save(auto_save)
+
+    def enable_enforce(self, enabled=True):
+        """changes the enforcing state of Casbin,
+        when Casbin is disabled, all access will be allowed by the Enforce() function.
+        """
+        return self._e.enable_enforce(enabled)
+
+    def enable_policy_index(self, index_policy=True):
+        """controls whether enforce only evaluates the policy rules that can match the request."""
+        return self._e.enable_policy_index(index_policy)
+
+    def add_named_matching_func(self, ptype, fn):
+        """add_named_matching_func add MatchingFunc by ptype RoleManager"""
+        self._e.add_named_matching_func(ptype, fn)
+
+    def add_named_domain_matching_func(self, ptype, fn):
+        """add_named_domain_matching_func add MatchingFunc by ptype to RoleManager"""
+        self._e.add_named_domain_matching_func(ptype, fn)
+
+    def is_filtered(self):
+        """returns true if the loaded policy has been filtered."""
+        return self._e.is_filtered()
+
+    async def add_policies(self,rules):
+        """adds authorization rules to the current policy.
+
+        If the rule already exists, the function returns false for the corresponding rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding rule by adding the new rule.
+        """
+        return await self._save(self._e.add_policies(rules))
+
+    async def add_named_policies(self,ptype,rules):
+        """adds authorization rules to the current named policy.
+
+        If the rule already exists, the function returns false for the corresponding rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding by adding the new rule."""
+        return await self._save(self._e.add_named_policies(ptype,rules))
+
+    async def remove_policies(self,rules):
+        """removes authorization rules from the current policy."""
+        return await self._save(self._e.remove_policies(rules))
+
+    async def remove_named_policies(self,ptype,rules):
+        """removes authorization rules from the current named policy."""
+        return await self._save(self._e.remove_named_policies(ptype,rules))
+
+    async def add_grouping_policies(self,rules):
+        """adds role inheritance rules to the current policy.
+
+        If the rule already exists, the function returns false for the corresponding policy rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding policy rule by adding the new rule.
+        """
+        return await self._save(self._e.add_grouping_policies(rules))
+
+    async def add_named_grouping_policies(self,ptype,rules):
+        """adds named role inheritance rules to the current policy.
+
+        If the rule already exists, the function returns false for the corresponding policy rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding policy rule by adding the new rule."""
+        return await self._save(self._e.add_named_grouping_policies(ptype,rules))
+
+    async def remove_grouping_policies(self,rules):
+        """removes role inheritance rules from the current policy."""
+        return await self._save(self._e.remove_grouping_policies(rules))
+
+    async def remove_named_grouping_policies(self,ptype,rules):
+        """ removes role inheritance rules from the current named policy."""
+        return await self._save(self._e.remove_named_grouping_policies(ptype,rules))
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import OrderedDict
+
+from casbin.enforcer import Enforcer
+
+
+class CachedEnforcer(Enforcer):
+    """CachedEnforcer wraps Enforcer and remembers the results of enforce.
+
+    The results are kept in a LRU cache of cache_size entries which expire after
+    expire_time seconds, if given. The cache is invalidated whenever the policy,
+    the role links, the model or the functions of the enforcer change.
+    """
+
+    def __init__(self, model=None, adapter=None, cache_size=10000, expire_time=None):
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_size = cache_size
+        self._cache_version = 0
+        self._expire_time = expire_time
+        self.cache_enabled = True
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        Enforcer.__init__(self, model, adapter)
+
+    def copy(self, with_policy=True):
+        """returns an enforcer with copies of the model and role managers of this one and an empty cache."""
+        e = Enforcer.copy(self, with_policy)
+        e._cache = OrderedDict()
+        e._cache_lock = threading.Lock()
+        e._cache_version = 0
+        e.cache_hits = 0
+        e.cache_misses = 0
+
+        return e
+
+    def enable_cache(self, enable_cache=True):
+        """controls whether enforce uses the cache."""
+        self.cache_enabled = enable_cache
+
+    def set_cache_size(self, cache_size):
+        """sets the maximum number of results kept in the cache."""
+        with self._cache_lock:
+            self._cache_size = cache_size
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def set_expire_time(self, expire_time):
+        """sets the number of seconds a result is kept in the cache, None keeps it until evicted."""
+        self._expire_time = expire_time
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """removes all results from the cache."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_version += 1
+
+    def enforce(self, *rvals):
+        """decides whether a "subject" can access a "object" with the operation "action",
+        input parameters are usually: (sub, obj, act).
+        """
+        if not self.cache_enabled:
+            return Enforcer.enforce(self, *rvals)
+
+        try:
+            hash(rvals)
+        except TypeError:
+            # e.g. ABAC requests with dict attributes can't be cached
+            return Enforcer.enforce(self, *rvals)
+
+        with self._cache_lock:
+            entry = self._cache.get(rvals)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._cache.move_to_end(rvals)
+                self.cache_hits += 1
+                return entry[0]
+            self.cache_misses += 1
+            version = self._cache_version
+
+        result = Enforcer.enforce(self, *rvals)
+
+        expire_at = None
+        if self._expire_time is not None:
+            expire_at = time.monotonic() + self._expire_time
+
+        with self._cache_lock:
+            if version != self._cache_version:
+                # the policy changed while enforcing, the result may already be stale
+                return result
+            self._cache[rvals] = (result, expire_at)
+            self._cache.move_to_end(rvals)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def _invalidate_matcher(self):
+        # called whenever the model, the functions or the role links change
+        Enforcer._invalidate_matcher(self)
+        self.invalidate_cache()
+
+    def load_policy(self):
+        """reloads the policy from file/database."""
+        try:
+            Enforcer.load_policy(self)
+        finally:
+            self.invalidate_cache()
+
+    def load_snapshot(self, path):
+        """reloads the policy saved by save_snapshot instead of loading it from the adapter."""
+        try:
+            Enforcer.load_snapshot(self, path)
+        finally:
+            self.invalidate_cache()
+
+    def load_filtered_policy(self, filter):
+        """reloads a filtered policy from file/database."""
+        try:
+            Enforcer.load_filtered_policy(self, filter)
+        finally:
+            self.invalidate_cache()
+
+    def load_increment_filtered_policy(self, filter):
+        """LoadIncrementalFilteredPolicy append a filtered policy from file/database."""
+        try:
+            Enforcer.load_increment_filtered_policy(self, filter)
+        finally:
+            self.invalidate_cache()
+
+    def clear_policy(self):
+        """ clears all policy."""
+        try:
+            Enforcer.clear_policy(self)
+        finally:
+            self.invalidate_cache()
+
+    def set_effector(self, eft):
+        """sets the current effector."""
+        Enforcer.set_effector(self, eft)
+        self.invalidate_cache()
+
+    def enable_enforce(self, enabled=True):
+        """changes the enforcing state of Casbin,
+        when Casbin is disabled, all access will be allowed by the Enforce() function.
+        """
+        Enforcer.enable_enforce(self, enabled)
+        self.invalidate_cache()
+
+    def build_incremental_role_links(self, op, ptype, rules):
+        """adds or removes the role inheritance relations of grouping rules."""
+        try:
+            return Enforcer.build_incremental_role_links(self, op, ptype, rules)
+        finally:
+            self.invalidate_cache()
+
+    def add_named_matching_func(self, ptype, fn):
+        """add_named_matching_func add MatchingFunc by ptype RoleManager"""
+        try:
+            return Enforcer.add_named_matching_func(self, ptype, fn)
+        finally:
+            self.invalidate_cache()
+
+    def add_named_domain_matching_func(self, ptype, fn):
+        """add_named_domain_matching_func add MatchingFunc by ptype to RoleManager"""
+        try:
+            return Enforcer.add_named_domain_matching_func(self, ptype, fn)
+        finally:
+            self.invalidate_cache()
+
+    def _add_policy(self, sec, ptype, rule):
+        try:
+            return Enforcer._add_policy(self, sec, ptype, rule)
+        finally:
+            self.invalidate_cache()
+
+    def _add_policies(self, sec, ptype, rules):
+        try:
+            return Enforcer._add_policies(self, sec, ptype, rules)
+        finally:
+            self.invalidate_cache()
+
+    def _update_policy(self, sec, ptype, old_rule, new_rule):
+        try:
+            return Enforcer._update_policy(self, sec, ptype, old_rule, new_rule)
+        finally:
+            self.invalidate_cache()
+
+    def _update_policies(self, sec, ptype, old_rules, new_rules):
+        try:
+            return Enforcer._update_policies(self, sec, ptype, old_rules, new_rules)
+        finally:
+            self.invalidate_cache()
+
+    def _remove_policy(self, sec, ptype, rule):
+        try:
+            return Enforcer._remove_policy(self, sec, ptype, rule)
+        finally:
+            self.invalidate_cache()
+
+    def _remove_policies(self, sec, ptype, rules):
+        try:
+            return Enforcer._remove_policies(self, sec, ptype, rules)
+        finally:
+            self.invalidate_cache()
+
+    def _remove_filtered_policy(self, sec, ptype, field_index, *field_values):
+        try:
+            return Enforcer._remove_filtered_policy(self, sec, ptype, field_index, *field_values)
+        finally:
+            self.invalidate_cache()
@@ -1,11 +1,85 @@
+import copy
+import functools
+import ipaddress
 import logging
 
-from casbin.effect import Effector, get_effector, effect_to_bool
+from casbin.effect import Effector, EffectorStream, get_effector, effect_to_bool
 from casbin.model import Model, FunctionMap
-from casbin.persist import Adapter
+from casbin.model.policy_op import PolicyOp
+from casbin.persist import Adapter, read_snapshot, write_snapshot
 from casbin.persist.adapters import FileAdapter
 from casbin.rbac import default_role_manager
-from casbin.util import generate_g_function, SimpleEval, util
+from casbin.util import generate_g_function, get_call_conditions, get_equality_conditions, parse_expression, \
+    CompiledExpression, RolesCache, ip_match_func, util
+from casbin.util.log import DecisionLogger
+
+
+class Matcher:
+    """Matcher is the matcher expression of a model prepared for the functions of an enforcer."""
+
+    def __init__(self, value, functions, expression, index_fields, ip_index_fields=None, roles_cache=None):
+        self.value = value
+        self.functions = functions
+        # the roles looked up by the g functions, cleared before each request
+        self.roles_cache = roles_cache if roles_cache is not None else RolesCache()
+        # None when the matcher contains eval() and has to be rebuilt for each policy rule
+        self.expression = expression
+        # takes the request values followed by the policy values as arguments
+        self.func = expression.func if expression is not None else None
+        # the (request, policy) field positions that have to be equal for a match
+        self.index_fields = index_fields
+        # the (request, policy) field positions passed to the builtin ipMatch
+        self.ip_index_fields = ip_index_fields if ip_index_fields is not None else []
+        self.rule_names = util.get_eval_value(value) if expression is None else []
+        # the rules of the eval() calls -> the expression compiled with them, shared by the bound copies
+        self.eval_expressions = {}
+        # the rules of the eval() calls -> the compiled function using the functions of this matcher
+        self.eval_funcs = {}
+
+    def has_eval(self):
+        return self.expression is None
+
+    def bind(self, functions, roles_cache=None):
+        """returns a copy of the matcher using other functions, roles_cache is the RolesCache of their g functions
+        when it isn't the one of this matcher.
+        """
+        matcher = copy.copy(self)
+        matcher.functions = functions
+        if roles_cache is not None:
+            matcher.roles_cache = roles_cache
+        if self.expression is not None:
+            matcher.func = self.expression.bind(functions)
+        matcher.eval_funcs = {}
+        return matcher
+
+    def get_eval_func(self, rules, names):
+        """returns the function of the matcher with its eval() calls replaced by the rules,
+        it takes the values of names as arguments and is compiled once for the same rules.
+        """
+        func = self.eval_funcs.get(rules)
+        if func is not None:
+            return func
+
+        expression = self.eval_expressions.get(rules)
+        if expression is None:
+            exp_with_rule = util.replace_eval(self.value, [util.escape_assertion(rule) for rule in rules])
+            expression = CompiledExpression(CoreEnforcer._rewrite_expression(exp_with_rule), self.functions, names)
+            self.eval_expressions[rules] = expression
+            func = expression.func
+        else:
+            func = expression.bind(self.functions)
+
+        self.eval_funcs[rules] = func
+        return func
+
+    def prune_eval_funcs(self, max_size):
+        """drops the compiled rules once there are more of them than max_size, the number of policy rules.
+        It only happens after rules were removed or changed, the ones still used are compiled again.
+        """
+        if len(self.eval_expressions) > max_size:
+            self.eval_expressions.clear()
+        if len(self.eval_funcs) > max_size:
+            self.eval_funcs.clear()
 
 
 class CoreEnforcer:
@@ -23,9 +97,14 @@ class CoreEnforcer:
     enabled = False
     auto_save = False
     auto_build_role_links = False
+    index_policy = False
+
+    _matcher = None
+    _policy_version = None
 
     def __init__(self, model=None, adapter=None):
         self.logger = logging.getLogger(__name__)
+        self.decision_logger = DecisionLogger(self.logger)
         if isinstance(model, str):
             if isinstance(adapter, str):
                 self.init_with_file(model, adapter)
@@ -77,6 +156,7 @@ class CoreEnforcer:
         self.enabled = True
         self.auto_save = True
         self.auto_build_role_links = True
+        self.index_policy = True
 
         self.init_rm_map()
 
@@ -101,6 +181,7 @@ class CoreEnforcer:
         self.model.load_model(self.model_path)
         self.model.print_model()
         self.fm = FunctionMap.load_function_map()
+        self._invalidate_matcher()
 
     def get_model(self):
         """gets the current model."""
@@ -112,6 +193,44 @@ class CoreEnforcer:
 
         self.model = m
         self.fm = FunctionMap.load_function_map()
+        self._invalidate_matcher()
+
+    def copy(self, with_policy=True):
+        """returns an enforcer sharing the adapter, watcher, effector and functions of this one,
+        with copies of the model and role managers that can be changed without affecting it.
+        If with_policy is false, the copy has no policy and new role managers, ready for load_policy.
+        """
+        e = copy.copy(self)
+        e.model = self.model.copy(with_policy)
+        if not with_policy:
+            e.rm_map = dict()
+            e.init_rm_map()
+            e._policy_version = None
+            return e
+
+        rm_copies = {}
+
+        def copy_rm(rm):
+            # a role manager used by several ptypes is copied once
+            if id(rm) not in rm_copies:
+                rm_copies[id(rm)] = rm.copy() if hasattr(rm, "copy") else copy.deepcopy(rm)
+            return rm_copies[id(rm)]
+
+        e.rm_map = {ptype: copy_rm(rm) for ptype, rm in self.rm_map.items()}
+        if "g" in e.model.model.keys():
+            for ast in e.model.model["g"].values():
+                if ast.rm is not None:
+                    ast.rm = copy_rm(ast.rm)
+
+        if self._matcher is not None:
+            functions = dict(self._matcher.functions)
+            roles_cache = RolesCache()
+            if "g" in e.model.model.keys():
+                for key, ast in e.model.model["g"].items():
+                    functions[key] = generate_g_function(ast.rm, roles_cache=roles_cache)
+            e._matcher = self._matcher.bind(functions, roles_cache)
+
+        return e
 
     def get_adapter(self):
         """gets the current adapter."""
@@ -136,6 +255,7 @@ class CoreEnforcer:
     def set_role_manager(self, rm):
         """sets the current role manager."""
         self.rm_map['g'] = rm
+        self._invalidate_matcher()
 
     def set_effector(self, eft):
         """sets the current effector."""
@@ -146,31 +266,54 @@ class CoreEnforcer:
         """ clears all policy."""
 
         self.model.clear_policy()
+        self._policy_version = None
 
     def init_rm_map(self):
         if 'g' in self.model.model.keys():
-            for ptype in self.model.model['g']:
-                self.rm_map[ptype] = default_role_manager.RoleManager(10)
+            for ptype, ast in self.model.model['g'].items():
+                if ast.value.count("_") > 2:
+                    # the links of each domain are kept in a role graph of their own
+                    self.rm_map[ptype] = default_role_manager.DomainManager(10)
+                else:
+                    self.rm_map[ptype] = default_role_manager.RoleManager(10)
+        self._invalidate_matcher()
 
     def load_policy(self):
         """reloads the policy from file/database."""
 
         self.model.clear_policy()
+        # read first, so that a change made while loading is seen by the next is_policy_changed
+        policy_version = self._get_policy_version()
         self.adapter.load_policy(self.model)
+        self._policy_version = policy_version
+        self.model.sort_policies_by_priority()
 
         self.init_rm_map()
         self.model.print_policy()
         if self.auto_build_role_links:
             self.build_role_links()
 
+    def is_policy_changed(self):
+        """returns false if the adapter reports that the policy in the storage is the one loaded by load_policy."""
+        policy_version = self._get_policy_version()
+        return policy_version is None or policy_version != self._policy_version
+
+    def _get_policy_version(self):
+        if not hasattr(self.adapter, "get_policy_version"):
+            return None
+
+        return self.adapter.get_policy_version()
+
     def load_filtered_policy(self, filter):
         """reloads a filtered policy from file/database."""
         self.model.clear_policy()
+        self._policy_version = None
 
         if not hasattr(self.adapter, "is_filtered"):
             raise ValueError("filtered policies are not supported by this adapter")
 
         self.adapter.load_filtered_policy(self.model, filter)
+        self.model.sort_policies_by_priority()
         self.init_rm_map()
         self.model.print_policy()
         if self.auto_build_role_links:
@@ -181,11 +324,50 @@ class CoreEnforcer:
         if not hasattr(self.adapter, "is_filtered"):
             raise ValueError("filtered policies are not supported by this adapter")
 
+        self._policy_version = None
         self.adapter.load_filtered_policy(self.model, filter)
+        self.model.sort_policies_by_priority()
         self.model.print_policy()
         if self.auto_build_role_links:
             self.build_role_links()
 
+    def save_snapshot(self, path):
+        """saves the loaded policy and the role links to a file that can be loaded by load_snapshot."""
+        role_graphs = {}
+        for ptype, rm in self.rm_map.items():
+            if hasattr(rm, "get_role_graph"):
+                role_graphs[ptype] = rm.get_role_graph()
+
+        write_snapshot(path, {"policy": self.model.get_policy_snapshot(), "role_graphs": role_graphs})
+
+    def load_snapshot(self, path):
+        """reloads the policy saved by save_snapshot instead of loading it from the adapter.
+        The model must be the same as the one of the enforcer that saved the snapshot.
+        The file only holds plain data, but whoever can write it decides the policy, so it has to be
+        protected like the storage of the adapter.
+        """
+        snapshot = read_snapshot(path)
+        self.model.load_policy_snapshot(snapshot.get("policy", {}))
+        self._policy_version = None
+
+        self.init_rm_map()
+        self.model.print_policy()
+        if not self.auto_build_role_links:
+            return
+
+        if "g" not in self.model.model.keys():
+            return
+
+        for ptype, ast in self.model.model["g"].items():
+            rm = self.rm_map[ptype]
+            role_graphs = snapshot.get("role_graphs", {})
+            if ptype in role_graphs and hasattr(rm, "set_role_graph"):
+                rm.set_role_graph(*role_graphs[ptype])
+                ast.rm = rm
+                ast.links_outdated = False
+            else:
+                ast.build_role_links(rm)
+
     def is_filtered(self):
         """returns true if the loaded policy has been filtered."""
 
@@ -214,6 +396,16 @@ class CoreEnforcer:
     def enable_auto_build_role_links(self, auto_build_role_links):
         """controls whether to rebuild the role inheritance relations when a role is added or deleted."""
         self.auto_build_role_links = auto_build_role_links
+        if not auto_build_role_links and "g" in self.model.model.keys():
+            # the grouping policy may change without the links, they are rebuilt by the next incremental change
+            for ast in self.model.model["g"].values():
+                ast.links_outdated = True
+
+    def enable_policy_index(self, index_policy=True):
+        """controls whether enforce only evaluates the policy rules that can match the request,
+        using an index on the policy fields the matcher compares with == to a request field.
+        """
+        self.index_policy = index_policy
 
     def build_role_links(self):
         """manually rebuild the role inheritance relations."""
@@ -222,6 +414,39 @@ class CoreEnforcer:
             rm.clear()
 
         self.model.build_role_links(self.rm_map)
+        self._invalidate_matcher()
+
+    def build_incremental_role_links(self, op, ptype, rules):
+        """adds or removes the role inheritance relations of grouping rules,
+        all the relations are rebuilt when the role manager can't apply the change on its own.
+        """
+        rm = self.rm_map.get(ptype)
+        if rm is None:
+            return
+
+        ast = self.model.model["g"][ptype]
+        if ast.rm is not rm or ast.links_outdated:
+            # the links weren't built for the current policy, e.g. it was loaded while auto_build_role_links was off
+            self.build_role_links()
+            return
+
+        if getattr(rm, "matching_func", None) is not None or getattr(rm, "domain_matching_func", None) is not None:
+            # the links added for the patterns can't be told apart from the links of the rules
+            self.build_role_links()
+            return
+
+        if op == PolicyOp.Policy_remove:
+            count = ast.value.count("_")
+            if any(len(rule) > count for rule in rules):
+                # another rule with different extra fields may still need the link
+                self.build_role_links()
+                return
+
+        try:
+            self.model.build_incremental_role_links(rm, op, "g", ptype, rules)
+        except RuntimeError:
+            # the links of the rules don't exist, e.g. they were added while auto_build_role_links was off
+            self.build_role_links()
 
     def add_named_matching_func(self, ptype, fn):
         """add_named_matching_func add MatchingFunc by ptype RoleManager"""
@@ -255,76 +480,101 @@ class CoreEnforcer:
         if not self.enabled:
             return [False, []]
 
-        functions = self.fm.get_functions()
+        return self._enforce_ex(self._get_matcher(), rvals)
 
+    def enforce_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the results in the order of the requests
+        """
+        return [result for result, _ in self.enforce_ex_batch(requests)]
+
+    def enforce_ex_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the judge results with reasons in the order of the requests
+        """
+
+        if not self.enabled:
+            return [[False, []] for _ in requests]
+
+        matcher = self._get_matcher()
         if "g" in self.model.model.keys():
+            # requests of a batch usually share subjects, so the role links looked up are remembered
+            functions = dict(matcher.functions)
             for key, ast in self.model.model["g"].items():
-                rm = ast.rm
-                functions[key] = generate_g_function(rm)
+                functions[key] = generate_g_function(ast.rm, dict(), matcher.roles_cache)
+            matcher = matcher.bind(functions)
 
-        if "m" not in self.model.model.keys():
-            raise RuntimeError("model is undefined")
-
-        if "m" not in self.model.model["m"].keys():
-            raise RuntimeError("model is undefined")
+        return [self._enforce_ex(matcher, tuple(rvals)) for rvals in requests]
 
+    def _enforce_ex(self, matcher, rvals):
         r_tokens = self.model.model["r"]["r"].tokens
         p_tokens = self.model.model["p"]["p"].tokens
 
         if len(r_tokens) != len(rvals):
             raise RuntimeError("invalid request size")
 
-        exp_string = self.model.model["m"]["m"].value
-        has_eval = util.has_eval(exp_string)
-        if not has_eval:
-            expression = self._get_expression(exp_string, functions)
-
-        policy_effects = set()
+        has_eval = matcher.has_eval()
+        matcher.roles_cache.clear()
 
-        r_parameters = dict(zip(r_tokens, rvals))
+        stream = self.eft.new_stream() if hasattr(self.eft, "new_stream") else EffectorStream(self.eft)
 
         policy_len = len(self.model.model["p"]["p"].policy)
 
         explain_index = -1
         if not 0 == policy_len:
-            for i, pvals in enumerate(self.model.model["p"]["p"].policy):
-                if len(p_tokens) != len(pvals):
-                    raise RuntimeError("invalid policy size")
+            policy = self.model.model["p"]["p"].policy
 
-                p_parameters = dict(zip(p_tokens, pvals))
-                parameters = dict(r_parameters, **p_parameters)
+            candidates = None
+            if self.index_policy:
+                candidates = self._get_policy_candidates(matcher.index_fields, matcher.ip_index_fields, rvals)
+            if candidates is None:
+                candidates = range(policy_len)
 
-                if util.has_eval(exp_string):
-                    rule_names = util.get_eval_value(exp_string)
-                    rules = [util.escape_assertion(p_parameters[rule_name]) for rule_name in rule_names]
-                    exp_with_rule = util.replace_eval(exp_string, rules)
-                    expression = self._get_expression(exp_with_rule, functions)
+            if has_eval:
+                matcher.prune_eval_funcs(policy_len)
+                p_indexes = {p_token: i for i, p_token in enumerate(p_tokens)}
+                rule_indexes = [p_indexes[rule_name] for rule_name in matcher.rule_names]
+                names = r_tokens + p_tokens
+            else:
+                func = functools.partial(matcher.func, *rvals)
+
+            eft_index = p_tokens.index("p_eft") if "p_eft" in p_tokens else -1
+
+            for i in candidates:
+                pvals = policy[i]
+                if len(p_tokens) != len(pvals):
+                    raise RuntimeError("invalid policy size")
 
-                result = expression.eval(parameters)
+                if has_eval:
+                    rules = tuple([pvals[rule_index] for rule_index in rule_indexes])
+                    result = matcher.get_eval_func(rules, names)(*rvals, *pvals)
+                else:
+                    result = func(*pvals)
 
                 if isinstance(result, bool):
                     if not result:
-                        policy_effects.add(Effector.INDETERMINATE)
                         continue
                 elif isinstance(result, float):
                     if 0 == result:
-                        policy_effects.add(Effector.INDETERMINATE)
                         continue
                 else:
                     raise RuntimeError("matcher result should be bool, int or float")
 
-                if "p_eft" in parameters.keys():
-                    eft = parameters["p_eft"]
+                if eft_index != -1:
+                    eft = pvals[eft_index]
                     if "allow" == eft:
-                        policy_effects.add(Effector.ALLOW)
+                        effect = Effector.ALLOW
                     elif "deny" == eft:
-                        policy_effects.add(Effector.DENY)
+                        effect = Effector.DENY
                     else:
-                        policy_effects.add(Effector.INDETERMINATE)
+                        effect = Effector.INDETERMINATE
                 else:
-                    policy_effects.add(Effector.ALLOW)
+                    effect = Effector.ALLOW
 
-                if self.eft.intermediate_effect(policy_effects) != Effector.INDETERMINATE:
+                # the effector tells once the remaining rules can't change the effect
+                if stream.push_effect(effect):
                     explain_index = i
                     break
 
@@ -332,32 +582,16 @@ class CoreEnforcer:
             if has_eval:
                 raise RuntimeError("please make sure rule exists in policy when using eval() in matcher")
 
-            parameters = r_parameters.copy()
-
-            for token in self.model.model["p"]["p"].tokens:
-                parameters[token] = ""
-
-            result = expression.eval(parameters)
+            result = matcher.func(*(rvals + ("",) * len(p_tokens)))
 
             if result:
-                policy_effects.add(Effector.ALLOW)
-            else:
-                policy_effects.add(Effector.INDETERMINATE)
+                stream.push_effect(Effector.ALLOW)
 
-        final_effect = self.eft.final_effect(policy_effects)
+        final_effect = stream.current()
         result = effect_to_bool(final_effect)
 
         # Log request.
-
-        req_str = "Request: "
-        req_str = req_str + ", ".join([str(v) for v in rvals])
-
-        req_str = req_str + " ---> %s" % result
-        if result:
-            self.logger.info(req_str)
-        else:
-            # leaving this in error for now, if it's very noise this can be changed to info or debug
-            self.logger.error(req_str)
+        self.decision_logger.log_decision(rvals, result)
 
         explain_rule = []
         if explain_index != -1 and explain_index < policy_len:
@@ -365,10 +599,95 @@ class CoreEnforcer:
 
         return result, explain_rule
 
+    def _get_matcher(self):
+        """returns the Matcher of the current model.
+        It is cached until the model, the functions or the role links change.
+        """
+        if "m" not in self.model.model.keys():
+            raise RuntimeError("model is undefined")
+
+        if "m" not in self.model.model["m"].keys():
+            raise RuntimeError("model is undefined")
+
+        exp_string = self.model.model["m"]["m"].value
+        if self._matcher is not None and self._matcher.value == exp_string:
+            return self._matcher
+
+        functions = dict(self.fm.get_functions())
+        roles_cache = RolesCache()
+
+        if "g" in self.model.model.keys():
+            for key, ast in self.model.model["g"].items():
+                rm = ast.rm
+                functions[key] = generate_g_function(rm, roles_cache=roles_cache)
+
+        r_tokens = self.model.model["r"]["r"].tokens
+        p_tokens = self.model.model["p"]["p"].tokens
+
+        expression = None
+        if not util.has_eval(exp_string):
+            expression = CompiledExpression(self._rewrite_expression(exp_string), functions, r_tokens + p_tokens)
+
+        if expression is not None:
+            parsed_value = expression.expr_parsed_value
+        else:
+            parsed_value = parse_expression(self._rewrite_expression(exp_string))
+
+        index_fields = []
+        for r_token, p_token in get_equality_conditions(parsed_value, r_tokens, p_tokens):
+            index_fields.append((r_tokens.index(r_token), p_tokens.index(p_token)))
+
+        ip_index_fields = []
+        if functions.get("ipMatch") is ip_match_func:
+            for r_token, p_token in get_call_conditions(parsed_value, "ipMatch", r_tokens, p_tokens):
+                ip_index_fields.append((r_tokens.index(r_token), p_tokens.index(p_token)))
+
+        self._matcher = Matcher(exp_string, functions, expression, index_fields, ip_index_fields, roles_cache)
+        return self._matcher
+
+    def _get_policy_candidates(self, index_fields, ip_index_fields, rvals):
+        """returns the positions of the only policy rules that can match the request,
+        or None if the policy has to be scanned.
+        The policy is scanned when a scan would raise, so that skipping rules doesn't hide the error.
+        """
+        if not index_fields and not ip_index_fields:
+            return None
+        if not self.model.is_policy_size_valid("p", "p"):
+            # let the scan raise the error for the rule
+            return None
+
+        candidates = None
+        for r_index, p_index in index_fields:
+            try:
+                positions = self.model.get_policy_index("p", "p", p_index).get(rvals[r_index], [])
+            except TypeError:
+                # unhashable request values, e.g. ABAC objects, can't be looked up
+                continue
+
+            if candidates is None or len(positions) < len(candidates):
+                candidates = positions
+
+        for r_index, p_index in ip_index_fields:
+            try:
+                ip = ipaddress.ip_address(rvals[r_index])
+            except (TypeError, ValueError):
+                # let ipMatch raise the error for the request
+                return None
+
+            positions = self.model.get_policy_ip_positions("p", "p", p_index, ip)
+            if candidates is None or len(positions) < len(candidates):
+                candidates = positions
+
+        return candidates
+
+    def _invalidate_matcher(self):
+        """drops the cached matcher, it will be rebuilt by the next enforce call."""
+        self._matcher = None
+
     @staticmethod
-    def _get_expression(expr, functions=None):
+    def _rewrite_expression(expr):
         expr = expr.replace("&&", "and")
         expr = expr.replace("||", "or")
         expr = expr.replace("!", "not")
 
-        return SimpleEval(expr, functions)
+        return expr
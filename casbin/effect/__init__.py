@@ -1,5 +1,5 @@
 from .default_effectors import AllowOverrideEffector, DenyOverrideEffector, AllowAndDenyEffector, PriorityEffector
-from .effector import Effector
+from .effector import Effector, EffectorStream
 
 def get_effector(expr):
     ''' creates an effector based on the current policy effect expression '''
@@ -1,4 +1,4 @@
-from .effector import Effector
+from .effector import Effector, EffectorStream
 
 class AllowOverrideEffector(Effector):
 
@@ -14,6 +14,9 @@ class AllowOverrideEffector(Effector):
             return Effector.ALLOW
         return Effector.DENY
 
+    def new_stream(self):
+        return AllowOverrideStream()
+
 class DenyOverrideEffector(Effector):
 
     def intermediate_effect(self, effects):
@@ -28,6 +31,9 @@ class DenyOverrideEffector(Effector):
             return Effector.DENY
         return Effector.ALLOW
 
+    def new_stream(self):
+        return DenyOverrideStream()
+
 class AllowAndDenyEffector(Effector):
 
     def intermediate_effect(self, effects):
@@ -42,6 +48,9 @@ class AllowAndDenyEffector(Effector):
             return Effector.DENY
         return Effector.ALLOW
 
+    def new_stream(self):
+        return AllowAndDenyStream()
+
 class PriorityEffector(Effector):
 
     def intermediate_effect(self, effects):
@@ -59,3 +68,68 @@ class PriorityEffector(Effector):
         if Effector.DENY in effects:
             return Effector.DENY
         return Effector.DENY
+
+    def new_stream(self):
+        return PriorityStream()
+
+class AllowOverrideStream(EffectorStream):
+    """ allows at the first allow, denies if there is none """
+
+    def __init__(self):
+        self._effect = Effector.DENY
+
+    def push_effect(self, effect):
+        if effect == Effector.ALLOW:
+            self._effect = Effector.ALLOW
+            return True
+        return False
+
+    def current(self):
+        return self._effect
+
+class DenyOverrideStream(EffectorStream):
+    """ denies at the first deny, allows if there is none """
+
+    def __init__(self):
+        self._effect = Effector.ALLOW
+
+    def push_effect(self, effect):
+        if effect == Effector.DENY:
+            self._effect = Effector.DENY
+            return True
+        return False
+
+    def current(self):
+        return self._effect
+
+class AllowAndDenyStream(EffectorStream):
+    """ denies at the first deny, allows if there is none and there is an allow """
+
+    def __init__(self):
+        self._effect = Effector.DENY
+
+    def push_effect(self, effect):
+        if effect == Effector.DENY:
+            self._effect = Effector.DENY
+            return True
+        if effect == Effector.ALLOW:
+            self._effect = Effector.ALLOW
+        return False
+
+    def current(self):
+        return self._effect
+
+class PriorityStream(EffectorStream):
+    """ takes the first allow or deny, the rules being sorted by priority, denies if there is none """
+
+    def __init__(self):
+        self._effect = Effector.DENY
+
+    def push_effect(self, effect):
+        if effect != Effector.INDETERMINATE:
+            self._effect = effect
+            return True
+        return False
+
+    def current(self):
+        return self._effect
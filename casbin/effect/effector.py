@@ -14,6 +14,26 @@ class Effector:
     def final_effect(self, effects):
         """ returns the final effect based on the matched effects of the enforcer """
         pass
-        
 
+    def new_stream(self):
+        """ returns a stream deciding the effect of a request from the effects of its matching rules """
+        return EffectorStream(self)
 
+
+class EffectorStream:
+    """EffectorStream folds in the effects of the rules matching a request one at a time.
+    This one keeps them in a set and decides with intermediate_effect and final_effect of its effector.
+    """
+
+    def __init__(self, effector):
+        self._effector = effector
+        self._effects = set()
+
+    def push_effect(self, effect):
+        """ adds the effect of a matching rule, returns true once the effect is decided and the other rules can be skipped """
+        self._effects.add(effect)
+        return self._effector.intermediate_effect(self._effects) != Effector.INDETERMINATE
+
+    def current(self):
+        """ returns the effect decided by the effects added so far """
+        return self._effector.final_effect(self._effects)
@@ -1,5 +1,7 @@
+from casbin.effect import AllowOverrideEffector
 from casbin.management_enforcer import ManagementEnforcer
-from casbin.util import join_slice, set_subtract
+from casbin.rbac import default_role_manager
+from casbin.util import get_sole_call_condition, join_slice, set_subtract
 
 class Enforcer(ManagementEnforcer):
     """
@@ -174,19 +176,100 @@ class Enforcer(ManagementEnforcer):
         Note: only users will be returned, roles (2nd arg in "g") will be excluded.
         """
         subjects = self.get_all_subjects()
+        g_subjects = set_subtract(self.model.get_values_for_field_in_policy("g", "g", 0), subjects)
         roles = self.get_all_roles()
 
-        users = set_subtract(subjects, roles)
+        users = set_subtract(subjects + g_subjects, roles)
 
-        res = list()
-        for user in users:
-            req = join_slice(user, *permission)
-            allowed = self.enforce(*req)
+        allowed = self._get_implicit_subjects_for_permission(permission)
+        if allowed is not None:
+            return [user for user in users if user in allowed]
 
-            if allowed:
-                res.append(user)
+        results = self.enforce_batch([join_slice(user, *permission) for user in users])
 
-        return res
+        return [user for user, result in zip(users, results) if result]
+
+    def _get_implicit_subjects_for_permission(self, permission):
+        """gets the subjects allowed a permission by walking down the role links from the subjects of the rules
+        allowing it, or None when the model doesn't tell which rules allow it without a subject.
+        The matcher has to use the request subject only in g(r_sub, p_field) and the effect has to allow
+        when a rule allows.
+        """
+        if not self.enabled or type(self.eft) is not AllowOverrideEffector:
+            return None
+
+        r_tokens = self.model.model["r"]["r"].tokens
+        p_tokens = self.model.model["p"]["p"].tokens
+        policy = self.model.model["p"]["p"].policy
+        if len(r_tokens) != len(permission) + 1 or not policy:
+            return None
+
+        matcher = self._get_matcher()
+        if matcher.has_eval():
+            return None
+
+        g_names = self.model.model["g"].keys() if "g" in self.model.model.keys() else []
+        condition = get_sole_call_condition(matcher.expression.expr_parsed_value, r_tokens[0], g_names, p_tokens)
+        if condition is None:
+            return None
+
+        rm = self.model.model["g"][condition[0]].rm
+        if rm is not None:
+            if not isinstance(rm, default_role_manager.RoleManager):
+                return None
+            if rm.matching_func is not None or rm.domain_matching_func is not None:
+                return None
+
+        # g(r_sub, p_field) is true when the request subject is the one of the rule
+        sub_index = p_tokens.index(condition[1])
+        eft_index = p_tokens.index("p_eft") if "p_eft" in p_tokens else -1
+        rvals = (None,) + tuple(permission)
+        candidates = None
+        if self.index_policy:
+            candidates = self._get_policy_candidates(matcher.index_fields, matcher.ip_index_fields, rvals)
+        if candidates is None:
+            candidates = range(len(policy))
+
+        matcher.roles_cache.clear()
+        level = []
+        allowed = set()
+        for i in candidates:
+            pvals = policy[i]
+            if len(p_tokens) != len(pvals):
+                raise RuntimeError("invalid policy size")
+            if eft_index != -1 and pvals[eft_index] != "allow":
+                continue
+
+            result = matcher.func(pvals[sub_index], *permission, *pvals)
+            if isinstance(result, bool):
+                if not result:
+                    continue
+            elif isinstance(result, float):
+                if 0 == result:
+                    continue
+            else:
+                raise RuntimeError("matcher result should be bool, int or float")
+
+            if pvals[sub_index] not in allowed:
+                allowed.add(pvals[sub_index])
+                level.append(pvals[sub_index])
+
+        if rm is None:
+            return allowed
+
+        # has_link follows max_hierarchy_level links past the direct roles
+        for _ in range(rm.max_hierarchy_level + 1):
+            next_level = []
+            for name in level:
+                for user in rm.get_users(name):
+                    if user not in allowed:
+                        allowed.add(user)
+                        next_level.append(user)
+            if not next_level:
+                break
+            level = next_level
+
+        return allowed
 
     def get_roles_for_user_in_domain(self, name, domain):
         """gets the roles that a user has inside a domain."""
@@ -6,19 +6,29 @@ class InternalEnforcer(CoreEnforcer):
         InternalEnforcer = CoreEnforcer + Internal API.
     """
 
+    def _save_policy_change(self, save, *args):
+        """saves a change of the policy with the given adapter method, then notifies the watcher.
+        Returns false if the adapter failed to save the change."""
+        if save(*args) is False:
+            return False
+
+        if self.watcher:
+            self.watcher.update()
+
+        return True
+
     def _add_policy(self, sec, ptype, rule):
         """adds a rule to the current policy."""
         rule_added = self.model.add_policy(sec, ptype, rule)
         if not rule_added:
             return rule_added
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
-            if self.adapter.add_policy(sec, ptype, rule) is False:
+            if self._save_policy_change(self.adapter.add_policy, sec, ptype, rule) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rule_added
     
     def _add_policies(self,sec,ptype,rules):
@@ -26,17 +36,16 @@ class InternalEnforcer(CoreEnforcer):
         rules_added = self.model.add_policies(sec, ptype, rules)
         if not rules_added:
             return rules_added
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
             if hasattr(self.adapter,'add_policies') is False:
                 return False
                 
-            if self.adapter.add_policies(sec, ptype, rules) is False:
+            if self._save_policy_change(self.adapter.add_policies, sec, ptype, rules) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rules_added
 
     def _update_policy(self, sec, ptype, old_rule, new_rule):
@@ -45,15 +54,14 @@ class InternalEnforcer(CoreEnforcer):
 
         if not rule_updated:
             return rule_updated
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
 
-            if self.adapter.update_policy(sec, ptype, old_rule, new_rule) is False:
+            if self._save_policy_change(self.adapter.update_policy, sec, ptype, old_rule, new_rule) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rule_updated
 
     def _update_policies(self, sec, ptype, old_rules, new_rules):
@@ -62,15 +70,14 @@ class InternalEnforcer(CoreEnforcer):
 
         if not rules_updated:
             return rules_updated
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
 
-            if self.adapter.update_policies(sec, ptype, old_rules, new_rules) is False:
+            if self._save_policy_change(self.adapter.update_policies, sec, ptype, old_rules, new_rules) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rules_updated
     
     def _remove_policy(self, sec, ptype, rule):
@@ -78,14 +85,13 @@ class InternalEnforcer(CoreEnforcer):
         rule_removed = self.model.remove_policy(sec, ptype, rule)
         if not rule_removed:
             return rule_removed
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
-            if self.adapter.remove_policy(sec, ptype, rule) is False:
+            if self._save_policy_change(self.adapter.remove_policy, sec, ptype, rule) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rule_removed
 
     def _remove_policies(self, sec, ptype, rules):
@@ -93,17 +99,16 @@ class InternalEnforcer(CoreEnforcer):
         rules_removed = self.model.remove_policies(sec, ptype, rules)
         if not rules_removed:
             return rules_removed
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
             if hasattr(self.adapter,'remove_policies') is False:
                 return False
 
-            if self.adapter.remove_policies(sec, ptype, rules) is False:
+            if self._save_policy_change(self.adapter.remove_policies, sec, ptype, rules) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rules_removed
 
     def _remove_filtered_policy(self, sec, ptype, field_index, *field_values):
@@ -111,12 +116,11 @@ class InternalEnforcer(CoreEnforcer):
         rule_removed = self.model.remove_filtered_policy(sec, ptype, field_index, *field_values)
         if not rule_removed:
             return rule_removed
+        # the policy no longer is the one loaded from the adapter
+        self._policy_version = None
 
         if self.adapter and self.auto_save:
-            if self.adapter.remove_filtered_policy(sec, ptype, field_index, *field_values) is False:
+            if self._save_policy_change(self.adapter.remove_filtered_policy, sec, ptype, field_index, *field_values) is False:
                 return False
 
-            if self.watcher:
-                self.watcher.update()
-
         return rule_removed
\ No newline at end of file
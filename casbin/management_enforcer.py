@@ -1,4 +1,5 @@
 from casbin.internal_enforcer import InternalEnforcer
+from casbin.model.policy_op import PolicyOp
 
 class ManagementEnforcer(InternalEnforcer):
     """
@@ -205,12 +206,12 @@ class ManagementEnforcer(InternalEnforcer):
 
         if len(params) == 1 and isinstance(params[0], list):
             str_slice = params[0]
-            rule_added = self._add_policy('g', ptype, str_slice)
         else:
-            rule_added = self._add_policy('g', ptype, list(params))
+            str_slice = list(params)
+        rule_added = self._add_policy('g', ptype, str_slice)
 
         if self.auto_build_role_links:
-            self.build_role_links()
+            self._add_role_links(ptype, [str_slice])
         return rule_added
 
     def add_named_grouping_policies(self,ptype,rules):
@@ -220,7 +221,7 @@ class ManagementEnforcer(InternalEnforcer):
         Otherwise the function returns true for the corresponding policy rule by adding the new rule."""
         rules_added = self._add_policies('g',ptype,rules)
         if self.auto_build_role_links:
-            self.build_role_links()
+            self._add_role_links(ptype, rules)
         
         return rules_added
 
@@ -241,31 +242,53 @@ class ManagementEnforcer(InternalEnforcer):
 
         if len(params) == 1 and isinstance(params[0], list):
             str_slice = params[0]
-            rule_removed = self._remove_policy('g', ptype, str_slice)
         else:
-            rule_removed = self._remove_policy('g', ptype, list(params))
+            str_slice = list(params)
+        rules = self._get_grouping_rules(ptype, [str_slice])
+        rule_removed = self._remove_policy('g', ptype, str_slice)
 
         if self.auto_build_role_links:
-            self.build_role_links()
+            self._remove_role_links(ptype, rules)
         return rule_removed
     
     def remove_named_grouping_policies(self,ptype,rules):
         """ removes role inheritance rules from the current named policy."""
+        existing_rules = self._get_grouping_rules(ptype, rules)
         rules_removed = self._remove_policies('g',ptype,rules)
 
         if self.auto_build_role_links:
-            self.build_role_links()
+            self._remove_role_links(ptype, existing_rules)
         
         return rules_removed
 
     def remove_filtered_named_grouping_policy(self, ptype, field_index, *field_values):
         """removes a role inheritance rule from the current named policy, field filters can be specified."""
+        rules = self.model.get_filtered_policy('g', ptype, field_index, *field_values)
         rule_removed = self._remove_filtered_policy('g', ptype, field_index, *field_values)
 
         if self.auto_build_role_links:
-            self.build_role_links()
+            self._remove_role_links(ptype, rules)
         return rule_removed
 
+    def _get_grouping_rules(self, ptype, rules):
+        """returns the rules that are in the current named grouping policy."""
+        return [rule for rule in rules if self.model.has_policy('g', ptype, rule)]
+
+    def _add_role_links(self, ptype, rules):
+        """adds the role inheritance relations of the rules that are now in the grouping policy,
+        links that already exist are left as they are.
+        """
+        rules = self._get_grouping_rules(ptype, rules)
+        if rules:
+            self.build_incremental_role_links(PolicyOp.Policy_add, ptype, rules)
+
+    def _remove_role_links(self, ptype, rules):
+        """removes the role inheritance relations of the rules that are no longer in the grouping policy."""
+        rules = [rule for rule in rules if not self.model.has_policy('g', ptype, rule)]
+        if rules:
+            self.build_incremental_role_links(PolicyOp.Policy_remove, ptype, rules)
+
     def add_function(self, name, func):
         """adds a customized function."""
-        self.fm.add_function(name, func)
\ No newline at end of file
+        self.fm.add_function(name, func)
+        self._invalidate_matcher()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import copy
 import logging
 from casbin.model.policy_op import PolicyOp
 
@@ -10,6 +11,53 @@ class Assertion:
         self.tokens = []
         self.policy = []
         self.rm = None
+        # true when the links in rm may not match the policy, see CoreEnforcer.build_incremental_role_links
+        self.links_outdated = True
+        # field index -> {value: positions of the rules in policy}, see Policy.get_policy_index
+        self.policy_index = {}
+        self.policy_index_size = 0
+        # field index -> {(ip version, prefix length): {network prefix: positions}}, see Policy.get_policy_ip_index
+        self.policy_ip_index = {}
+        # whether every rule has one value per token, None until checked, see Policy.is_policy_size_valid
+        self.policy_size_valid = None
+        # tuple(rule) -> number of occurrences in policy, see Policy.has_policy
+        self.policy_map = None
+        self.policy_map_size = 0
+
+    def copy(self, with_policy=True):
+        """returns a copy of the assertion whose policy and indexes can be changed without affecting it,
+        the copy has an empty policy if with_policy is false.
+        """
+        ast = copy.copy(self)
+        if not with_policy:
+            ast.policy = []
+            ast.policy_index = {}
+            ast.policy_ip_index = {}
+            ast.policy_size_valid = None
+            ast.policy_index_size = 0
+            ast.policy_map = None
+            ast.policy_map_size = 0
+            return ast
+
+        # rules are replaced rather than changed in place, so they can be shared
+        ast.policy = list(self.policy)
+        # readers without the lock add the indexes of other fields as they are built, the dicts are copied
+        # in a single step before iterating them. An index is only added once complete.
+        ast.policy_index = {
+            field_index: {value: list(positions) for value, positions in index.items()}
+            for field_index, index in dict(self.policy_index).items()
+        }
+        ast.policy_ip_index = {
+            field_index: {
+                key: {prefix: list(positions) for prefix, positions in networks.items()}
+                for key, networks in index.items()
+            }
+            for field_index, index in dict(self.policy_ip_index).items()
+        }
+        if self.policy_map is not None:
+            ast.policy_map = dict(self.policy_map)
+
+        return ast
 
     def build_role_links(self, rm):
         self.rm = rm
@@ -25,7 +73,8 @@ class Assertion:
 
             self.rm.add_link(*rule[:count])
 
-        self.logger.info("Role links for: {}".format(self.key))
+        self.links_outdated = False
+        self.logger.info("Role links for: %s", self.key)
         self.rm.print_roles()
 
     def build_incremental_role_links(self, rm, op, rules):
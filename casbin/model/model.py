@@ -1,3 +1,6 @@
+import copy
+import logging
+
 from . import Assertion
 from casbin import util, config
 from .policy import Policy
@@ -73,7 +76,28 @@ class Model(Policy):
 
         self._load_section(cfg, "g")
 
+    def get_definitions(self):
+        """returns the definitions of the model as (sec, key, value), add_def turns them back into the model."""
+        return [(sec, key, ast.value) for sec, asts in self.model.items() for key, ast in asts.items()]
+
+    def copy(self, with_policy=True):
+        """returns a copy of the model whose policies can be changed without affecting it,
+        the copy has empty policies if with_policy is false. The definitions of the other sections are shared.
+        """
+        m = copy.copy(self)
+        m.model = {}
+        for sec, asts in self.model.items():
+            if sec in ["p", "g"]:
+                m.model[sec] = {key: ast.copy(with_policy) for key, ast in asts.items()}
+            else:
+                m.model[sec] = dict(asts)
+
+        return m
+
     def print_model(self):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         self.logger.info("Model:")
         for k, v in self.model.items():
             for i, j in v.items():
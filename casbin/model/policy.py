@@ -1,5 +1,10 @@
+import bisect
+import heapq
+import itertools
 import logging
 
+from casbin.util import parse_ip_network
+
 class Policy:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -22,6 +27,9 @@ class Policy:
     def print_policy(self):
         """Log using info"""
 
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         self.logger.info("Policy:")
         for sec in ["p", "g"]:
             if sec not in self.model.keys():
@@ -39,6 +47,68 @@ class Policy:
 
             for key in self.model[sec].keys():
                 self.model[sec][key].policy = []
+                self._clear_policy_map(self.model[sec][key])
+                self._clear_policy_index(self.model[sec][key])
+
+    def sort_policies_by_priority(self):
+        """sorts the rules of the policies having a priority field by ascending priority,
+        so that the priority effect can take the first rule matching a request.
+        Rules with the same priority keep their order, add_policy and add_policies then keep the rules sorted.
+        A priority that isn't an integer raises a RuntimeError naming the rule, the policy is then left unsorted.
+        """
+        if "p" not in self.model.keys():
+            return
+
+        for ast in self.model["p"].values():
+            priority_index = self._get_priority_index(ast)
+            if priority_index == -1:
+                continue
+
+            ast.policy.sort(key=lambda rule: self._get_priority(rule, priority_index))
+            self._clear_policy_index(ast)
+
+    def get_policy_snapshot(self):
+        """gets the rules of all the policies as plain lists of strings."""
+        snapshot = {}
+        for sec in ["p", "g"]:
+            if sec not in self.model.keys():
+                continue
+
+            snapshot[sec] = {}
+            for key, ast in self.model[sec].items():
+                snapshot[sec][key] = {
+                    "value": ast.value,
+                    "policy": ast.policy,
+                }
+
+        return snapshot
+
+    def load_policy_snapshot(self, snapshot):
+        """replaces all the policies with the rules of a snapshot made by get_policy_snapshot,
+        their indexes are built again when they are used.
+        """
+        for sec in ["p", "g"]:
+            if sec not in self.model.keys():
+                continue
+
+            for key, ast in self.model[sec].items():
+                data = snapshot.get(sec, {}).get(key)
+                if not isinstance(data, dict) or data.get("value") != ast.value:
+                    raise RuntimeError("snapshot does not match the model: {}".format(key))
+
+                policy = data.get("policy")
+                if not isinstance(policy, list) or not all(
+                        isinstance(rule, list) and all(isinstance(value, str) for value in rule) for rule in policy):
+                    raise RuntimeError("invalid rules in snapshot: {}".format(key))
+
+        for sec in ["p", "g"]:
+            if sec not in self.model.keys():
+                continue
+
+            for key, ast in self.model[sec].items():
+                ast.policy = snapshot[sec][key]["policy"]
+                self._clear_policy_map(ast)
+                self._clear_policy_index(ast)
 
     def get_policy(self, sec, ptype):
         """gets all rules in a policy."""
@@ -59,13 +129,23 @@ class Policy:
         if ptype not in self.model[sec]:
             return False
 
-        return rule in self.model[sec][ptype].policy
+        return tuple(rule) in self._get_policy_map(self.model[sec][ptype])
 
     def add_policy(self, sec, ptype, rule):
         """adds a policy rule to the model."""
 
         if not self.has_policy(sec, ptype, rule):
-            self.model[sec][ptype].policy.append(rule)
+            ast = self.model[sec][ptype]
+            position = self._get_priority_position(ast, rule)
+            if position == len(ast.policy):
+                ast.policy.append(rule)
+                self._add_to_policy_map(ast, [rule])
+                self._add_to_policy_index(ast, [rule])
+            else:
+                # after the rules with a higher or the same priority
+                ast.policy.insert(position, rule)
+                self._add_to_policy_map(ast, [rule])
+                self._clear_policy_index(ast)
             return True
 
         return False
@@ -77,8 +157,23 @@ class Policy:
             if self.has_policy(sec,ptype,rule):
                 return False
 
+        ast = self.model[sec][ptype]
+        priority_index = self._get_priority_index(ast)
+        if priority_index != -1:
+            get_priority = lambda rule: self._get_priority(rule, priority_index)
+            rules = sorted(rules, key=get_priority)
+            if ast.policy and rules and get_priority(rules[0]) < get_priority(ast.policy[-1]):
+                # merged after the rules with the same priority
+                ast.policy = list(heapq.merge(ast.policy, rules, key=get_priority))
+                self._add_to_policy_map(ast, rules)
+                self._clear_policy_index(ast)
+                return True
+
         for rule in rules:
-            self.model[sec][ptype].policy.append(rule)
+            ast.policy.append(rule)
+
+        self._add_to_policy_map(ast, rules)
+        self._add_to_policy_index(ast, rules)
 
         return True
 
@@ -92,7 +187,7 @@ class Policy:
 
         ast = self.model[sec][ptype]
 
-        if old_rule in ast.policy:
+        if tuple(old_rule) in self._get_policy_map(ast):
             rule_index = ast.policy.index(old_rule)
         else:
             return False
@@ -106,6 +201,9 @@ class Policy:
         else:
             ast.policy[rule_index] = new_rule
 
+        self._update_policy_map(ast, old_rule, new_rule)
+        self._update_policy_index(ast, rule_index, old_rule, new_rule)
+
         return True
 
     def update_policies(self, sec, ptype, old_rules, new_rules):
@@ -119,10 +217,11 @@ class Policy:
             return False
 
         ast = self.model[sec][ptype]
+        policy_map = self._get_policy_map(ast)
         old_rules_index = []
 
         for old_rule in old_rules:
-            if old_rule in ast.policy:
+            if tuple(old_rule) in policy_map:
                 old_rules_index.append(ast.policy.index(old_rule))
             else:
                 return False
@@ -132,11 +231,15 @@ class Policy:
             for idx, old_rule, new_rule in zip(old_rules_index, old_rules, new_rules):
                 if old_rule[priority_index] == new_rule[priority_index]:
                     ast.policy[idx] = new_rule
+                    self._update_policy_map(ast, old_rule, new_rule)
+                    self._update_policy_index(ast, idx, old_rule, new_rule)
                 else:
                     raise Exception("New rule should have the same priority with old rule.")
         else:
             for idx, old_rule, new_rule in zip(old_rules_index ,old_rules, new_rules):
                 ast.policy[idx] = new_rule
+                self._update_policy_map(ast, old_rule, new_rule)
+                self._update_policy_index(ast, idx, old_rule, new_rule)
 
         return True
 
@@ -145,21 +248,47 @@ class Policy:
         if not self.has_policy(sec, ptype, rule):
             return False
 
-        self.model[sec][ptype].policy.remove(rule)
+        ast = self.model[sec][ptype]
+        position = ast.policy.index(rule)
+        del ast.policy[position]
+        self._remove_from_policy_map(ast, [rule])
+        self._remove_from_policy_index(ast, rule, position)
 
-        return rule not in self.model[sec][ptype].policy
+        return not self.has_policy(sec, ptype, rule)
 
     def remove_policies(self, sec, ptype, rules):
         """RemovePolicies removes policy rules from the model."""
 
+        if sec not in self.model.keys():
+            return False
+        if ptype not in self.model[sec]:
+            return False
+
+        ast = self.model[sec][ptype]
+        policy_map = self._get_policy_map(ast)
+
+        # the first occurrence of every rule is removed, all in a single pass over the policy
+        removed = {}
         for rule in rules:
-            if not self.has_policy(sec,ptype,rule):
-                return False
-            self.model[sec][ptype].policy.remove(rule)
-            if rule in self.model[sec][ptype].policy:
+            key = tuple(rule)
+            removed[key] = removed.get(key, 0) + 1
+            if removed[key] > policy_map.get(key, 0):
                 return False
 
-        return True
+        remaining = dict(removed)
+        tmp = []
+        for rule in ast.policy:
+            key = tuple(rule)
+            if remaining.get(key):
+                remaining[key] -= 1
+            else:
+                tmp.append(rule)
+
+        ast.policy = tmp
+        self._remove_from_policy_map(ast, rules)
+        self._clear_policy_index(ast)
+
+        return all(key not in ast.policy_map for key in removed)
 
     def remove_policies_with_effected(self, sec, ptype, rules):
         effected = []
@@ -191,6 +320,8 @@ class Policy:
                 tmp.append(rule)
 
         self.model[sec][ptype].policy = tmp
+        self._clear_policy_map(self.model[sec][ptype])
+        self._clear_policy_index(self.model[sec][ptype])
 
         return effects
 
@@ -212,6 +343,8 @@ class Policy:
                 tmp.append(rule)
 
         self.model[sec][ptype].policy = tmp
+        self._clear_policy_map(self.model[sec][ptype])
+        self._clear_policy_index(self.model[sec][ptype])
 
         return res
 
@@ -223,9 +356,294 @@ class Policy:
         if ptype not in self.model[sec]:
             return values
 
+        seen = set()
         for rule in self.model[sec][ptype].policy:
             value = rule[field_index]
-            if value not in values:
+            if value not in seen:
+                seen.add(value)
                 values.append(value)
 
         return values
+
+
+    def get_policy_index(self, sec, ptype, field_index):
+        """gets the positions of the rules in a policy grouped by the value of a field.
+
+        The index is built on first use and kept current when rules are added, updated or removed one by one,
+        inserting rules before others or removing several rules drops it so that it is rebuilt by the next call.
+        """
+        ast = self.model[sec][ptype]
+        if ast.policy_index_size != len(ast.policy):
+            # rules were appended without going through the model, e.g. by an adapter
+            self._clear_policy_index(ast)
+
+        index = ast.policy_index.get(field_index)
+        if index is None:
+            index = {}
+            for i, rule in enumerate(ast.policy):
+                if field_index < len(rule):
+                    index.setdefault(rule[field_index], []).append(i)
+            ast.policy_index[field_index] = index
+
+        return index
+
+    def is_policy_size_valid(self, sec, ptype):
+        """determines whether every rule of a policy has one value per token of its definition,
+        checked once and kept current like the indexes.
+        """
+        ast = self.model[sec][ptype]
+        if ast.policy_index_size != len(ast.policy):
+            self._clear_policy_index(ast)
+
+        if ast.policy_size_valid is None:
+            size = len(ast.tokens)
+            ast.policy_size_valid = all(len(rule) == size for rule in ast.policy)
+
+        return ast.policy_size_valid
+
+    def get_policy_ip_index(self, sec, ptype, field_index):
+        """gets the positions of the rules in a policy grouped by the network of the IP address
+        or CIDR pattern in a field. Rules with other values in the field are left out.
+        """
+        ast = self.model[sec][ptype]
+        if ast.policy_index_size != len(ast.policy):
+            self._clear_policy_index(ast)
+
+        index = ast.policy_ip_index.get(field_index)
+        if index is None:
+            index = {}
+            for i, rule in enumerate(ast.policy):
+                if field_index < len(rule):
+                    self._add_to_ip_index(index, rule[field_index], i)
+            ast.policy_ip_index[field_index] = index
+
+        return index
+
+    def get_policy_ip_positions(self, sec, ptype, field_index, ip):
+        """gets the positions of the rules in a policy whose field is an IP address or CIDR pattern containing ip."""
+        positions = []
+        for (version, prefixlen), networks in self.get_policy_ip_index(sec, ptype, field_index).items():
+            if version == ip.version:
+                positions.append(networks.get(int(ip) >> (ip.max_prefixlen - prefixlen), []))
+
+        if len(positions) == 1:
+            return positions[0]
+        return sorted(itertools.chain.from_iterable(positions))
+
+    @staticmethod
+    def _add_to_ip_index(index, value, position):
+        network = parse_ip_network(value)
+        if network is None:
+            return
+
+        key = (network.version, network.prefixlen)
+        prefix = int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+        bisect.insort(index.setdefault(key, {}).setdefault(prefix, []), position)
+
+    @staticmethod
+    def _remove_from_ip_index(index, value, position):
+        network = parse_ip_network(value)
+        if network is None:
+            return
+
+        key = (network.version, network.prefixlen)
+        prefix = int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+        positions = index[key][prefix]
+        positions.remove(position)
+        if not positions:
+            del index[key][prefix]
+            if not index[key]:
+                del index[key]
+
+    @staticmethod
+    def _get_priority_index(ast):
+        """returns the index of the priority field of the rules, -1 if they have none."""
+        priority_token = ast.key + "_priority"
+        if priority_token not in ast.tokens:
+            return -1
+
+        return ast.tokens.index(priority_token)
+
+    @staticmethod
+    def _get_priority(rule, priority_index):
+        """returns the priority of a rule, raises if it isn't an integer."""
+        try:
+            return int(rule[priority_index])
+        except (ValueError, IndexError):
+            raise RuntimeError("the priority of the rule {} is not an integer".format(rule))
+
+    def _get_priority_position(self, ast, rule):
+        """returns where to insert a rule to keep a policy sorted by priority, after the rules with the same priority."""
+        priority_index = self._get_priority_index(ast)
+        if priority_index == -1:
+            return len(ast.policy)
+
+        priority = self._get_priority(rule, priority_index)
+        policy = ast.policy
+        if not policy or self._get_priority(policy[-1], priority_index) <= priority:
+            return len(policy)
+
+        low, high = 0, len(policy)
+        while low < high:
+            middle = (low + high) // 2
+            if priority < self._get_priority(policy[middle], priority_index):
+                high = middle
+            else:
+                low = middle + 1
+
+        return low
+
+    def _clear_policy_index(self, ast):
+        ast.policy_index = {}
+        ast.policy_ip_index = {}
+        ast.policy_size_valid = None
+        ast.policy_index_size = len(ast.policy)
+
+    def _add_to_policy_index(self, ast, rules):
+        if ast.policy_index_size + len(rules) != len(ast.policy):
+            self._clear_policy_index(ast)
+            return
+
+        for field_index, index in ast.policy_index.items():
+            for i, rule in enumerate(rules, ast.policy_index_size):
+                if field_index < len(rule):
+                    index.setdefault(rule[field_index], []).append(i)
+        for field_index, index in ast.policy_ip_index.items():
+            for i, rule in enumerate(rules, ast.policy_index_size):
+                if field_index < len(rule):
+                    self._add_to_ip_index(index, rule[field_index], i)
+        if ast.policy_size_valid and any(len(rule) != len(ast.tokens) for rule in rules):
+            ast.policy_size_valid = False
+        ast.policy_index_size = len(ast.policy)
+
+    def _remove_from_policy_index(self, ast, rule, position):
+        """removes the rule that was at position, the positions of the rules after it move down by one.
+        Shifting an index costs a pass over its values, so the indexes of fields whose values are mostly
+        distinct are dropped instead, to be rebuilt once by the next call.
+        """
+        if ast.policy_index_size - 1 != len(ast.policy):
+            self._clear_policy_index(ast)
+            return
+
+        max_values = max(len(ast.policy) // 4, 64)
+        for field_index, index in list(ast.policy_index.items()):
+            if len(index) > max_values:
+                del ast.policy_index[field_index]
+                continue
+            if field_index < len(rule):
+                positions = index[rule[field_index]]
+                del positions[bisect.bisect_left(positions, position)]
+                if not positions:
+                    del index[rule[field_index]]
+            for positions in index.values():
+                self._shift_positions(positions, position)
+
+        for field_index, index in list(ast.policy_ip_index.items()):
+            if sum(len(networks) for networks in index.values()) > max_values:
+                del ast.policy_ip_index[field_index]
+                continue
+            if field_index < len(rule):
+                self._remove_from_ip_index(index, rule[field_index], position)
+            for networks in index.values():
+                for positions in networks.values():
+                    self._shift_positions(positions, position)
+
+        if ast.policy_size_valid is False:
+            # the rule may have been the only invalid one
+            ast.policy_size_valid = None
+        ast.policy_index_size = len(ast.policy)
+
+    @staticmethod
+    def _shift_positions(positions, position):
+        start = bisect.bisect_right(positions, position)
+        if start < len(positions):
+            positions[start:] = [i - 1 for i in positions[start:]]
+
+    def _update_policy_index(self, ast, rule_index, old_rule, new_rule):
+        if ast.policy_index_size != len(ast.policy):
+            self._clear_policy_index(ast)
+            return
+
+        if len(new_rule) != len(ast.tokens):
+            ast.policy_size_valid = False
+        elif ast.policy_size_valid is False:
+            ast.policy_size_valid = None
+
+        for field_index, index in ast.policy_index.items():
+            old_value = old_rule[field_index] if field_index < len(old_rule) else None
+            new_value = new_rule[field_index] if field_index < len(new_rule) else None
+            if old_value == new_value:
+                continue
+            if field_index < len(old_rule):
+                positions = index[old_value]
+                positions.remove(rule_index)
+                if not positions:
+                    del index[old_value]
+            if field_index < len(new_rule):
+                bisect.insort(index.setdefault(new_value, []), rule_index)
+
+        for field_index, index in ast.policy_ip_index.items():
+            old_value = old_rule[field_index] if field_index < len(old_rule) else None
+            new_value = new_rule[field_index] if field_index < len(new_rule) else None
+            if old_value == new_value:
+                continue
+            if field_index < len(old_rule):
+                self._remove_from_ip_index(index, old_value, rule_index)
+            if field_index < len(new_rule):
+                self._add_to_ip_index(index, new_value, rule_index)
+
+    def _get_policy_map(self, ast):
+        """gets the number of occurrences of every rule in a policy, keyed by the rule as a tuple."""
+        if ast.policy_map is None or ast.policy_map_size != len(ast.policy):
+            # first use, or rules were appended without going through the model, e.g. by an adapter
+            policy_map = {}
+            for rule in ast.policy:
+                key = tuple(rule)
+                policy_map[key] = policy_map.get(key, 0) + 1
+            ast.policy_map = policy_map
+            ast.policy_map_size = len(ast.policy)
+
+        return ast.policy_map
+
+    def _clear_policy_map(self, ast):
+        ast.policy_map = None
+        ast.policy_map_size = 0
+
+    def _add_to_policy_map(self, ast, rules):
+        if ast.policy_map is None or ast.policy_map_size + len(rules) != len(ast.policy):
+            self._clear_policy_map(ast)
+            return
+
+        for rule in rules:
+            key = tuple(rule)
+            ast.policy_map[key] = ast.policy_map.get(key, 0) + 1
+        ast.policy_map_size = len(ast.policy)
+
+    def _remove_from_policy_map(self, ast, rules):
+        if ast.policy_map is None or ast.policy_map_size - len(rules) != len(ast.policy):
+            self._clear_policy_map(ast)
+            return
+
+        for rule in rules:
+            key = tuple(rule)
+            count = ast.policy_map[key] - 1
+            if count:
+                ast.policy_map[key] = count
+            else:
+                del ast.policy_map[key]
+        ast.policy_map_size = len(ast.policy)
+
+    def _update_policy_map(self, ast, old_rule, new_rule):
+        if ast.policy_map is None or ast.policy_map_size != len(ast.policy):
+            self._clear_policy_map(ast)
+            return
+
+        old_key = tuple(old_rule)
+        count = ast.policy_map[old_key] - 1
+        if count:
+            ast.policy_map[old_key] = count
+        else:
+            del ast.policy_map[old_key]
+
+        new_key = tuple(new_rule)
+        ast.policy_map[new_key] = ast.policy_map.get(new_key, 0) + 1
@@ -1,4 +1,8 @@
 from .adapter import *
 from .adapter_filtered import *
 from .batch_adapter import *
-from .adapters import *
\ No newline at end of file
+from .async_adapter import *
+from .async_batch_adapter import *
+from .async_watcher import *
+from .adapters import *
+from .snapshot import *
@@ -1,3 +1,8 @@
+import csv
+
+from casbin.util import gc_paused
+
+
 def load_policy_line(line, model):
     """loads a text line as a policy rule to model."""
 
@@ -20,6 +25,48 @@ def load_policy_line(line, model):
     model.model[sec][key].policy.append(tokens[1:])
 
 
+def load_policy_lines(lines, model):
+    """loads text lines as policy rules to model.
+    The values can be surrounded by whitespace and quoted to contain commas, e.g. p, alice, "data1, data2", read
+    """
+    with gc_paused():
+        policies = {}
+        for tokens in csv.reader(_get_policy_lines(lines), skipinitialspace=True):
+            key = tokens[0].strip()
+            if key not in policies:
+                sec = key[:1]
+                policies[key] = [] if sec in model.model.keys() and key in model.model[sec].keys() else None
+
+            policy = policies[key]
+            if policy is not None:
+                policy.append(list(map(str.strip, tokens[1:])))
+
+        for key, policy in policies.items():
+            if policy is not None:
+                model.model[key[:1]][key].policy.extend(policy)
+
+
+def get_policy_line(ptype, rule):
+    """returns the text line of a policy rule, read back by load_policy_lines.
+    The values are quoted as csv.writer does when they contain a comma, a quote or a line break.
+    """
+    return ", ".join([ptype] + [_quote_policy_value(value) for value in rule])
+
+
+def _quote_policy_value(value):
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _get_policy_lines(lines):
+    """skips the empty and comment lines."""
+    for line in lines:
+        line = line.strip()
+        if line != "" and line[:1] != "#":
+            yield line
+
+
 class Adapter:
     """the interface for Casbin adapters."""
 
@@ -44,3 +91,9 @@ class Adapter:
         This is part of the Auto-Save feature.
         """
         pass
+
+    def get_policy_version(self):
+        """returns a value that changes whenever the policy in the storage changes,
+        or None if the adapter can't tell, in which case the policy is always reloaded.
+        """
+        return None
@@ -1,2 +1,3 @@
 from .file_adapter import FileAdapter
-from .adapter_filtered import FilteredAdapter
\ No newline at end of file
+from .adapter_filtered import FilteredAdapter
+from .async_file_adapter import AsyncFileAdapter
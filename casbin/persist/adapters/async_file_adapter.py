@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+from casbin import persist
+from .file_adapter import FileAdapter
+
+
+class AsyncFileAdapter(persist.AsyncBatchAdapter):
+    """the async file adapter for Casbin, the file is read and written by the default executor of the event loop.
+    It can load policy from file or save policy to file.
+    """
+
+    def __init__(self, file_path):
+        self._adapter = FileAdapter(file_path)
+
+    async def load_policy(self, model):
+        await self._run(self._adapter.load_policy, model)
+
+    async def save_policy(self, model):
+        # the policy is read before leaving the event loop, where it can be changed while the file is written
+        text = self._adapter._get_policy_text(model)
+        await self._run(self._save_policy_text, text)
+
+    async def get_policy_version(self):
+        return await self._run(self._adapter.get_policy_version)
+
+    def _save_policy_text(self, text):
+        if not os.path.isfile(self._adapter._file_path):
+            raise RuntimeError("invalid file path, file path cannot be empty")
+
+        self._adapter._write_policy_text(text)
+
+    @staticmethod
+    async def _run(func, *args):
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+
+    async def add_policy(self, sec, ptype, rule):
+        pass
+
+    async def add_policies(self, sec, ptype, rules):
+        pass
+
+    async def remove_policy(self, sec, ptype, rule):
+        pass
+
+    async def remove_policies(self, sec, ptype, rules):
+        pass
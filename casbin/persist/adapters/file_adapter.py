@@ -22,32 +22,39 @@ class FileAdapter(persist.Adapter):
 
         self._save_policy_file(model)
 
+    def get_policy_version(self):
+        if not os.path.isfile(self._file_path):
+            return None
+
+        stat = os.stat(self._file_path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
     def _load_policy_file(self, model):
-        with open(self._file_path, "rb") as file:
-            line = file.readline()
-            while line:
-                persist.load_policy_line(line.decode().strip(), model)
-                line = file.readline()
+        with open(self._file_path, "r", encoding="utf-8", newline="", buffering=1024 * 1024) as file:
+            persist.load_policy_lines(file, model)
 
     def _save_policy_file(self, model):
-        with open(self._file_path, "w") as file:
-            lines = []
+        self._write_policy_text(self._get_policy_text(model))
+
+    @staticmethod
+    def _get_policy_text(model):
+        lines = []
 
-            if "p" in model.model.keys():
-                for key, ast in model.model["p"].items():
-                    for pvals in ast.policy:
-                        lines.append(key + ", " + ", ".join(pvals))
+        if "p" in model.model.keys():
+            for key, ast in model.model["p"].items():
+                for pvals in ast.policy:
+                    lines.append(persist.get_policy_line(key, pvals))
 
-            if "g" in model.model.keys():
-                for key, ast in model.model["g"].items():
-                    for pvals in ast.policy:
-                        lines.append(key + ", " + ", ".join(pvals))
+        if "g" in model.model.keys():
+            for key, ast in model.model["g"].items():
+                for pvals in ast.policy:
+                    lines.append(persist.get_policy_line(key, pvals))
 
-            for i, line in enumerate(lines):
-                if i != len(lines) - 1:
-                    lines[i] += "\n"
+        return "\n".join(lines)
 
-            file.writelines(lines)
+    def _write_policy_text(self, text):
+        with open(self._file_path, "w") as file:
+            file.write(text)
 
     def add_policy(self, sec, ptype, rule):
         pass
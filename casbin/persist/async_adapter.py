@@ -0,0 +1,30 @@
+class AsyncAdapter:
+    """the interface for Casbin adapters whose methods are coroutines, used by AsyncEnforcer."""
+
+    async def load_policy(self, model):
+        """loads all policy rules from the storage."""
+        pass
+
+    async def save_policy(self, model):
+        """saves all policy rules to the storage."""
+        pass
+
+    async def add_policy(self, sec, ptype, rule):
+        """adds a policy rule to the storage."""
+        pass
+
+    async def remove_policy(self, sec, ptype, rule):
+        """removes a policy rule from the storage."""
+        pass
+
+    async def remove_filtered_policy(self, sec, ptype, field_index, *field_values):
+        """removes policy rules that match the filter from the storage.
+        This is part of the Auto-Save feature.
+        """
+        pass
+
+    async def get_policy_version(self):
+        """returns a value that changes whenever the policy in the storage changes,
+        or None if the adapter can't tell, in which case the policy is always reloaded.
+        """
+        return None
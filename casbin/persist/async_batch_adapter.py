@@ -0,0 +1,11 @@
+from .async_adapter import AsyncAdapter
+
+"""AsyncBatchAdapter is the interface for async Casbin adapters with multiple add and remove policy functions."""
+class AsyncBatchAdapter(AsyncAdapter):
+    async def add_policies(self, sec, ptype, rules):
+        """adds policy rules to the storage."""
+        pass
+
+    async def remove_policies(self, sec, ptype, rules):
+        """removes policy rules from the storage."""
+        pass
@@ -0,0 +1,6 @@
+class AsyncWatcher:
+    """the interface for Casbin watchers whose methods are coroutines, used by AsyncEnforcer."""
+
+    async def update(self):
+        """notifies the other instances that the policy has been changed."""
+        pass
@@ -0,0 +1,48 @@
+import json
+import os
+import struct
+
+from casbin.util import gc_paused
+
+SNAPSHOT_MAGIC = b"CASBINSS"
+SNAPSHOT_VERSION = 2
+
+_HEADER = struct.Struct("<8sH")
+
+
+def write_snapshot(path, snapshot):
+    """writes a snapshot to a file, the file is replaced only once the snapshot is completely written.
+    The snapshot holds plain data only, lists, dicts, strings and numbers, stored as JSON after a header.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION))
+        file.write(json.dumps(snapshot, separators=(",", ":")).encode("utf-8"))
+
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """reads a snapshot written by write_snapshot, it only ever creates plain data."""
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if len(data) < _HEADER.size:
+        raise RuntimeError("invalid snapshot file: " + path)
+
+    magic, version = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise RuntimeError("invalid snapshot file: " + path)
+    if version != SNAPSHOT_VERSION:
+        raise RuntimeError("unsupported snapshot version: {}".format(version))
+
+    try:
+        with gc_paused():
+            snapshot = json.loads(data[_HEADER.size:].decode("utf-8"))
+    except ValueError:
+        raise RuntimeError("invalid snapshot file: " + path)
+
+    if not isinstance(snapshot, dict):
+        raise RuntimeError("invalid snapshot file: " + path)
+
+    return snapshot
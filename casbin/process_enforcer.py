@@ -0,0 +1,638 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+
+from casbin.enforcer import Enforcer
+from casbin.model import Model
+
+
+def _run_worker(conn, definitions, snapshot_path):
+    """serves the calls sent by ProcessPoolEnforcer to the enforcer of a worker process."""
+    m = Model()
+    for sec, key, value in definitions:
+        m.add_def(sec, key, value)
+
+    e = Enforcer(m)
+    e.load_snapshot(snapshot_path)
+    conn.send((True, None))
+
+    while True:
+        try:
+            call = conn.recv()
+        except EOFError:
+            break
+
+        if call is None:
+            break
+
+        name, args = call
+        try:
+            result = getattr(e, name)(*args)
+        except Exception as ex:
+            conn.send((False, ex))
+        else:
+            conn.send((True, result))
+
+    conn.close()
+
+
+class ProcessPoolEnforcer():
+
+    """ProcessPoolEnforcer enforces with a pool of worker processes that each hold an Enforcer,
+    so that enforcing scales with the number of cores when the matcher is expensive to evaluate.
+    The policy is loaded by an enforcer in this process and handed to the workers with a snapshot,
+    the changes made to it are then made in every worker.
+
+    enforce keeps a worker busy per request, enforce_batch splits the requests between all the workers.
+    The functions, effectors and matching functions given to it must be picklable.
+    close has to be called to stop the workers.
+    """
+
+    def __init__(self, model=None, adapter=None, processes=None):
+        self._e = Enforcer(model, adapter)
+        self._snapshot_dir = tempfile.mkdtemp(prefix="casbin-")
+        self._snapshot_path = os.path.join(self._snapshot_dir, "policy.snapshot")
+        self._e.save_snapshot(self._snapshot_path)
+
+        self._workers = []
+        # the workers waiting for a request
+        self._idle = queue.Queue()
+        # taken to get several workers, so that two callers never wait for the workers held by each other
+        self._acquire_lock = threading.Lock()
+        # taken to change the policy, so that the workers make the changes in the same order
+        self._update_lock = threading.Lock()
+
+        definitions = self._e.get_model().get_definitions()
+        for _ in range(processes or os.cpu_count() or 1):
+            conn, worker_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_worker, args=(worker_conn, definitions, self._snapshot_path), daemon=True)
+            process.start()
+            worker_conn.close()
+            self._workers.append((process, conn))
+
+        try:
+            for _, conn in self._workers:
+                self._receive(conn)
+        except Exception:
+            self.close()
+            raise
+
+        for i in range(len(self._workers)):
+            self._idle.put(i)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        """stops the worker processes."""
+        for process, conn in self._workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+
+        for process, conn in self._workers:
+            process.join()
+
+        self._workers = []
+        shutil.rmtree(self._snapshot_dir, ignore_errors=True)
+
+    @staticmethod
+    def _receive(conn):
+        ok, result = conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _call_worker(self, name, *args):
+        i = self._idle.get()
+        try:
+            conn = self._workers[i][1]
+            conn.send((name, args))
+            return self._receive(conn)
+        finally:
+            self._idle.put(i)
+
+    def _call_workers(self, calls):
+        """sends each (name, args) call to a different worker, returns the results in the same order."""
+        with self._acquire_lock:
+            workers = [self._idle.get() for _ in calls]
+
+        try:
+            for i, call in zip(workers, calls):
+                self._workers[i][1].send(call)
+
+            results = []
+            error = None
+            for i in workers:
+                try:
+                    results.append(self._receive(self._workers[i][1]))
+                except Exception as ex:
+                    error = error or ex
+            if error is not None:
+                raise error
+
+            return results
+        finally:
+            for i in workers:
+                self._idle.put(i)
+
+    def _update(self, name, *args):
+        """changes the policy of the enforcer of this process, then makes the same change in every worker."""
+        with self._update_lock:
+            result = getattr(self._e, name)(*args)
+            self._call_workers([(name, args)] * len(self._workers))
+            return result
+
+    def _reload(self, name, *args):
+        """reloads the policy of the enforcer of this process, then hands it to the workers with a snapshot."""
+        with self._update_lock:
+            getattr(self._e, name)(*args)
+            self._e.save_snapshot(self._snapshot_path)
+            self._call_workers([("load_snapshot", (self._snapshot_path,))] * len(self._workers))
+
+    def enforce(self, *rvals):
+        """decides whether a "subject" can access a "object" with the operation "action",
+        input parameters are usually: (sub, obj, act).
+        """
+        return self._call_worker("enforce", *rvals)
+
+    def enforce_ex(self, *rvals):
+        """decides whether a "subject" can access a "object" with the operation "action",
+        input parameters are usually: (sub, obj, act).
+        return judge result with reason
+        """
+        return self._call_worker("enforce_ex", *rvals)
+
+    def enforce_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the results in the order of the requests
+        """
+        return self._enforce_batch("enforce_batch", requests)
+
+    def enforce_ex_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the judge results with reasons in the order of the requests
+        """
+        return self._enforce_batch("enforce_ex_batch", requests)
+
+    def _enforce_batch(self, name, requests):
+        requests = list(requests)
+        if not requests:
+            return []
+
+        size = -(-len(requests) // len(self._workers))
+        calls = [(name, (requests[i:i + size],)) for i in range(0, len(requests), size)]
+
+        results = []
+        for chunk_results in self._call_workers(calls):
+            results.extend(chunk_results)
+        return results
+
+    def get_adapter(self):
+        """gets the current adapter."""
+        return self._e.get_adapter()
+
+    def set_adapter(self, adapter):
+        """sets the current adapter."""
+        self._e.set_adapter(adapter)
+
+    def set_watcher(self, watcher):
+        """sets the current watcher."""
+        self._e.set_watcher(watcher)
+
+    def load_policy(self):
+        """reloads the policy from file/database."""
+        self._reload("load_policy")
+
+    def load_filtered_policy(self, filter):
+        """reloads a filtered policy from file/database."""
+        self._reload("load_filtered_policy", filter)
+
+    def load_snapshot(self, path):
+        """reloads the policy saved by save_snapshot instead of loading it from the adapter."""
+        self._reload("load_snapshot", path)
+
+    def save_policy(self):
+        return self._e.save_policy()
+
+    def get_model(self):
+        """gets the current model."""
+        return self._e.get_model()
+
+    def get_role_manager(self):
+        """gets the current role manager."""
+        return self._e.get_role_manager()
+
+    def set_effector(self, eft):
+        """sets the current effector."""
+        return self._update("set_effector", eft)
+
+    def clear_policy(self):
+        """ clears all policy."""
+        return self._update("clear_policy")
+
+    def save_snapshot(self, path):
+        """saves the loaded policy and the role links to a file that can be loaded by load_snapshot."""
+        return self._e.save_snapshot(path)
+
+    def build_role_links(self):
+        """manually rebuild the role inheritance relations."""
+        return self._update("build_role_links")
+
+    def get_all_subjects(self):
+        """gets the list of subjects that show up in the current policy."""
+        return self._e.get_all_subjects()
+
+    def get_all_named_subjects(self, ptype):
+        """gets the list of subjects that show up in the current named policy."""
+        return self._e.get_all_named_subjects(ptype)
+
+    def get_all_objects(self):
+        """gets the list of objects that show up in the current policy."""
+        return self._e.get_all_objects()
+
+    def get_all_named_objects(self, ptype):
+        """gets the list of objects that show up in the current named policy."""
+        return self._e.get_all_named_objects(ptype)
+
+    def get_all_actions(self):
+        """gets the list of actions that show up in the current policy."""
+        return self._e.get_all_actions()
+
+    def get_all_named_actions(self, ptype):
+        """gets the list of actions that show up in the current named policy."""
+        return self._e.get_all_named_actions(ptype)
+
+    def get_all_roles(self):
+        """gets the list of roles that show up in the current named policy."""
+        return self._e.get_all_roles()
+
+    def get_all_named_roles(self, ptype):
+        """gets all the authorization rules in the policy."""
+        return self._e.get_all_named_roles(ptype)
+
+    def get_policy(self):
+        """gets all the authorization rules in the policy."""
+        return self._e.get_policy()
+
+    def get_filtered_policy(self, field_index, *field_values):
+        """gets all the authorization rules in the policy, field filters can be specified."""
+        return self._e.get_filtered_policy(field_index, *field_values)
+
+    def get_named_policy(self, ptype):
+        """gets all the authorization rules in the named policy."""
+        return self._e.get_named_policy(ptype)
+
+    def get_filtered_named_policy(self, ptype, field_index, *field_values):
+        """gets all the authorization rules in the named policy, field filters can be specified."""
+        return self._e.get_filtered_named_policy(ptype, field_index, *field_values)
+
+    def get_grouping_policy(self):
+        """gets all the role inheritance rules in the policy."""
+        return self._e.get_grouping_policy()
+
+    def get_filtered_grouping_policy(self, field_index, *field_values):
+        """gets all the role inheritance rules in the policy, field filters can be specified."""
+        return self._e.get_filtered_grouping_policy(field_index, *field_values)
+
+    def get_named_grouping_policy(self, ptype):
+        """gets all the role inheritance rules in the policy."""
+        return self._e.get_named_grouping_policy(ptype)
+
+    def get_filtered_named_grouping_policy(self, ptype, field_index, *field_values):
+        """gets all the role inheritance rules in the policy, field filters can be specified."""
+        return self._e.get_filtered_named_grouping_policy(ptype, field_index, *field_values)
+
+    def has_policy(self, *params):
+        """determines whether an authorization rule exists."""
+        return self._e.has_policy(*params)
+
+    def has_named_policy(self, ptype, *params):
+        """determines whether a named authorization rule exists."""
+        return self._e.has_named_policy(ptype, *params)
+
+    def add_policy(self, *params):
+        """adds an authorization rule to the current policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return self._update("add_policy", *params)
+
+    def add_named_policy(self, ptype, *params):
+        """adds an authorization rule to the current named policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return self._update("add_named_policy", ptype, *params)
+
+    def update_policy(self, old_rule, new_rule):
+        """updates an authorization rule from the current policy."""
+        return self._update("update_policy", old_rule, new_rule)
+
+    def update_policies(self, old_rules, new_rules):
+        """updates authorization rules from the current policy."""
+        return self._update("update_policies", old_rules, new_rules)
+
+    def update_named_policy(self, ptype, old_rule, new_rule):
+        """updates an authorization rule from the current named policy."""
+        return self._update("update_named_policy", ptype, old_rule, new_rule)
+
+    def update_named_policies(self, ptype, old_rules, new_rules):
+        """updates authorization rules from the current named policy."""
+        return self._update("update_named_policies", ptype, old_rules, new_rules)
+
+    def remove_policy(self, *params):
+        """removes an authorization rule from the current policy."""
+        return self._update("remove_policy", *params)
+
+    def remove_filtered_policy(self, field_index, *field_values):
+        """removes an authorization rule from the current policy, field filters can be specified."""
+        return self._update("remove_filtered_policy", field_index, *field_values)
+
+    def remove_named_policy(self, ptype, *params):
+        """removes an authorization rule from the current named policy."""
+        return self._update("remove_named_policy", ptype, *params)
+
+    def remove_filtered_named_policy(self, ptype, field_index, *field_values):
+        """removes an authorization rule from the current named policy, field filters can be specified."""
+        return self._update("remove_filtered_named_policy", ptype, field_index, *field_values)
+
+    def has_grouping_policy(self, *params):
+        """determines whether a role inheritance rule exists."""
+        return self._e.has_grouping_policy(*params)
+
+    def has_named_grouping_policy(self, ptype, *params):
+        """determines whether a named role inheritance rule exists."""
+        return self._e.has_named_grouping_policy(ptype, *params)
+
+    def add_grouping_policy(self, *params):
+        """adds a role inheritance rule to the current policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return self._update("add_grouping_policy", *params)
+
+    def add_named_grouping_policy(self, ptype, *params):
+        """adds a named role inheritance rule to the current policy.
+        If the rule already exists, the function returns false and the rule will not be added.
+        Otherwise the function returns true by adding the new rule.
+        """
+        return self._update("add_named_grouping_policy", ptype, *params)
+
+    def remove_grouping_policy(self, *params):
+        """removes a role inheritance rule from the current policy."""
+        return self._update("remove_grouping_policy", *params)
+
+    def remove_filtered_grouping_policy(self, field_index, *field_values):
+        """removes a role inheritance rule from the current policy, field filters can be specified."""
+        return self._update("remove_filtered_grouping_policy", field_index, *field_values)
+
+    def remove_named_grouping_policy(self, ptype, *params):
+        """removes a role inheritance rule from the current named policy."""
+        return self._update("remove_named_grouping_policy", ptype, *params)
+
+    def remove_filtered_named_grouping_policy(self, ptype, field_index, *field_values):
+        """removes a role inheritance rule from the current named policy, field filters can be specified."""
+        return self._update("remove_filtered_named_grouping_policy", ptype, field_index, *field_values)
+
+    def add_function(self, name, func):
+        """adds a customized function."""
+        return self._update("add_function", name, func)
+
+    # enforcer.py
+
+    def get_roles_for_user(self, name):
+        """ gets the roles that a user has. """
+        return self._e.get_roles_for_user(name)
+
+    def get_users_for_role(self, name):
+        """ gets the users that has a role. """
+        return self._e.get_users_for_role(name)
+
+    def has_role_for_user(self, name, role):
+        """ determines whether a user has a role. """
+        return self._e.has_role_for_user(name, role)
+
+    def add_role_for_user(self, user, role):
+        """
+        adds a role for a user.
+        Returns false if the user already has the role (aka not affected).
+        """
+        return self._update("add_role_for_user", user, role)
+
+    def delete_role_for_user(self, user, role):
+        """
+        deletes a role for a user.
+        Returns false if the user does not have the role (aka not affected).
+        """
+        return self._update("delete_role_for_user", user, role)
+
+    def delete_roles_for_user(self, user):
+        """
+        deletes all roles for a user.
+        Returns false if the user does not have any roles (aka not affected).
+        """
+        return self._update("delete_roles_for_user", user)
+
+    def delete_user(self, user):
+        """
+        deletes a user.
+        Returns false if the user does not exist (aka not affected).
+        """
+        return self._update("delete_user", user)
+
+    def delete_role(self, role):
+        """
+        deletes a role.
+        Returns false if the role does not exist (aka not affected).
+        """
+        return self._update("delete_role", role)
+
+    def delete_permission(self, *permission):
+        """
+        deletes a permission.
+        Returns false if the permission does not exist (aka not affected).
+        """
+        return self._update("delete_permission", *permission)
+
+    def add_permission_for_user(self, user, *permission):
+        """
+        adds a permission for a user or role.
+        Returns false if the user or role already has the permission (aka not affected).
+        """
+        return self._update("add_permission_for_user", user, *permission)
+
+    def delete_permission_for_user(self, user, *permission):
+        """
+        deletes a permission for a user or role.
+        Returns false if the user or role does not have the permission (aka not affected).
+        """
+        return self._update("delete_permission_for_user", user, *permission)
+
+    def delete_permissions_for_user(self, user):
+        """
+        deletes permissions for a user or role.
+        Returns false if the user or role does not have any permissions (aka not affected).
+        """
+        return self._update("delete_permissions_for_user", user)
+
+    def get_permissions_for_user(self, user):
+        """
+        gets permissions for a user or role.
+        """
+        return self._e.get_permissions_for_user(user)
+
+    def has_permission_for_user(self, user, *permission):
+        """
+        determines whether a user has a permission.
+        """
+        return self._e.has_permission_for_user(user, *permission)
+
+    def get_implicit_roles_for_user(self, name, *domain):
+        """
+        gets implicit roles that a user has.
+        Compared to get_roles_for_user(), this function retrieves indirect roles besides direct roles.
+        For example:
+        g, alice, role:admin
+        g, role:admin, role:user
+
+        get_roles_for_user("alice") can only get: ["role:admin"].
+        But get_implicit_roles_for_user("alice") will get: ["role:admin", "role:user"].
+        """
+        return self._e.get_implicit_roles_for_user(name, *domain)
+
+    def get_implicit_permissions_for_user(self, user, *domain):
+        """
+        gets implicit permissions for a user or role.
+        Compared to get_permissions_for_user(), this function retrieves permissions for inherited roles.
+        For example:
+        p, admin, data1, read
+        p, alice, data2, read
+        g, alice, admin
+
+        get_permissions_for_user("alice") can only get: [["alice", "data2", "read"]].
+        But get_implicit_permissions_for_user("alice") will get: [["admin", "data1", "read"], ["alice", "data2", "read"]].
+        """
+        return self._e.get_implicit_permissions_for_user(user, *domain)
+
+    def get_implicit_users_for_permission(self, *permission):
+        """
+        gets implicit users for a permission.
+        For example:
+        p, admin, data1, read
+        p, bob, data1, read
+        g, alice, admin
+
+        get_implicit_users_for_permission("data1", "read") will get: ["alice", "bob"].
+        Note: only users will be returned, roles (2nd arg in "g") will be excluded.
+        """
+        return self._e.get_implicit_users_for_permission(*permission)
+
+    def get_roles_for_user_in_domain(self, name, domain):
+        """gets the roles that a user has inside a domain."""
+        return self._e.get_roles_for_user_in_domain(name, domain)
+
+    def get_users_for_role_in_domain(self, name, domain):
+        """gets the users that has a role inside a domain."""
+        return self._e.get_users_for_role_in_domain(name, domain)
+
+    def add_role_for_user_in_domain(self, user, role, domain):
+        """adds a role for a user inside a domain."""
+        """Returns false if the user already has the role (aka not affected)."""
+        return self._update("add_role_for_user_in_domain", user, role, domain)
+
+    def delete_roles_for_user_in_domain(self, user, role, domain):
+        """deletes a role for a user inside a domain."""
+        """Returns false if the user does not have any roles (aka not affected)."""
+        return self._update("delete_roles_for_user_in_domain", user, role, domain)
+
+    def get_permissions_for_user_in_domain(self, user, domain):
+        """gets permissions for a user or role inside domain."""
+        return self._e.get_permissions_for_user_in_domain(user, domain)
+
+    def enable_auto_build_role_links(self, auto_build_role_links):
+        """controls whether to rebuild the role inheritance relations when a role is added or deleted."""
+        return self._update("enable_auto_build_role_links", auto_build_role_links)
+
+    def enable_auto_save(self, auto_save):
+        """controls whether to save a policy rule automatically to the adapter when it is added or removed."""
+        return self._e.enable_auto_save(auto_save)
+
+    def enable_enforce(self, enabled=True):
+        """changes the enforcing state of Casbin,
+        when Casbin is disabled, all access will be allowed by the Enforce() function.
+        """
+        return self._update("enable_enforce", enabled)
+
+    def enable_policy_index(self, index_policy=True):
+        """controls whether enforce only evaluates the policy rules that can match the request."""
+        return self._update("enable_policy_index", index_policy)
+
+    def add_named_matching_func(self, ptype, fn):
+        """add_named_matching_func add MatchingFunc by ptype RoleManager"""
+        return self._update("add_named_matching_func", ptype, fn)
+
+    def add_named_domain_matching_func(self, ptype, fn):
+        """add_named_domain_matching_func add MatchingFunc by ptype to RoleManager"""
+        return self._update("add_named_domain_matching_func", ptype, fn)
+
+    def is_filtered(self):
+        """returns true if the loaded policy has been filtered."""
+        return self._e.is_filtered()
+
+    def add_policies(self,rules):
+        """adds authorization rules to the current policy.
+
+        If the rule already exists, the function returns false for the corresponding rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding rule by adding the new rule.
+        """
+        return self._update("add_policies", rules)
+
+    def add_named_policies(self,ptype,rules):
+        """adds authorization rules to the current named policy.
+
+        If the rule already exists, the function returns false for the corresponding rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding by adding the new rule."""
+        return self._update("add_named_policies", ptype,rules)
+
+    def remove_policies(self,rules):
+        """removes authorization rules from the current policy."""
+        return self._update("remove_policies", rules)
+
+    def remove_named_policies(self,ptype,rules):
+        """removes authorization rules from the current named policy."""
+        return self._update("remove_named_policies", ptype,rules)
+
+    def add_grouping_policies(self,rules):
+        """adds role inheritance rulea to the current policy.
+
+        If the rule already exists, the function returns false for the corresponding policy rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding policy rule by adding the new rule.
+        """
+        return self._update("add_grouping_policies", rules)
+
+    def add_named_grouping_policies(self,ptype,rules):
+        """"adds named role inheritance rules to the current policy.
+
+        If the rule already exists, the function returns false for the corresponding policy rule and the rule will not be added.
+        Otherwise the function returns true for the corresponding policy rule by adding the new rule."""
+        return self._update("add_named_grouping_policies", ptype,rules)
+
+    def remove_grouping_policies(self,rules):
+        """removes role inheritance rulea from the current policy."""
+        return self._update("remove_grouping_policies", rules)
+
+    def remove_named_grouping_policies(self,ptype,rules):
+        """ removes role inheritance rules from the current named policy."""
+        return self._update("remove_named_grouping_policies", ptype,rules)
@@ -1 +1,2 @@
-from .role_manager import RoleManager
\ No newline at end of file
+from .role_manager import RoleManager
+from .role_manager import DomainManager
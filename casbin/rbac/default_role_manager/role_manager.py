@@ -1,6 +1,11 @@
 import logging
 
+from casbin import rbac
 from casbin.rbac import RoleManager
+from casbin.util import PATTERN_CACHE_SIZE, is_pattern
+
+# the roles of a name that isn't a role
+NO_ROLES = frozenset()
 
 
 class RoleManager(RoleManager):
@@ -13,14 +18,27 @@ class RoleManager(RoleManager):
         self.logger = logging.getLogger(__name__)
         self.all_roles = dict()
         self.max_hierarchy_level = max_hierarchy_level
+        # name -> names of all the roles it inherits, computed on first use by has_link
+        self.ancestors = dict()
         self.matching_func = None
         self.domain_matching_func = None
         self.has_pattern = None
         self.has_domain_pattern = None
+        # name -> Role for the roles that are patterns for matching_func, the other roles only match themselves
+        self.pattern_roles = dict()
+        # name -> names of the pattern roles it matches, computed on first use and dropped when a pattern is added
+        self.matching_patterns = dict()
 
     def add_matching_func(self, fn=None):
         self.has_pattern = True
         self.matching_func = fn
+        self.ancestors.clear()
+        self.matching_patterns.clear()
+        self.pattern_roles = dict()
+        if fn is not None:
+            for name, role in self.all_roles.items():
+                if is_pattern(fn, name):
+                    self.pattern_roles[name] = role
 
     def add_domain_matching_func(self, fn=None):
         self.has_domain_pattern = True
@@ -30,19 +48,136 @@ class RoleManager(RoleManager):
         if self.matching_func is None:
             return name in self.all_roles.keys()
         else:
-            for key in self.all_roles.keys():
-                if self.matching_func(name, key):
-                    return True
-        return False
+            return len(self._get_matching_roles(name)) > 0
 
     def create_role(self, name):
-        if name not in self.all_roles.keys():
-            self.all_roles[name] = Role(name)
+        role = self.all_roles.get(name)
+        if role is None:
+            role = self.all_roles[name] = Role(name)
+            if self.matching_func is not None and is_pattern(self.matching_func, name):
+                self.pattern_roles[name] = role
+                self.matching_patterns.clear()
 
-        return self.all_roles[name]
+        return role
 
     def clear(self):
         self.all_roles.clear()
+        self.ancestors.clear()
+        self.pattern_roles.clear()
+        self.matching_patterns.clear()
+
+    def _get_matching_patterns(self, name):
+        """gets the names of the pattern roles that name matches."""
+        patterns = self.matching_patterns.get(name)
+        if patterns is None:
+            if len(self.matching_patterns) >= PATTERN_CACHE_SIZE:
+                self.matching_patterns.clear()
+            patterns = [key for key in self.pattern_roles if self.matching_func(name, key)]
+            self.matching_patterns[name] = patterns
+
+        return patterns
+
+    def _get_matching_roles(self, name):
+        """gets the names of the roles that name matches with matching_func."""
+        if name in self.all_roles and name not in self.pattern_roles:
+            return [name] + self._get_matching_patterns(name)
+
+        return self._get_matching_patterns(name)
+
+    def copy(self):
+        """returns a role manager with the same roles and functions that can be changed without affecting this one."""
+        rm = RoleManager(self.max_hierarchy_level)
+        rm.matching_func = self.matching_func
+        rm.domain_matching_func = self.domain_matching_func
+        rm.has_pattern = self.has_pattern
+        rm.has_domain_pattern = self.has_domain_pattern
+        rm.set_role_graph(*self.get_role_graph())
+        # the sets of ancestors are replaced rather than changed, so they can be shared
+        rm.ancestors = dict(self.ancestors)
+
+        return rm
+
+    def get_role_graph(self):
+        """gets the names of all the roles and the links between them as pairs of positions in the names."""
+        names = list(self.all_roles.keys())
+        positions = {name: i for i, name in enumerate(names)}
+        links = []
+        for i, role in enumerate(self.all_roles.values()):
+            for name in role.roles:
+                links.append((i, positions[name]))
+
+        return names, links
+
+    def set_role_graph(self, names, links):
+        """replaces all the roles with a graph returned by get_role_graph."""
+        self.clear()
+        roles = [self.create_role(name) for name in names]
+        for i, j in links:
+            roles[i].add_role(roles[j])
+
+    def get_ancestors(self, name):
+        """gets the names of all the roles that name inherits within max_hierarchy_level."""
+        ancestors = self.ancestors.get(name)
+        if ancestors is not None:
+            return ancestors
+
+        if name not in self.all_roles:
+            # not remembered, any name can be looked up
+            return NO_ROLES
+
+        ancestors = set()
+        level = [self.all_roles[name]]
+        # Role.has_role follows max_hierarchy_level links past the direct roles
+        for _ in range(self.max_hierarchy_level + 1):
+            next_level = []
+            for role in level:
+                for r in role.roles.values():
+                    if r.name not in ancestors:
+                        ancestors.add(r.name)
+                        next_level.append(r)
+            if not next_level:
+                break
+            level = next_level
+
+        self.ancestors[name] = ancestors
+        return ancestors
+
+    def get_all_roles_of(self, name, *domain):
+        """gets the names of all the roles that name inherits, the ones of the names it matches with matching_func.
+        domain is a prefix to the roles.
+        """
+        if len(domain) == 1:
+            prefix = domain[0] + "::"
+            name = prefix + name
+        elif len(domain) > 1:
+            raise RuntimeError("error: domain should be 1 parameter")
+
+        if self.matching_func is None:
+            roles = self.get_ancestors(name)
+        else:
+            roles = set()
+            for key in self._get_matching_roles(name):
+                roles.update(self.get_ancestors(key))
+
+        if len(domain) == 1:
+            roles = {role[len(prefix):] for role in roles if role.startswith(prefix)}
+
+        return roles
+
+    def _clear_ancestors(self, role):
+        """drops the memoized ancestors of a role whose roles changed and of everyone inheriting it."""
+        if not self.ancestors:
+            return
+
+        visited = {role.name}
+        queue = [role]
+        while queue:
+            r = queue.pop()
+            self.ancestors.pop(r.name, None)
+            for user in r.users.values():
+                if user.name not in visited:
+                    visited.add(user.name)
+                    queue.append(user)
 
     def add_link(self, name1, name2, *domain):
         if len(domain) == 1:
@@ -54,17 +189,26 @@ class RoleManager(RoleManager):
         role1 = self.create_role(name1)
         role2 = self.create_role(name2)
         role1.add_role(role2)
+        self._clear_ancestors(role1)
 
         if self.matching_func is not None:
-            for key, role in self.all_roles.items():
-                if self.matching_func(key, name1) and name1 != key:
+            # the links added for the patterns change the roles of the names they match
+            self.ancestors.clear()
+            # a role matching a name that isn't a pattern can only be the role of that name
+            if name1 in self.pattern_roles:
+                for key, role in self.all_roles.items():
+                    if self.matching_func(key, name1) and name1 != key:
+                        role.add_role(role1)
+            if name2 in self.pattern_roles:
+                for key, role in self.all_roles.items():
+                    if self.matching_func(key, name2) and name2 != key:
+                        role2.add_role(role)
+            for key in self._get_matching_patterns(name1):
+                if name1 != key:
                     self.all_roles[key].add_role(role1)
-                if self.matching_func(key, name2) and name2 != key:
-                    self.all_roles[name2].add_role(role)
-                if self.matching_func(name1, key) and name1 != key:
-                    self.all_roles[key].add_role(role1)
-                if self.matching_func(name2, key) and name2 != key:
-                    self.all_roles[name2].add_role(role)
+            for key in self._get_matching_patterns(name2):
+                if name2 != key:
+                    role2.add_role(self.all_roles[key])
 
     def delete_link(self, name1, name2, *domain):
         if len(domain) == 1:
@@ -79,6 +223,7 @@ class RoleManager(RoleManager):
         role1 = self.create_role(name1)
         role2 = self.create_role(name2)
         role1.delete_role(role2)
+        self._clear_ancestors(role1)
 
     def has_link(self, name1, name2, *domain):
         if len(domain) == 1:
@@ -94,12 +239,10 @@ class RoleManager(RoleManager):
             return False
 
         if self.matching_func is None:
-            role1 = self.create_role(name1)
-            return role1.has_role(name2, self.max_hierarchy_level)
+            return name2 in self.get_ancestors(name1)
         else:
-            for key, role in self.all_roles.items():
-                if self.matching_func(name1, key) and role.has_role(name2, self.max_hierarchy_level,
-                                                                    self.matching_func):
+            for key in self._get_matching_roles(name1):
+                if self.all_roles[key].has_role(name2, self.max_hierarchy_level, self.matching_func):
                     return True
             return False
 
@@ -131,20 +274,20 @@ class RoleManager(RoleManager):
         elif len(domain) > 1:
             return RuntimeError("error: domain should be 1 parameter")
 
-        if not self.has_role(name):
+        if not self.has_role(name) or name not in self.all_roles:
             return []
 
-        names = []
-        for role in self.all_roles.values():
-            if role.has_direct_role(name):
-                if len(domain) == 1:
-                    names.append(role.name[len(domain[0]) + 2:])
-                else:
-                    names.append(role.name)
+        names = self.all_roles[name].get_users()
+        if len(domain) == 1:
+            for key, value in enumerate(names):
+                names[key] = value[len(domain[0]) + 2:]
 
         return names
 
     def print_roles(self):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         line = []
         for role in self.all_roles.values():
             text = role.to_string()
@@ -153,29 +296,223 @@ class RoleManager(RoleManager):
         self.logger.info(", ".join(line))
 
 
+class DomainManager(rbac.RoleManager):
+    """provides an implementation of the RoleManager interface keeping a separate role graph for each domain,
+    so that the links of a domain are only looked up in the graph of that domain.
+    """
+
+    def __init__(self, max_hierarchy_level):
+        self.logger = logging.getLogger(__name__)
+        self.max_hierarchy_level = max_hierarchy_level
+        # domain -> RoleManager with the links of that domain, the links without domain are kept under ""
+        self.rm_map = dict()
+        self.matching_func = None
+        self.domain_matching_func = None
+        self.has_pattern = None
+        self.has_domain_pattern = None
+        # domain -> RoleManager for the domains that are patterns for domain_matching_func,
+        # their links also apply to the domains they match
+        self.pattern_domains = dict()
+        # domain -> RoleManager with the links of the domain and of the pattern domains it matches,
+        # computed on first use and dropped when one of these links changes
+        self.matched_role_managers = dict()
+
+    def add_matching_func(self, fn=None):
+        self.has_pattern = True
+        self.matching_func = fn
+        for rm in self.rm_map.values():
+            rm.add_matching_func(fn)
+        self.matched_role_managers.clear()
+
+    def add_domain_matching_func(self, fn=None):
+        self.has_domain_pattern = True
+        self.domain_matching_func = fn
+        self.pattern_domains = dict()
+        if fn is not None:
+            for domain, rm in self.rm_map.items():
+                if is_pattern(fn, domain):
+                    self.pattern_domains[domain] = rm
+        self.matched_role_managers.clear()
+
+    def _get_domain(self, domain):
+        if len(domain) == 0:
+            return ""
+        elif len(domain) > 1:
+            raise RuntimeError("error: domain should be 1 parameter")
+
+        return domain[0]
+
+    def _new_role_manager(self):
+        rm = RoleManager(self.max_hierarchy_level)
+        if self.has_pattern:
+            rm.add_matching_func(self.matching_func)
+        return rm
+
+    def _create_role_manager(self, domain):
+        rm = self.rm_map[domain] = self._new_role_manager()
+        if self.domain_matching_func is not None and is_pattern(self.domain_matching_func, domain):
+            self.pattern_domains[domain] = rm
+            self.matched_role_managers.clear()
+        else:
+            self.matched_role_managers.pop(domain, None)
+
+        return rm
+
+    def _get_role_manager(self, domain):
+        """gets the role manager with the links of a domain and of the pattern domains matching it,
+        or None if there is none.
+        """
+        if not self.pattern_domains:
+            return self.rm_map.get(domain)
+
+        try:
+            return self.matched_role_managers[domain]
+        except KeyError:
+            pass
+
+        rm = self.rm_map.get(domain)
+        patterns = [key for key in self.pattern_domains if key != domain and self.domain_matching_func(domain, key)]
+        if patterns:
+            matched_rm = self._new_role_manager()
+            for source in ([rm] if rm is not None else []) + [self.pattern_domains[key] for key in patterns]:
+                for role in list(source.all_roles.values()):
+                    for name in role.get_roles():
+                        matched_rm.add_link(role.name, name)
+            rm = matched_rm
+
+        if len(self.matched_role_managers) >= PATTERN_CACHE_SIZE:
+            self.matched_role_managers.clear()
+        self.matched_role_managers[domain] = rm
+
+        return rm
+
+    def _links_changed(self, domain):
+        if domain in self.pattern_domains:
+            self.matched_role_managers.clear()
+        else:
+            self.matched_role_managers.pop(domain, None)
+
+    def clear(self):
+        self.rm_map = dict()
+        self.pattern_domains = dict()
+        self.matched_role_managers = dict()
+
+    def copy(self):
+        """returns a role manager with the same roles and functions that can be changed without affecting this one."""
+        dm = DomainManager(self.max_hierarchy_level)
+        dm.matching_func = self.matching_func
+        dm.domain_matching_func = self.domain_matching_func
+        dm.has_pattern = self.has_pattern
+        dm.has_domain_pattern = self.has_domain_pattern
+        dm.rm_map = {domain: rm.copy() for domain, rm in self.rm_map.items()}
+        dm.pattern_domains = {domain: dm.rm_map[domain] for domain in self.pattern_domains}
+
+        return dm
+
+    def get_role_graph(self):
+        """gets the domains and the role graph of each domain as returned by RoleManager.get_role_graph."""
+        domains = list(self.rm_map.keys())
+        return domains, [rm.get_role_graph() for rm in self.rm_map.values()]
+
+    def set_role_graph(self, domains, graphs):
+        """replaces all the roles with the graphs returned by get_role_graph."""
+        self.clear()
+        for domain, graph in zip(domains, graphs):
+            self._create_role_manager(domain).set_role_graph(*graph)
+
+    def add_link(self, name1, name2, *domain):
+        domain = self._get_domain(domain)
+        rm = self.rm_map.get(domain)
+        if rm is None:
+            rm = self._create_role_manager(domain)
+
+        rm.add_link(name1, name2)
+        self._links_changed(domain)
+
+    def delete_link(self, name1, name2, *domain):
+        domain = self._get_domain(domain)
+        rm = self.rm_map.get(domain)
+        if rm is None:
+            raise RuntimeError("error: name1 or name2 does not exist")
+
+        rm.delete_link(name1, name2)
+        self._links_changed(domain)
+
+    def has_link(self, name1, name2, *domain):
+        rm = self._get_role_manager(self._get_domain(domain))
+        if rm is None:
+            return name1 == name2
+
+        return rm.has_link(name1, name2)
+
+    def get_roles(self, name, domain=None):
+        """gets the roles that a subject inherits in a domain."""
+        rm = self._get_role_manager(domain or "")
+        if rm is None:
+            return []
+
+        return rm.get_roles(name)
+
+    def get_users(self, name, *domain):
+        """gets the users that inherits a subject in a domain."""
+        rm = self._get_role_manager(self._get_domain(domain))
+        if rm is None:
+            return []
+
+        return rm.get_users(name)
+
+    def get_all_roles_of(self, name, *domain):
+        """gets the names of all the roles that name inherits in a domain."""
+        rm = self._get_role_manager(self._get_domain(domain))
+        if rm is None:
+            return NO_ROLES
+
+        return rm.get_all_roles_of(name)
+
+    def get_domains(self):
+        """gets the domains having links."""
+        return list(self.rm_map.keys())
+
+    def print_roles(self):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
+        line = []
+        for domain, rm in self.rm_map.items():
+            for role in rm.all_roles.values():
+                text = role.to_string()
+                if text:
+                    line.append(domain + "::" + text if domain else text)
+        self.logger.info(", ".join(line))
+
+
 class Role:
     """represents the data structure for a role in RBAC."""
 
     name = ""
 
-    roles = []
+    roles = dict()
+
+    users = dict()
 
     def __init__(self, name):
         self.name = name
-        self.roles = []
+        # name -> Role for the roles this role inherits
+        self.roles = dict()
+        # name -> Role for the roles and users inheriting this role
+        self.users = dict()
 
     def add_role(self, role):
-        for rr in self.roles:
-            if rr.name == role.name:
-                return
+        if role.name in self.roles:
+            return
 
-        self.roles.append(role)
+        self.roles[role.name] = role
+        role.users[self.name] = self
 
     def delete_role(self, role):
-        for rr in self.roles:
-            if rr.name == role.name:
-                self.roles.remove(rr)
-                return
+        if role.name in self.roles:
+            del self.roles[role.name]
+            role.users.pop(self.name, None)
 
     def has_role(self, name, hierarchy_level, matching_func=None):
         if self.has_direct_role(name, matching_func):
@@ -183,7 +520,7 @@ class Role:
         if hierarchy_level <= 0:
             return False
 
-        for role in self.roles:
+        for role in self.roles.values():
             if role.has_role(name, hierarchy_level - 1, matching_func):
                 return True
 
@@ -191,11 +528,9 @@ class Role:
 
     def has_direct_role(self, name, matching_func=None):
         if matching_func is None:
-            for role in self.roles:
-                if role.name == name:
-                    return True
+            return name in self.roles
         else:
-            for role in self.roles:
+            for role in self.roles.values():
                 if matching_func(name, role.name):
                     return True
         return False
@@ -212,8 +547,7 @@ class Role:
             return self.name + " < (" + names + ")"
 
     def get_roles(self):
-        names = []
-        for role in self.roles:
-            names.append(role.name)
+        return list(self.roles.keys())
 
-        return names
+    def get_users(self):
+        return list(self.users.keys())
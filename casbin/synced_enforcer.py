@@ -21,18 +21,87 @@ class AtomicBool():
         with self._lock:
             self._value = value
 
+class NoLock():
+    """the lock of the readers in copy-on-write mode, they use the enforcer they get without waiting."""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+class WriteLock():
+    """the lock of the writers, it counts them so that reload_policy can tell whether the enforcer changed."""
+
+    def __init__(self, synced_enforcer, lock):
+        self._synced_enforcer = synced_enforcer
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.__enter__()
+        self._synced_enforcer._writes += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._lock.__exit__(exc_type, exc_value, traceback)
+
+class CopyOnWriteLock():
+    """the lock of the writers in copy-on-write mode.
+    A writer changes a copy of the enforcer that replaces the shared one once it is done, or is dropped on error.
+    """
+
+    def __init__(self, synced_enforcer):
+        self._synced_enforcer = synced_enforcer
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._synced_enforcer._writes += 1
+        self._synced_enforcer._local.enforcer = self._synced_enforcer._enforcer.copy()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                # replacing the reference is atomic, readers see either the old or the new enforcer
+                self._synced_enforcer._enforcer = self._synced_enforcer._local.enforcer
+        finally:
+            self._synced_enforcer._local.enforcer = None
+            self._lock.release()
+        return False
+
 class SyncedEnforcer():
 
     """SyncedEnforcer wraps Enforcer and provides synchronized access. 
     It's also a drop-in replacement for Enforcer"""
 
     def __init__(self, model=None, adapter=None):
-        self._e = Enforcer(model, adapter)
+        self._enforcer = Enforcer(model, adapter)
+        self._local = threading.local()
         self._rwlock = RWLockWrite()
         self._rl = self._rwlock.gen_rlock()
-        self._wl = self._rwlock.gen_wlock()
+        # the number of writers that took the write lock
+        self._writes = 0
+        self._wl = WriteLock(self, self._rwlock.gen_wlock())
         self._auto_loading = AtomicBool(False)
         self._auto_loading_thread = None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def _e(self):
+        """the enforcer changed by the current writer in copy-on-write mode, otherwise the shared enforcer."""
+        e = getattr(self._local, "enforcer", None)
+        return self._enforcer if e is None else e
+
+    def enable_copy_on_write(self, copy_on_write=True):
+        """controls whether writers change a copy of the enforcer that replaces it once they are done.
+        Readers then take no lock and never wait for writers, at the cost of copying the policy for every change.
+        It should be called before the enforcer is shared between threads.
+        """
+        if copy_on_write:
+            self._rl = NoLock()
+            self._wl = CopyOnWriteLock(self)
+        else:
+            self._rl = self._rwlock.gen_rlock()
+            self._wl = WriteLock(self, self._rwlock.gen_wlock())
 
     def is_auto_loading_running(self):
         """check if SyncedEnforcer is auto loading policies"""
@@ -41,7 +110,7 @@ class SyncedEnforcer():
     def _auto_load_policy(self, interval):
             while self.is_auto_loading_running():
                 time.sleep(interval)
-                self.load_policy()
+                self.reload_policy()
 
     def start_auto_load_policy(self, interval):
         """starts a thread that will call load_policy every interval seconds"""
@@ -112,6 +181,32 @@ class SyncedEnforcer():
         with self._wl:
             return self._e.load_policy()
 
+    def reload_policy(self):
+        """reloads the policy from file/database into a new enforcer that replaces the current one once loaded,
+        enforce is only blocked while replacing it. Nothing is loaded if the adapter reports an unchanged policy.
+        Returns whether the policy was reloaded.
+        """
+        with self._reload_lock:
+            with self._rl:
+                if not self._e.is_policy_changed():
+                    return False
+                source = self._e
+                writes = self._writes
+                e = source.copy(with_policy=False)
+
+            e.load_policy()
+
+            # in copy-on-write mode only the writers have to be held off, the enforcer isn't copied
+            with self._wl._lock:
+                if self._enforcer is not source or self._writes != writes:
+                    # changed while loading, the next reload will load it again
+                    return False
+
+                self._writes += 1
+                self._enforcer = e
+
+            return True
+
     def load_filtered_policy(self, filter):
         """"reloads a filtered policy from file/database."""
         with self._wl:
@@ -121,9 +216,19 @@ class SyncedEnforcer():
         with self._rl:
             return self._e.save_policy()
 
+    def save_snapshot(self, path):
+        """saves the loaded policy and the role links to a file that can be loaded by load_snapshot."""
+        with self._rl:
+            return self._e.save_snapshot(path)
+
+    def load_snapshot(self, path):
+        """reloads the policy saved by save_snapshot instead of loading it from the adapter."""
+        with self._wl:
+            return self._e.load_snapshot(path)
+
     def build_role_links(self):
         """manually rebuild the role inheritance relations."""
-        with self._rl:
+        with self._wl:
             return self._e.build_role_links()
 
     def enforce(self, *rvals):
@@ -141,6 +246,22 @@ class SyncedEnforcer():
         with self._rl:
             return self._e.enforce_ex(*rvals)
 
+    def enforce_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the results in the order of the requests
+        """
+        with self._rl:
+            return self._e.enforce_batch(requests)
+
+    def enforce_ex_batch(self, requests):
+        """decides for each request whether a "subject" can access a "object" with the operation "action",
+        requests is a list of parameters usually like (sub, obj, act).
+        return the judge results with reasons in the order of the requests
+        """
+        with self._rl:
+            return self._e.enforce_ex_batch(requests)
+
     def get_all_subjects(self):
         """gets the list of subjects that show up in the current policy."""
         with self._rl:
@@ -247,6 +368,26 @@ class SyncedEnforcer():
         with self._wl:
             return self._e.add_named_policy(ptype, *params)
 
+    def update_policy(self, old_rule, new_rule):
+        """updates an authorization rule from the current policy."""
+        with self._wl:
+            return self._e.update_policy(old_rule, new_rule)
+
+    def update_policies(self, old_rules, new_rules):
+        """updates authorization rules from the current policy."""
+        with self._wl:
+            return self._e.update_policies(old_rules, new_rules)
+
+    def update_named_policy(self, ptype, old_rule, new_rule):
+        """updates an authorization rule from the current named policy."""
+        with self._wl:
+            return self._e.update_named_policy(ptype, old_rule, new_rule)
+
+    def update_named_policies(self, ptype, old_rules, new_rules):
+        """updates authorization rules from the current named policy."""
+        with self._wl:
+            return self._e.update_named_policies(ptype, old_rules, new_rules)
+
     def remove_policy(self, *params):
         """removes an authorization rule from the current policy."""
         with self._wl:
@@ -508,6 +649,11 @@ class SyncedEnforcer():
         with self._wl:
             return self._e.enable_enforce(enabled)
 
+    def enable_policy_index(self, index_policy=True):
+        """controls whether enforce only evaluates the policy rules that can match the request."""
+        with self._wl:
+            return self._e.enable_policy_index(index_policy)
+
     def add_named_matching_func(self, ptype, fn):
         """add_named_matching_func add MatchingFunc by ptype RoleManager"""
         with self._wl:
@@ -578,4 +724,6 @@ class SyncedEnforcer():
             return self._e.remove_named_grouping_policies(ptype,rules)
 
     def build_incremental_role_links(self, op, ptype, rules):
-        self.get_model().build_incremental_role_links(self.get_role_manager(), op, "g", ptype, rules)
+        """adds or removes the role inheritance relations of grouping rules."""
+        with self._wl:
+            return self._e.build_incremental_role_links(op, ptype, rules)
@@ -1,11 +1,16 @@
+import functools
 import ipaddress
 import re
+import threading
 
 from wcmatch import pathlib
 
 KEY_MATCH2_PATTERN = re.compile(r'(.*?):[^\/]+(.*?)')
 KEY_MATCH3_PATTERN = re.compile(r'(.*?){[^\/]+}(.*?)')
 
+# the number of compiled patterns remembered by each of the matching functions below
+PATTERN_CACHE_SIZE = 10000
+
 
 def key_match(key1, key2):
     """determines whether key1 matches the pattern of key2 (similar to RESTful path), key2 can contain a *.
@@ -35,10 +40,15 @@ def key_match2(key1, key2):
     For example, "/foo/bar" matches "/foo/*", "/resource1" matches "/:resource"
     """
 
+    return _compile_key_match2(key2).match(key1) is not None
+
+
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _compile_key_match2(key2):
     key2 = key2.replace("/*", "/.*")
     key2 = KEY_MATCH2_PATTERN.sub(r'\g<1>[^\/]+\g<2>', key2, 0)
 
-    return regex_match(key1, "^" + key2 + "$")
+    return re.compile("^" + key2 + "$")
 
 
 def key_match2_func(*args):
@@ -53,10 +63,15 @@ def key_match3(key1, key2):
     For example, "/foo/bar" matches "/foo/*", "/resource1" matches "/{resource}"
     """
 
+    return _compile_key_match3(key2).match(key1) is not None
+
+
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _compile_key_match3(key2):
     key2 = key2.replace("/*", "/.*")
     key2 = KEY_MATCH3_PATTERN.sub(r'\g<1>[^\/]+\g<2>', key2, 0)
 
-    return regex_match(key1, "^" + key2 + "$")
+    return re.compile("^" + key2 + "$")
 
 
 def key_match3_func(*args):
@@ -69,13 +84,18 @@ def key_match3_func(*args):
 def regex_match(key1, key2):
     """determines whether key1 matches the pattern of key2 in regular expression."""
 
-    res = re.match(key2, key1)
+    res = _compile_regex(key2).match(key1)
     if res:
         return True
     else:
         return False
 
 
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _compile_regex(pattern):
+    return re.compile(pattern)
+
+
 def regex_match_func(*args):
     """the wrapper for RegexMatch."""
 
@@ -103,12 +123,25 @@ def ip_match(ip1, ip2):
     """IPMatch determines whether IP address ip1 matches the pattern of IP address ip2, ip2 can be an IP address or a CIDR pattern.
     For example, "192.168.2.123" matches "192.168.2.0/24"
     """
-    ip1 = ipaddress.ip_address(ip1)
+    ip1 = _parse_ip_address(ip1)
+    network = parse_ip_network(ip2)
+    if network is None:
+        return ip1 == ip2
+    return ip1 in network
+
+
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _parse_ip_address(ip):
+    return ipaddress.ip_address(ip)
+
+
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def parse_ip_network(ip):
+    """returns the network of an IP address or CIDR pattern, or None if it is neither."""
     try:
-        network = ipaddress.ip_network(ip2, strict=False)
-        return ip1 in network
+        return ipaddress.ip_network(ip, strict=False)
     except ValueError:
-        return ip1 == ip2
+        return None
 
 
 def ip_match_func(*args):
@@ -120,8 +153,46 @@ def ip_match_func(*args):
     return ip_match(ip1, ip2)
 
 
-def generate_g_function(rm):
-    """the factory method of the g(_, _) function."""
+# the characters making a key a pattern for keyMatch, and for keyMatch2 and keyMatch3 that compile it to a regex
+KEY_MATCH_PATTERN_CHARS = re.compile(r'\*')
+KEY_MATCH2_PATTERN_CHARS = re.compile(r'[.^$*+?{}\[\]\\|():]')
+
+_PATTERN_CHARS = {
+    key_match: KEY_MATCH_PATTERN_CHARS,
+    key_match_func: KEY_MATCH_PATTERN_CHARS,
+    key_match2: KEY_MATCH2_PATTERN_CHARS,
+    key_match2_func: KEY_MATCH2_PATTERN_CHARS,
+    key_match3: KEY_MATCH2_PATTERN_CHARS,
+    key_match3_func: KEY_MATCH2_PATTERN_CHARS,
+}
+
+
+def is_pattern(matching_func, key):
+    """determines whether key is a pattern for matching_func, otherwise only key itself matches it.
+    Every key is a pattern for the functions other than keyMatch, keyMatch2 and keyMatch3,
+    e.g. "alice" matches "alice2" with regexMatch.
+    """
+    pattern_chars = _PATTERN_CHARS.get(matching_func)
+    return pattern_chars is None or pattern_chars.search(key) is not None
+
+
+class RolesCache(threading.local):
+    """the roles looked up by the g functions of an enforcer, each thread keeps them for its current request."""
+
+    def __init__(self):
+        self.roles = {}
+
+    def clear(self):
+        if self.roles:
+            self.roles = {}
+
+
+def generate_g_function(rm, cache=None, roles_cache=None):
+    """the factory method of the g(_, _) function.
+    If a cache dict is given, the links looked up are remembered in it.
+    If a RolesCache is given and the role manager has get_all_roles_of, all the roles of a name are
+    looked up once and the links of the name are checked against them until the cache is cleared.
+    """
 
     def f(*args):
         name1 = args[0]
@@ -135,4 +206,51 @@ def generate_g_function(rm):
             domain = str(args[2])
             return rm.has_link(name1, name2, domain)
 
-    return f
+    if roles_cache is not None and hasattr(rm, "get_all_roles_of"):
+        has_link = f
+        rm_id = id(rm)
+
+        def f(*args):
+            name1 = args[0]
+            name2 = args[1]
+
+            if name1 == name2:
+                return True
+            elif 2 == len(args):
+                key = (rm_id, name1)
+            elif 3 == len(args):
+                key = (rm_id, name1, str(args[2]))
+            else:
+                return has_link(*args)
+
+            roles_map = roles_cache.roles
+            try:
+                roles = roles_map[key]
+            except KeyError:
+                roles = roles_map[key] = rm.get_all_roles_of(*key[1:])
+            except TypeError:
+                return has_link(*args)
+
+            # the matching function is only known when the link is checked, it can be changed after the matcher is built
+            matching_func = getattr(rm, "matching_func", None)
+            if matching_func is None:
+                return name2 in roles
+
+            for role in roles:
+                if matching_func(name2, role):
+                    return True
+            return False
+
+    if cache is None:
+        return f
+
+    def cached_f(*args):
+        try:
+            return cache[args]
+        except KeyError:
+            result = cache[args] = f(*args)
+            return result
+        except TypeError:
+            return f(*args)
+
+    return cached_f
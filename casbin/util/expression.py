@@ -1,5 +1,8 @@
 from simpleeval import SimpleEval
 import ast
+import copy
+import simpleeval
+import types
 
 
 class SimpleEval(SimpleEval):
@@ -11,13 +14,17 @@ class SimpleEval(SimpleEval):
 
     ast_parsed_value = None
 
-    def __init__(self, expr, functions=None):
+    def __init__(self, expr, functions=None, parsed_value=None):
         """Create the evaluator instance.  Set up valid operators (+,-, etc)
-            functions (add, random, get_val, whatever) and names. """
+            functions (add, random, get_val, whatever) and names.
+            parsed_value can be given to reuse a tree returned by parse_expression. """
         super(SimpleEval, self).__init__(functions=functions)
-        if expr != "":
+        if parsed_value is not None:
             self.expr = expr
-            self.expr_parsed_value = ast.parse(expr.strip()).body[0].value
+            self.expr_parsed_value = parsed_value
+        elif expr != "":
+            self.expr = expr
+            self.expr_parsed_value = parse_expression(expr)
 
     def eval(self, names=None):
         """ evaluate an expresssion, using the operators, functions and
@@ -27,3 +34,278 @@ class SimpleEval(SimpleEval):
             self.names = names
 
         return self._eval(self.expr_parsed_value)
+
+
+def parse_expression(expr):
+    """parses an expression into the tree evaluated by SimpleEval."""
+    return ast.parse(expr.strip()).body[0].value
+
+
+def get_conjuncts(parsed_value):
+    """returns the sub expressions that all have to be true for the expression to be true."""
+    if isinstance(parsed_value, ast.BoolOp) and isinstance(parsed_value.op, ast.And):
+        conjuncts = []
+        for value in parsed_value.values:
+            conjuncts.extend(get_conjuncts(value))
+        return conjuncts
+
+    return [parsed_value]
+
+
+def get_equality_conditions(parsed_value, left_names, right_names):
+    """returns the (left name, right name) pairs that must be equal for the expression to be true,
+    e.g. [("r_obj", "p_obj")] for "r_sub == p_sub.owner and r_obj == p_obj".
+    """
+    conditions = []
+    for node in get_conjuncts(parsed_value):
+        if not isinstance(node, ast.Compare) or len(node.ops) != 1 or not isinstance(node.ops[0], ast.Eq):
+            continue
+
+        left, right = node.left, node.comparators[0]
+        if not isinstance(left, ast.Name) or not isinstance(right, ast.Name):
+            continue
+
+        if left.id in left_names and right.id in right_names:
+            conditions.append((left.id, right.id))
+        elif right.id in left_names and left.id in right_names:
+            conditions.append((right.id, left.id))
+
+    return conditions
+
+
+def get_call_conditions(parsed_value, func_name, left_names, right_names):
+    """returns the (left name, right name) pairs passed to a function that must be true for the expression to be true,
+    e.g. [("r_sub", "p_sub")] for "ipMatch(r_sub, p_sub) and r_obj == p_obj".
+    """
+    conditions = []
+    for node in get_conjuncts(parsed_value):
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name) or node.func.id != func_name:
+            continue
+        if len(node.args) != 2 or node.keywords:
+            continue
+
+        left, right = node.args
+        if not isinstance(left, ast.Name) or not isinstance(right, ast.Name):
+            continue
+
+        if left.id in left_names and right.id in right_names:
+            conditions.append((left.id, right.id))
+
+    return conditions
+
+
+
+def get_sole_call_condition(parsed_value, name, func_names, right_names):
+    """returns the (function name, right name) of the only sub expression using name, when it's a call to one of
+    the functions with name and a right name that must be true for the expression to be true, otherwise None,
+    e.g. ("g", "p_sub") for name "r_sub" in "g(r_sub, p_sub) and r_obj == p_obj".
+    """
+    condition = None
+    for node in get_conjuncts(parsed_value):
+        if not any(isinstance(n, ast.Name) and n.id == name for n in ast.walk(node)):
+            continue
+        if condition is not None:
+            return None
+
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name) or node.func.id not in func_names:
+            return None
+        if len(node.args) != 2 or node.keywords:
+            return None
+
+        left, right = node.args
+        if not isinstance(left, ast.Name) or left.id != name:
+            return None
+        if not isinstance(right, ast.Name) or right.id not in right_names:
+            return None
+
+        condition = (node.func.id, right.id)
+
+    return condition
+
+class CompiledExpression:
+    """compiles an expression into a python function taking the values of names as positional arguments.
+    Only the subset of python accepted by SimpleEval is compiled, any other expression is evaluated
+    by SimpleEval with the same arguments so that it raises the same errors.
+        >>> f = CompiledExpression("a + b > 10", {}, ["a", "b"]).func
+        >>> f(5, 6)
+        True
+        """
+
+    def __init__(self, expr, functions, names):
+        self.expr = expr
+        self.names = list(names)
+        self.expr_parsed_value = parse_expression(expr)
+        self.code = None
+
+        try:
+            body = _ExpressionCompiler(functions, self.names).visit(copy.deepcopy(self.expr_parsed_value))
+        except _NotCompilable:
+            pass
+        else:
+            tree = ast.parse("lambda " + ", ".join(self.names) + ": None", mode="eval")
+            tree.body.body = body
+            self.code = compile(ast.fix_missing_locations(tree), "<matcher>", "eval")
+
+        self.func = self.bind(functions)
+
+    def bind(self, functions):
+        """returns the compiled function using the given functions."""
+
+        if self.code is None:
+            return self._bind_simple_eval(functions)
+
+        scope = dict(functions)
+        scope["__builtins__"] = {}
+        scope[_ATTRIBUTE_HELPER] = self._get_attribute
+        for op_type, op_name in _OPERATOR_HELPERS.items():
+            scope[op_name] = simpleeval.DEFAULT_OPERATORS[op_type]
+
+        return eval(self.code, scope)
+
+    def _bind_simple_eval(self, functions):
+        expr = self.expr
+        names = self.names
+        parsed_value = self.expr_parsed_value
+
+        def f(*values):
+            return SimpleEval(expr, functions, parsed_value).eval(dict(zip(names, values)))
+
+        return f
+
+    def _get_attribute(self, value, attr):
+        """looks up an attribute like SimpleEval does, falling back to item access."""
+        try:
+            item = getattr(value, attr)
+        except (AttributeError, TypeError):
+            try:
+                item = value[attr]
+            except (KeyError, TypeError):
+                raise simpleeval.AttributeDoesNotExist(attr, self.expr)
+
+        if isinstance(item, types.ModuleType):
+            raise simpleeval.FeatureNotAvailable("Sorry, modules are not allowed in attribute access")
+        if callable(item) and item in simpleeval.DISALLOW_FUNCTIONS:
+            raise simpleeval.FeatureNotAvailable("This function is forbidden")
+
+        return item
+
+
+_ATTRIBUTE_HELPER = "_casbin_attribute"
+
+# operators that SimpleEval evaluates with its own (possibly bounds checked) implementations
+_OPERATOR_HELPERS = {
+    op_type: "_casbin_" + op_type.__name__.lower()
+    for op_type in simpleeval.DEFAULT_OPERATORS
+    if issubclass(op_type, (ast.operator, ast.unaryop)) and op_type is not ast.Not
+}
+
+_COMPARE_OPERATORS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot)
+
+_CONSTANT_NODES = tuple(
+    getattr(ast, name) for name in ("Constant", "Num", "Str", "NameConstant") if hasattr(ast, name)
+)
+
+
+class _NotCompilable(Exception):
+    pass
+
+
+class _ExpressionCompiler(ast.NodeTransformer):
+    """rewrites a parsed expression into an equivalent tree that is safe to compile,
+    raises _NotCompilable for everything SimpleEval would reject or that is not supported."""
+
+    def __init__(self, functions, names):
+        self.functions = functions
+        self.names = set(names)
+
+    def generic_visit(self, node):
+        raise _NotCompilable()
+
+    def _helper_call(self, name, args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+    def visit_BoolOp(self, node):
+        node.values = [self.visit(value) for value in node.values]
+        return node
+
+    def visit_UnaryOp(self, node):
+        if type(node.op) is ast.Not:
+            node.operand = self.visit(node.operand)
+            return node
+        if type(node.op) not in _OPERATOR_HELPERS:
+            raise _NotCompilable()
+        return self._helper_call(_OPERATOR_HELPERS[type(node.op)], [self.visit(node.operand)])
+
+    def visit_BinOp(self, node):
+        if type(node.op) not in _OPERATOR_HELPERS:
+            raise _NotCompilable()
+        return self._helper_call(_OPERATOR_HELPERS[type(node.op)], [self.visit(node.left), self.visit(node.right)])
+
+    def visit_Compare(self, node):
+        for op in node.ops:
+            if not isinstance(op, _COMPARE_OPERATORS) or type(op) not in simpleeval.DEFAULT_OPERATORS:
+                raise _NotCompilable()
+        node.left = self.visit(node.left)
+        node.comparators = [self.visit(comparator) for comparator in node.comparators]
+        return node
+
+    def visit_IfExp(self, node):
+        node.test = self.visit(node.test)
+        node.body = self.visit(node.body)
+        node.orelse = self.visit(node.orelse)
+        return node
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name):
+            func = self.functions.get(node.func.id)
+            if func is None or func in simpleeval.DISALLOW_FUNCTIONS:
+                raise _NotCompilable()
+        else:
+            node.func = self.visit(node.func)
+
+        for arg in node.args:
+            if isinstance(arg, ast.Starred):
+                raise _NotCompilable()
+        node.args = [self.visit(arg) for arg in node.args]
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                raise _NotCompilable()
+            keyword.value = self.visit(keyword.value)
+        return node
+
+    def visit_Name(self, node):
+        if node.id not in self.names and node.id not in self.functions:
+            raise _NotCompilable()
+        return node
+
+    def visit_Attribute(self, node):
+        if node.attr.startswith(tuple(simpleeval.DISALLOW_PREFIXES)) or node.attr in simpleeval.DISALLOW_METHODS:
+            raise _NotCompilable()
+        attr = ast.Constant(node.attr) if hasattr(ast, "Constant") else ast.Str(node.attr)
+        return self._helper_call(_ATTRIBUTE_HELPER, [self.visit(node.value), attr])
+
+    def visit_Subscript(self, node):
+        node.value = self.visit(node.value)
+        node.slice = self.visit(node.slice)
+        return node
+
+    def visit_Index(self, node):
+        node.value = self.visit(node.value)
+        return node
+
+    def visit_Slice(self, node):
+        for field in ("lower", "upper", "step"):
+            if getattr(node, field) is not None:
+                setattr(node, field, self.visit(getattr(node, field)))
+        return node
+
+    def visit_constant(self, node):
+        value = getattr(node, "value", getattr(node, "n", getattr(node, "s", None)))
+        if hasattr(value, "__len__") and len(value) > simpleeval.MAX_STRING_LENGTH:
+            raise _NotCompilable()
+        return node
+
+    def visit(self, node):
+        if isinstance(node, _CONSTANT_NODES):
+            return self.visit_constant(node)
+        return super(_ExpressionCompiler, self).visit(node)
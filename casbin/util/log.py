@@ -0,0 +1,127 @@
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+
+
+class DecisionLogger:
+    """logs the decisions of an enforcer, allowed requests at INFO and denied requests at ERROR.
+
+    Nothing is formatted unless the logger is enabled for the level of the record. The records can
+    be sampled, rate limited and handed to a background thread through a queue.
+    """
+
+    def __init__(self, logger, sample_rate=1.0, rate_limit=None):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        # the maximum number of records per second, None for no limit
+        self.rate_limit = rate_limit
+        # the number of records dropped by sampling or rate limiting
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._tokens = rate_limit
+        self._last_time = time.monotonic()
+
+        # logs through the queue under the name of logger, see start_queue
+        self._queue_logger = None
+        self._queue_listener = None
+
+    def set_sample_rate(self, sample_rate):
+        """sets the fraction of the decisions that are logged, between 0 and 1."""
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample rate should be between 0 and 1")
+        self.sample_rate = sample_rate
+
+    def set_rate_limit(self, rate_limit):
+        """sets the maximum number of decisions logged per second, None disables the limit."""
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("rate limit should be positive")
+        with self._lock:
+            self.rate_limit = rate_limit
+            self._tokens = rate_limit
+            self._last_time = time.monotonic()
+
+    def start_queue(self, maxsize=10000):
+        """logs the decisions from a background thread, records that don't fit in the queue are dropped."""
+        if self._queue_listener is not None:
+            return
+
+        records = queue.Queue(maxsize)
+        # not registered with the logging module, so that it has no parent to propagate to
+        queue_logger = logging.Logger(self.logger.name)
+        queue_logger.propagate = False
+        # the filters of logger are applied before the records are queued
+        queue_logger.addFilter(self.logger)
+        queue_logger.addHandler(_DroppingQueueHandler(records, self))
+
+        self._queue_listener = logging.handlers.QueueListener(records, _LoggerHandler(self.logger))
+        self._queue_listener.start()
+        self._queue_logger = queue_logger
+
+    def stop_queue(self):
+        """stops the background thread once the queued records are logged."""
+        if self._queue_listener is None:
+            return
+
+        self._queue_logger = None
+        self._queue_listener.stop()
+        self._queue_listener = None
+
+    def log_decision(self, rvals, result):
+        level = logging.INFO if result else logging.ERROR
+        if not self.logger.isEnabledFor(level):
+            return
+
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            self.dropped += 1
+            return
+
+        if self.rate_limit is not None and not self._take_token():
+            self.dropped += 1
+            return
+
+        logger = self._queue_logger or self.logger
+        logger.log(level, "Request: %s ---> %s", ", ".join([str(v) for v in rvals]), result)
+
+    def _take_token(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._last_time) * self.rate_limit)
+            self._last_time = now
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, records, decision_logger):
+        super().__init__(records)
+        self.decision_logger = decision_logger
+
+    def prepare(self, record):
+        """leaves the formatting to the handlers of the logger, on the background thread."""
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.decision_logger.dropped += 1
+
+
+class _LoggerHandler(logging.Handler):
+    """passes the records taken from the queue to the handlers of a logger."""
+
+    def __init__(self, logger):
+        super().__init__()
+        self.logger = logger
+
+    def handle(self, record):
+        # the filters of the logger were applied when the record was queued
+        if not self.logger.disabled:
+            self.logger.callHandlers(record)
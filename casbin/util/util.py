@@ -1,4 +1,6 @@
 from collections import OrderedDict
+from contextlib import contextmanager
+import gc
 import re
 
 eval_reg = re.compile(r'\beval\((?P<rule>[^)]*)\)')
@@ -48,6 +50,7 @@ def join_slice(a, *b):
 
 def set_subtract(a, b):
     ''' returns the elements in `a` that aren't in `b`. '''
+    b = set(b)
     return [i for i in a if i not in b]
 
 def has_eval(s):
@@ -70,3 +73,15 @@ def get_eval_value(s):
     '''returns the parameters of function eval'''
     sub_match = eval_reg.findall(s)
     return sub_match.copy()
+
+
+@contextmanager
+def gc_paused():
+    """disables the garbage collector in the block, it would repeatedly scan the millions of objects created for a large policy."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
@@ -1,3 +1,4 @@
+import ipaddress
 from unittest import TestCase
 
 from casbin.model import Model
@@ -35,6 +36,44 @@ class TestPolicy(TestCase):
         m.add_policy('p', 'p', rule)
         self.assertTrue(m.has_policy('p', 'p', rule))
 
+    def test_add_policy_with_priority(self):
+        m = Model()
+        m.load_model(get_examples("priority_model_explicit.conf"))
+
+        m.add_policy('p', 'p', ['10', 'admin', 'data1', 'read', 'allow'])
+        m.add_policy('p', 'p', ['1', 'alice', 'data1', 'read', 'deny'])
+        m.add_policy('p', 'p', ['10', 'admin', 'data2', 'read', 'allow'])
+        m.add_policy('p', 'p', ['2', 'bob', 'data1', 'read', 'deny'])
+        self.assertEqual([rule[1] + ':' + rule[2] for rule in m.get_policy('p', 'p')],
+                         ['alice:data1', 'bob:data1', 'admin:data1', 'admin:data2'])
+        self.assertEqual(m.get_policy_index('p', 'p', 1)['admin'], [2, 3])
+
+        m.add_policies('p', 'p', [['5', 'carol', 'data1', 'read', 'allow'],
+                                  ['2', 'carol', 'data2', 'read', 'allow'],
+                                  ['20', 'carol', 'data3', 'read', 'allow']])
+        self.assertEqual([rule[0] for rule in m.get_policy('p', 'p')], ['1', '2', '2', '5', '10', '10', '20'])
+        self.assertEqual(m.get_policy('p', 'p')[2], ['2', 'carol', 'data2', 'read', 'allow'])
+        self.assertEqual(m.get_policy_index('p', 'p', 1)['carol'], [2, 3, 6])
+
+        m.add_policies('p', 'p', [['30', 'dave', 'data1', 'read', 'allow'], ['20', 'dave', 'data2', 'read', 'allow']])
+        self.assertEqual([rule[0] for rule in m.get_policy('p', 'p')], ['1', '2', '2', '5', '10', '10', '20', '20', '30'])
+        self.assertEqual(m.get_policy_index('p', 'p', 1)['dave'], [7, 8])
+
+    def test_add_policy_with_invalid_priority(self):
+        m = Model()
+        m.load_model(get_examples("priority_model_explicit.conf"))
+        m.add_policy('p', 'p', ['10', 'admin', 'data1', 'read', 'allow'])
+
+        with self.assertRaisesRegex(RuntimeError, "high"):
+            m.add_policy('p', 'p', ['high', 'alice', 'data1', 'read', 'deny'])
+        with self.assertRaisesRegex(RuntimeError, "high"):
+            m.add_policies('p', 'p', [['1', 'bob', 'data1', 'read', 'deny'], ['high', 'alice', 'data1', 'read', 'deny']])
+        self.assertEqual(m.get_policy('p', 'p'), [['10', 'admin', 'data1', 'read', 'allow']])
+
+        m.get_policy('p', 'p').append(['high', 'alice', 'data1', 'read', 'deny'])
+        with self.assertRaisesRegex(RuntimeError, "high"):
+            m.sort_policies_by_priority()
+
     def test_add_role_policy(self):
         m = Model()
         m.load_model(get_examples("rbac_model.conf"))
@@ -150,3 +189,91 @@ class TestPolicy(TestCase):
 
         res = m.remove_filtered_policy('p', 'p', 1, 'domain1', 'data1')
         self.assertFalse(res)
+
+    def test_get_policy_index(self):
+        m = Model()
+        m.load_model(get_examples("basic_model.conf"))
+
+        m.add_policies('p', 'p', [['alice', 'data1', 'read'], ['bob', 'data2', 'write']])
+        self.assertEqual(m.get_policy_index('p', 'p', 1), {'data1': [0], 'data2': [1]})
+
+        m.add_policy('p', 'p', ['alice', 'data2', 'read'])
+        self.assertEqual(m.get_policy_index('p', 'p', 1), {'data1': [0], 'data2': [1, 2]})
+
+        m.update_policy('p', 'p', ['alice', 'data1', 'read'], ['alice', 'data2', 'write'])
+        self.assertEqual(m.get_policy_index('p', 'p', 1), {'data2': [0, 1, 2]})
+
+        m.remove_policy('p', 'p', ['bob', 'data2', 'write'])
+        self.assertEqual(m.get_policy_index('p', 'p', 1), {'data2': [0, 1]})
+
+        m.remove_filtered_policy('p', 'p', 0, 'alice', 'data2', 'read')
+        self.assertEqual(m.get_policy_index('p', 'p', 1), {'data2': [0]})
+
+        # rules appended directly to the policy, as adapters do, are picked up as well
+        m.get_policy('p', 'p').append(['cathy', 'data3', 'read'])
+        self.assertEqual(m.get_policy_index('p', 'p', 0), {'alice': [0], 'cathy': [1]})
+
+    def test_has_policy_after_changes(self):
+        m = Model()
+        m.load_model(get_examples("basic_model.conf"))
+
+        m.add_policies('p', 'p', [['alice', 'data1', 'read'], ['bob', 'data2', 'write']])
+        self.assertFalse(m.add_policy('p', 'p', ['alice', 'data1', 'read']))
+        self.assertFalse(m.add_policies('p', 'p', [['cathy', 'data1', 'read'], ['bob', 'data2', 'write']]))
+
+        m.update_policy('p', 'p', ['alice', 'data1', 'read'], ['alice', 'data1', 'write'])
+        self.assertFalse(m.has_policy('p', 'p', ['alice', 'data1', 'read']))
+        self.assertTrue(m.has_policy('p', 'p', ['alice', 'data1', 'write']))
+
+        # rules appended directly to the policy, as adapters do, are picked up as well
+        m.get_policy('p', 'p').append(['cathy', 'data3', 'read'])
+        m.get_policy('p', 'p').append(['cathy', 'data3', 'read'])
+        self.assertTrue(m.has_policy('p', 'p', ['cathy', 'data3', 'read']))
+
+        self.assertFalse(m.remove_policies('p', 'p', [['bob', 'data2', 'write'], ['bob', 'data2', 'write']]))
+        self.assertTrue(m.has_policy('p', 'p', ['bob', 'data2', 'write']))
+        # only one of the two duplicated rules is removed
+        self.assertFalse(m.remove_policies('p', 'p', [['bob', 'data2', 'write'], ['cathy', 'data3', 'read']]))
+        self.assertFalse(m.has_policy('p', 'p', ['bob', 'data2', 'write']))
+        self.assertTrue(m.has_policy('p', 'p', ['cathy', 'data3', 'read']))
+        self.assertTrue(m.remove_policy('p', 'p', ['cathy', 'data3', 'read']))
+        self.assertFalse(m.has_policy('p', 'p', ['cathy', 'data3', 'read']))
+        self.assertEqual(m.get_policy('p', 'p'), [['alice', 'data1', 'write']])
+
+    def test_remove_policy_keeps_order_and_index(self):
+        m = Model()
+        m.load_model(get_examples("basic_model.conf"))
+
+        m.add_policies('p', 'p', [
+            ['bob', 'data2', 'write'], ['alice', 'data1', 'read'], ['cathy', 'data1', 'read'], ['bob', 'data2', 'write'],
+        ])
+        index = m.get_policy_index('p', 'p', 1)
+
+        # the first of the two duplicated rules is removed
+        self.assertFalse(m.remove_policy('p', 'p', ['bob', 'data2', 'write']))
+        self.assertEqual(m.get_policy('p', 'p'), [
+            ['alice', 'data1', 'read'], ['cathy', 'data1', 'read'], ['bob', 'data2', 'write'],
+        ])
+        self.assertIs(m.get_policy_index('p', 'p', 1), index)
+        self.assertEqual(index, {'data1': [0, 1], 'data2': [2]})
+
+        self.assertTrue(m.remove_policy('p', 'p', ['alice', 'data1', 'read']))
+        self.assertEqual(m.get_policy('p', 'p'), [['cathy', 'data1', 'read'], ['bob', 'data2', 'write']])
+        self.assertIs(m.get_policy_index('p', 'p', 1), index)
+        self.assertEqual(index, {'data1': [0], 'data2': [1]})
+
+    def test_remove_policy_keeps_ip_index(self):
+        m = Model()
+        m.load_model(get_examples("ipmatch_model.conf"))
+
+        m.add_policies('p', 'p', [
+            ['10.0.0.0/8', 'data1', 'read'], ['192.168.2.0/24', 'data1', 'read'], ['10.0.0.0/8', 'data2', 'read'],
+        ])
+        ip = ipaddress.ip_address('10.1.2.3')
+        self.assertEqual(m.get_policy_ip_positions('p', 'p', 0, ip), [0, 2])
+
+        self.assertTrue(m.remove_policy('p', 'p', ['192.168.2.0/24', 'data1', 'read']))
+        self.assertEqual(m.get_policy_ip_positions('p', 'p', 0, ip), [0, 1])
+        self.assertTrue(m.remove_policy('p', 'p', ['10.0.0.0/8', 'data1', 'read']))
+        self.assertEqual(m.get_policy_ip_positions('p', 'p', 0, ip), [0])
+        self.assertEqual(m.get_policy_ip_positions('p', 'p', 0, ipaddress.ip_address('192.168.2.1')), [])
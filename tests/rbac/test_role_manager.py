@@ -1,6 +1,6 @@
 from unittest import TestCase
 from casbin.rbac import default_role_manager
-from casbin.util import regex_match_func
+from casbin.util import regex_match_func, key_match, key_match2
 import time
 from concurrent.futures import ThreadPoolExecutor
 
@@ -147,6 +147,56 @@ class TestDefaultRoleManager(TestCase):
         self.assertFalse(rm.has_link("u4", "g2"))
         self.assertFalse(rm.has_link("u4", "g3"))
 
+    def test_max_hierarchy_level(self):
+        rm = default_role_manager.RoleManager(max_hierarchy_level=2)
+        rm.add_link("u1", "g1")
+        rm.add_link("g1", "g2")
+        rm.add_link("g2", "g3")
+        rm.add_link("g3", "g4")
+
+        self.assertTrue(rm.has_link("u1", "g3"))
+        self.assertFalse(rm.has_link("u1", "g4"))
+        self.assertTrue(rm.has_link("g1", "g4"))
+
+        rm.add_link("u1", "g2")
+        self.assertTrue(rm.has_link("u1", "g4"))
+
+        rm.delete_link("g3", "g4")
+        self.assertFalse(rm.has_link("u1", "g4"))
+        self.assertFalse(rm.has_link("g1", "g4"))
+
+    def test_duplicate_and_reverse_links(self):
+        rm = get_role_manager()
+        rm.add_link("u1", "g1")
+        rm.add_link("u1", "g1")
+        rm.add_link("u2", "g1")
+
+        self.assertEqual(rm.get_roles("u1"), ["g1"])
+        self.assertEqual(sorted(rm.get_users("g1")), ["u1", "u2"])
+
+        rm.delete_link("u1", "g1")
+        self.assertEqual(rm.get_roles("u1"), [])
+        self.assertEqual(rm.get_users("g1"), ["u2"])
+        self.assertEqual(rm.get_users("u3"), [])
+
+    def test_get_all_roles_of(self):
+        rm = get_role_manager()
+        rm.add_link("u1", "g1")
+        rm.add_link("g1", "g2")
+        rm.add_link("u2", "g2", "domain1")
+        rm.add_link("g2", "g3", "domain1")
+
+        self.assertEqual(rm.get_all_roles_of("u1"), {"g1", "g2"})
+        self.assertEqual(rm.get_all_roles_of("u2", "domain1"), {"g2", "g3"})
+        self.assertEqual(rm.get_all_roles_of("u2"), set())
+        # the names that aren't roles aren't remembered
+        self.assertNotIn("u2", rm.ancestors)
+
+        rm.add_matching_func(regex_match_func)
+        rm.add_link(r"u\d+", "g4")
+        self.assertEqual(rm.get_all_roles_of("u1"), {"g1", "g2", r"u\d+", "g4"})
+        self.assertEqual(rm.get_all_roles_of("u3"), {"g4"})
+
     def test_matching_func(self):
         rm = get_role_manager()
         rm.add_matching_func(regex_match_func)
@@ -168,6 +218,34 @@ class TestDefaultRoleManager(TestCase):
         self.assertTrue(rm.has_link("u3", "g2"))
         self.assertTrue(rm.has_link("u3", "g3"))
 
+    def test_matching_func_with_literal_names(self):
+        rm = get_role_manager()
+        rm.add_matching_func(key_match2)
+
+        rm.add_link("/book/1", "book_owner")
+        rm.add_link("/book/:id", "book_group")
+        rm.add_link("/pen/1", "/pen/:id")
+        rm.add_link("/book.1", "dot_group")
+
+        self.assertTrue(rm.has_link("/book/1", "book_group"))
+        self.assertTrue(rm.has_link("/book/2", "book_group"))
+        self.assertFalse(rm.has_link("/book/2", "book_owner"))
+        self.assertFalse(rm.has_link("/pen/2", "book_group"))
+        self.assertTrue(rm.has_link("/pen/2", "/pen/:id"))
+        # keyMatch2 turns the name into a regex, where a dot matches any character
+        self.assertTrue(rm.has_link("/book/1", "dot_group"))
+        self.assertEqual(sorted(rm.get_roles("/book/1")), ["/book.1", "/book/:id", "book_owner"])
+
+        # a pattern added later also applies to the names already matched
+        rm.add_link("/:type/1", "first_group")
+        self.assertTrue(rm.has_link("/book/1", "first_group"))
+        self.assertTrue(rm.has_link("/pen/1", "first_group"))
+        self.assertFalse(rm.has_link("/book/2", "first_group"))
+
+        rm.add_matching_func(None)
+        self.assertFalse(rm.has_link("/book/2", "book_group"))
+        self.assertTrue(rm.has_link("/book/1", "book_owner"))
+
     def test_one_to_many(self):
         rm = get_role_manager()
         rm.add_matching_func(regex_match_func)
@@ -231,4 +309,114 @@ class TestDefaultRoleManager(TestCase):
         futures = [executor.submit(test_has_link, "u"+str(i)) for i in range(10)]
         for future in futures:
             self.assertTrue(future.result())
-    
\ No newline at end of file
+
+
+class TestDomainManager(TestCase):
+
+    def test_domain_role(self):
+        rm = default_role_manager.DomainManager(10)
+        rm.add_link("u1", "g1", "domain1")
+        rm.add_link("u2", "g1", "domain1")
+        rm.add_link("u3", "admin", "domain2")
+        rm.add_link("u4", "admin", "domain2")
+        rm.add_link("u4", "admin", "domain1")
+        rm.add_link("g1", "admin", "domain1")
+
+        self.assertTrue(rm.has_link("u1", "admin", "domain1"))
+        self.assertFalse(rm.has_link("u1", "admin", "domain2"))
+        self.assertFalse(rm.has_link("u3", "admin", "domain1"))
+        self.assertTrue(rm.has_link("u4", "admin", "domain2"))
+        self.assertFalse(rm.has_link("u1", "g1", "domain3"))
+        self.assertFalse(rm.has_link("u1", "g1"))
+
+        self.assertCountEqual(rm.get_roles("u4", "domain1"), ["admin"])
+        self.assertCountEqual(rm.get_users("admin", "domain1"), ["u4", "g1"])
+        self.assertCountEqual(rm.get_users("admin", "domain2"), ["u3", "u4"])
+        self.assertEqual(rm.get_users("admin", "domain3"), [])
+        self.assertCountEqual(rm.get_domains(), ["domain1", "domain2"])
+
+        rm.delete_link("g1", "admin", "domain1")
+        self.assertFalse(rm.has_link("u1", "admin", "domain1"))
+        self.assertRaises(RuntimeError, rm.delete_link, "u1", "g1", "domain3")
+
+    def test_domain_matching_func(self):
+        rm = default_role_manager.DomainManager(10)
+        rm.add_domain_matching_func(key_match)
+        rm.add_link("alice", "admin", "*")
+        rm.add_link("bob", "admin", "domain1")
+        rm.add_link("carol", "user", "domain2")
+        rm.add_link("admin", "root", "domain*")
+
+        self.assertTrue(rm.has_link("alice", "admin", "domain1"))
+        self.assertTrue(rm.has_link("alice", "admin", "domain2"))
+        self.assertTrue(rm.has_link("alice", "admin", "other"))
+        self.assertTrue(rm.has_link("alice", "root", "domain3"))
+        self.assertFalse(rm.has_link("alice", "root", "other"))
+        self.assertTrue(rm.has_link("bob", "root", "domain1"))
+        self.assertFalse(rm.has_link("bob", "admin", "domain2"))
+        self.assertFalse(rm.has_link("carol", "admin", "domain2"))
+        self.assertCountEqual(rm.get_users("admin", "domain1"), ["alice", "bob"])
+        self.assertCountEqual(rm.get_roles("alice", "domain4"), ["admin"])
+        # looking up a domain doesn't keep a graph for it
+        self.assertNotIn("domain4", rm.get_domains())
+
+    def test_delete_link_in_pattern_domain(self):
+        rm = default_role_manager.DomainManager(10)
+        rm.add_domain_matching_func(key_match)
+        rm.add_link("alice", "admin", "*")
+        rm.add_link("alice", "admin", "domain1")
+        rm.add_link("bob", "admin", "*")
+        self.assertTrue(rm.has_link("bob", "admin", "domain2"))
+        self.assertIs(rm._get_role_manager("domain2"), rm._get_role_manager("domain2"))
+
+        rm.delete_link("alice", "admin", "*")
+        rm.delete_link("bob", "admin", "*")
+        # the link of the domain itself is kept
+        self.assertTrue(rm.has_link("alice", "admin", "domain1"))
+        self.assertFalse(rm.has_link("alice", "admin", "domain2"))
+        self.assertFalse(rm.has_link("bob", "admin", "domain2"))
+        self.assertEqual(rm.get_all_roles_of("bob", "domain2"), set())
+
+        rm.delete_link("alice", "admin", "domain1")
+        self.assertFalse(rm.has_link("alice", "admin", "domain1"))
+
+    def test_add_domain_matching_func_after_links(self):
+        rm = default_role_manager.DomainManager(10)
+        rm.add_link("alice", "admin", "*")
+        rm.add_link("bob", "admin", "domain1")
+        self.assertFalse(rm.has_link("alice", "admin", "domain1"))
+
+        rm.add_domain_matching_func(key_match)
+        self.assertTrue(rm.has_link("alice", "admin", "domain1"))
+        self.assertTrue(rm.has_link("bob", "admin", "domain1"))
+
+    def test_matching_func(self):
+        rm = default_role_manager.DomainManager(10)
+        rm.add_link(r"u\d+", "g1", "domain1")
+        rm.add_matching_func(regex_match_func)
+        rm.add_link("u1", r"g\d+", "domain2")
+
+        self.assertTrue(rm.has_link("u1", "g1", "domain1"))
+        self.assertTrue(rm.has_link("u2", "g1", "domain1"))
+        self.assertFalse(rm.has_link("u2", "g1", "domain2"))
+        self.assertTrue(rm.has_link("u1", "g2", "domain2"))
+
+    def test_copy(self):
+        rm = default_role_manager.DomainManager(10)
+        rm.add_domain_matching_func(key_match)
+        rm.add_link("alice", "admin", "*")
+        rm.add_link("bob", "admin", "domain1")
+
+        copied = rm.copy()
+        copied.add_link("carol", "admin", "*")
+        self.assertTrue(copied.has_link("bob", "admin", "domain1"))
+        self.assertTrue(copied.has_link("carol", "admin", "domain1"))
+        self.assertFalse(rm.has_link("carol", "admin", "domain1"))
+
+        restored = default_role_manager.DomainManager(10)
+        restored.add_domain_matching_func(key_match)
+        restored.set_role_graph(*rm.get_role_graph())
+        restored.add_link("carol", "admin", "*")
+        self.assertTrue(restored.has_link("alice", "admin", "domain2"))
+        self.assertTrue(restored.has_link("bob", "admin", "domain1"))
+        self.assertTrue(restored.has_link("carol", "admin", "domain1"))
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+
+import casbin
+from tests.test_enforcer import get_examples
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class RecordingAdapter(casbin.persist.AsyncBatchAdapter):
+
+    def __init__(self, calls, result=None):
+        self.calls = calls
+        self.result = result
+
+    async def load_policy(self, model):
+        casbin.persist.load_policy_line("p, admin, data1, read", model)
+        casbin.persist.load_policy_line("g, bob, admin", model)
+
+    async def add_policy(self, sec, ptype, rule):
+        await asyncio.sleep(0)
+        self.calls.append(("add_policy", ptype, rule))
+        return self.result
+
+    async def add_policies(self, sec, ptype, rules):
+        self.calls.append(("add_policies", ptype, rules))
+        return self.result
+
+    async def remove_policy(self, sec, ptype, rule):
+        self.calls.append(("remove_policy", ptype, rule))
+        return self.result
+
+    async def remove_filtered_policy(self, sec, ptype, field_index, *field_values):
+        self.calls.append(("remove_filtered_policy", ptype, field_index) + field_values)
+        return self.result
+
+
+class SlowAdapter(casbin.persist.AsyncAdapter):
+
+    def __init__(self):
+        self.rules = [['alice', 'data1', 'read']]
+        self.loads = 0
+
+    async def load_policy(self, model):
+        self.loads += 1
+        rules = list(self.rules)
+        await asyncio.sleep(0.01)
+        for rule in rules:
+            model.add_policy('p', 'p', rule)
+
+    async def add_policy(self, sec, ptype, rule):
+        await asyncio.sleep(0)
+        self.rules.append(rule)
+
+
+class RecordingWatcher(casbin.persist.AsyncWatcher):
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def update(self):
+        self.calls.append(("update",))
+
+
+class TestAsyncEnforcer(TestCase):
+
+    def get_enforcer(self, model=None, adapter=None):
+        return casbin.AsyncEnforcer(
+            model,
+            adapter,
+        )
+
+    def test_enforce_after_load_policy(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        self.assertFalse(e.enforce('alice', 'data2', 'read'))
+
+        run(e.load_policy())
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+        self.assertEqual(e.get_roles_for_user('alice'), ['data2_admin'])
+        self.assertFalse(run(e.is_policy_changed()))
+
+    def test_save_changes(self):
+        calls = []
+        e = self.get_enforcer(get_examples("rbac_model.conf"), RecordingAdapter(calls))
+        e.set_watcher(RecordingWatcher(calls))
+        run(e.load_policy())
+        self.assertTrue(e.enforce('bob', 'data1', 'read'))
+
+        async def change():
+            self.assertTrue(await e.add_policy('admin', 'data2', 'write'))
+            self.assertTrue(await e.add_policies([['admin', 'data3', 'read']]))
+            self.assertTrue(await e.delete_user('bob'))
+            self.assertFalse(await e.remove_policy('admin', 'data4', 'read'))
+
+        run(change())
+        self.assertEqual(calls, [
+            ("add_policy", "p", ['admin', 'data2', 'write']),
+            ("update",),
+            ("add_policies", "p", [['admin', 'data3', 'read']]),
+            ("update",),
+            ("remove_filtered_policy", "g", 0, 'bob'),
+            ("update",),
+        ])
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+        self.assertTrue(e.enforce('admin', 'data3', 'read'))
+
+    def test_save_changes_concurrently(self):
+        calls = []
+        e = self.get_enforcer(get_examples("basic_model.conf"), RecordingAdapter(calls))
+
+        async def change():
+            await e.load_policy()
+            await asyncio.gather(*[e.add_policy('user' + str(i), 'data1', 'read') for i in range(10)])
+
+        run(change())
+        self.assertEqual(calls, [("add_policy", "p", ['user' + str(i), 'data1', 'read']) for i in range(10)])
+
+    def test_change_while_loading(self):
+        adapter = SlowAdapter()
+        e = self.get_enforcer(get_examples("basic_model.conf"), adapter)
+
+        async def change():
+            await asyncio.sleep(0)
+            self.assertTrue(await e.add_policy('bob', 'data2', 'write'))
+
+        async def load_and_change():
+            await asyncio.gather(e.load_policy(), change())
+
+        run(load_and_change())
+        # loaded again once the change was saved
+        self.assertEqual(adapter.loads, 2)
+        self.assertEqual(e.get_policy(), [['alice', 'data1', 'read'], ['bob', 'data2', 'write']])
+
+    def test_failed_save(self):
+        calls = []
+        e = self.get_enforcer(get_examples("basic_model.conf"), RecordingAdapter(calls, result=False))
+        e.set_watcher(RecordingWatcher(calls))
+        run(e.load_policy())
+
+        self.assertFalse(run(e.add_policy('bob', 'data1', 'read')))
+        self.assertEqual(calls, [("add_policy", "p", ['bob', 'data1', 'read'])])
+
+        e.enable_auto_save(False)
+        self.assertTrue(run(e.add_policy('bob', 'data2', 'read')))
+        self.assertEqual(len(calls), 1)
+
+    def test_save_policy(self):
+        with tempfile.TemporaryDirectory() as path:
+            policy_path = os.path.join(path, "policy.csv")
+            with open(get_examples("basic_policy.csv")) as src, open(policy_path, "w") as dst:
+                dst.write(src.read())
+
+            e = self.get_enforcer(get_examples("basic_model.conf"), policy_path)
+            run(e.load_policy())
+            self.assertFalse(run(e.is_policy_changed()))
+
+            self.assertTrue(run(e.add_policy('bob', 'data1', 'read')))
+            run(e.save_policy())
+            self.assertTrue(run(e.is_policy_changed()))
+
+            e2 = casbin.Enforcer(get_examples("basic_model.conf"), policy_path)
+            self.assertTrue(e2.enforce('bob', 'data1', 'read'))
+            self.assertEqual(e2.get_policy(), e.get_policy())
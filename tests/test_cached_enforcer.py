@@ -0,0 +1,83 @@
+import time
+
+import casbin
+from casbin.model.policy_op import PolicyOp
+from tests.test_enforcer import get_examples, TestConfig
+
+
+class TestCachedEnforcer(TestConfig):
+
+    def get_enforcer(self, model=None, adapter=None, **kwargs):
+        return casbin.CachedEnforcer(
+            model,
+            adapter,
+            **kwargs
+        )
+
+    def test_cache_hits(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"))
+
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertFalse(e.enforce('alice', 'data2', 'read'))
+        self.assertEqual(e.cache_hits, 1)
+        self.assertEqual(e.cache_misses, 2)
+
+        e.enable_cache(False)
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertEqual(e.cache_hits, 1)
+
+    def test_cache_invalidation(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        e.enable_auto_save(False)
+
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+        e.add_policy('bob', 'data1', 'read')
+        self.assertTrue(e.enforce('bob', 'data1', 'read'))
+        e.remove_policy('bob', 'data1', 'read')
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+        e.add_role_for_user('bob', 'data2_admin')
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+        e.load_policy()
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+
+        e.build_incremental_role_links(PolicyOp.Policy_add, 'g', [['bob', 'data2_admin']])
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+
+    def test_copy(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
+
+        e2 = e.copy(with_policy=False)
+        self.assertEqual(e2.get_policy(), [])
+        self.assertFalse(e2.enforce('alice', 'data2', 'read'))
+        e2.load_policy()
+        self.assertTrue(e2.enforce('alice', 'data2', 'read'))
+        self.assertEqual(e2.cache_hits, 0)
+
+    def test_cache_eviction(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"), cache_size=2)
+
+        e.enforce('alice', 'data1', 'read')
+        e.enforce('alice', 'data1', 'write')
+        e.enforce('alice', 'data1', 'read')
+        e.enforce('alice', 'data2', 'read')
+        self.assertEqual(e.cache_misses, 3)
+
+        # ('alice', 'data1', 'write') was the least recently used result
+        e.enforce('alice', 'data1', 'read')
+        e.enforce('alice', 'data1', 'write')
+        self.assertEqual(e.cache_hits, 2)
+        self.assertEqual(e.cache_misses, 4)
+
+    def test_cache_expiry(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"), expire_time=0.01)
+
+        e.enforce('alice', 'data1', 'read')
+        e.enforce('alice', 'data1', 'read')
+        time.sleep(0.02)
+        e.enforce('alice', 'data1', 'read')
+        self.assertEqual(e.cache_hits, 1)
+        self.assertEqual(e.cache_misses, 2)
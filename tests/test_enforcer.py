@@ -1,8 +1,12 @@
+import json
 import os
+import pickle
+import tempfile
 import time
 from unittest import TestCase
 
 import casbin
+from casbin.rbac import default_role_manager
 
 
 def get_examples(path):
@@ -17,6 +21,23 @@ class TestSub():
         self.age = age
 
 
+class CountingRoleManager(default_role_manager.RoleManager):
+
+    def __init__(self, max_hierarchy_level):
+        super().__init__(max_hierarchy_level)
+        self.lookups = []
+
+    def get_all_roles_of(self, name, *domain):
+        self.lookups.append(name)
+        return super().get_all_roles_of(name, *domain)
+
+    def copy(self):
+        rm = CountingRoleManager(self.max_hierarchy_level)
+        rm.set_role_graph(*self.get_role_graph())
+        rm.lookups = self.lookups
+        return rm
+
+
 class TestCaseBase(TestCase):
     def get_enforcer(self, model=None, adapter=None):
         return casbin.Enforcer(
@@ -48,6 +69,78 @@ class TestConfig(TestCaseBase):
         self.assertTupleEqual(e.enforce_ex('bob', 'data2', 'write'), (True, ['bob', 'data2', 'write']))
         self.assertTupleEqual(e.enforce_ex('bob', 'data1', 'write'), (False, []))
 
+    def test_enforce_with_formatted_policy_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            policy_path = os.path.join(path, "policy.csv")
+            with open(policy_path, "w") as file:
+                file.write('# comment, "with quotes\n\np ,alice,  "data1, data2" , read\n  p, bob, data2, write  \n')
+
+            e = self.get_enforcer(get_examples("basic_model.conf"), policy_path)
+            self.assertEqual(e.get_policy(), [['alice', 'data1, data2', 'read'], ['bob', 'data2', 'write']])
+            self.assertTrue(e.enforce('alice', 'data1, data2', 'read'))
+            self.assertTrue(e.enforce('bob', 'data2', 'write'))
+
+            # the values are read back the same after saving the policy
+            e.add_policy('cathy', 'say "hi"', 'read')
+            e.save_policy()
+            e = self.get_enforcer(get_examples("basic_model.conf"), policy_path)
+            self.assertEqual(e.get_policy(), [
+                ['alice', 'data1, data2', 'read'], ['bob', 'data2', 'write'], ['cathy', 'say "hi"', 'read'],
+            ])
+
+    def test_enforce_after_load_snapshot(self):
+        e = self.get_enforcer(get_examples("rbac_with_domains_model.conf"),
+                              get_examples("rbac_with_domains_policy.csv"))
+        self.assertTrue(e.enforce('alice', 'domain1', 'data1', 'read'))
+
+        with tempfile.TemporaryDirectory() as path:
+            snapshot_path = os.path.join(path, "policy.snapshot")
+            e.save_snapshot(snapshot_path)
+
+            e = self.get_enforcer(get_examples("rbac_with_domains_model.conf"), get_examples("empty_policy.csv"))
+            self.assertFalse(e.enforce('alice', 'domain1', 'data1', 'read'))
+            e.load_snapshot(snapshot_path)
+
+            e2 = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("empty_policy.csv"))
+            self.assertRaises(RuntimeError, e2.load_snapshot, snapshot_path)
+            self.assertRaises(RuntimeError, e2.load_snapshot, get_examples("rbac_policy.csv"))
+
+            # the payload is plain data, anything else is rejected
+            with open(snapshot_path, "rb") as file:
+                header = file.read(10)
+                snapshot = json.loads(file.read().decode("utf-8"))
+            snapshot["policy"]["p"]["p"]["policy"].append([1, 2, 3, 4])
+            with open(snapshot_path, "wb") as file:
+                file.write(header + json.dumps(snapshot).encode("utf-8"))
+            self.assertRaises(RuntimeError, e.load_snapshot, snapshot_path)
+            with open(snapshot_path, "wb") as file:
+                file.write(header + pickle.dumps(snapshot))
+            self.assertRaises(RuntimeError, e.load_snapshot, snapshot_path)
+
+        self.assertEqual(e.get_policy(), [
+            ['admin', 'domain1', 'data1', 'read'],
+            ['admin', 'domain1', 'data1', 'write'],
+            ['admin', 'domain2', 'data2', 'read'],
+            ['admin', 'domain2', 'data2', 'write'],
+        ])
+        self.assertEqual(e.get_roles_for_user_in_domain('alice', 'domain1'), ['admin'])
+        self.assertTrue(e.enforce('alice', 'domain1', 'data1', 'read'))
+        self.assertFalse(e.enforce('alice', 'domain2', 'data2', 'read'))
+        self.assertTrue(e.enforce('bob', 'domain2', 'data2', 'write'))
+
+        e.add_policy('alice', 'domain2', 'data2', 'read')
+        self.assertTrue(e.enforce('alice', 'domain2', 'data2', 'read'))
+
+    def test_enforce_batch(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        requests = [('alice', 'data1', 'read'), ('bob', 'data1', 'read'), ('bob', 'data2', 'write'),
+                    ('alice', 'data2', 'read'), ('alice', 'data2', 'write'), ('bogus', 'data2', 'write')]
+
+        self.assertEqual(e.enforce_batch(requests), [True, False, True, True, True, False])
+        self.assertEqual(e.enforce_ex_batch(requests), [e.enforce_ex(*request) for request in requests])
+        self.assertEqual(e.enforce_batch([]), [])
+        self.assertRaises(RuntimeError, e.enforce_batch, [('alice', 'data1')])
+
     def test_model_set_load(self):
         e = self.get_enforcer(
             get_examples("basic_model.conf"),
@@ -116,6 +209,18 @@ class TestConfig(TestCaseBase):
         self.assertTrue(e.enforce('alice', '/alice_data/resource', 'GET'))
         self.assertTrue(e.enforce('alice', '/alice_data2/123/using/456', 'GET'))
 
+    def test_enforce_key_match_custom(self):
+        e = self.get_enforcer(get_examples("keymatch_custom_model.conf"),
+                              get_examples("keymatch_policy.csv"))
+
+        e.add_function("keyMatchCustom", lambda key1, key2: key1 == key2)
+        self.assertFalse(e.enforce('alice', '/alice_data/resource1', 'GET'))
+        self.assertTrue(e.enforce('alice', '/alice_data/resource1', 'POST'))
+
+        # replacing the function drops the cached matcher
+        e.add_function("keyMatchCustom", casbin.util.key_match_func)
+        self.assertTrue(e.enforce('alice', '/alice_data/resource1', 'GET'))
+
     def test_enforce_priority(self):
         e = self.get_enforcer(get_examples("priority_model.conf"), get_examples("priority_policy.csv"))
         self.assertTrue(e.enforce('alice', 'data1', 'read'))
@@ -132,6 +237,36 @@ class TestConfig(TestCaseBase):
         e = self.get_enforcer(get_examples("priority_model.conf"), get_examples("priority_indeterminate_policy.csv"))
         self.assertFalse(e.enforce('alice', 'data1', 'read'))
 
+    def test_enforce_priority_explicit(self):
+        e = self.get_enforcer(get_examples("priority_model_explicit.conf"), get_examples("priority_policy_explicit.csv"))
+        self.assertEqual(e.get_policy()[0], ['1', 'alice', 'data1', 'write', 'allow'])
+        self.assertTrue(e.enforce('alice', 'data1', 'write'))
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+        self.assertTrue(e.enforce('bob', 'data2', 'write'))
+        self.assertEqual(e.enforce_ex('bob', 'data2', 'write'), (True, ['10', 'data2_allow_group', 'data2', 'write', 'allow']))
+
+        # added rules are evaluated in the order of their priority
+        e.add_policy('5', 'bob', 'data2', 'write', 'deny')
+        self.assertFalse(e.enforce('bob', 'data2', 'write'))
+        e.add_policies([['15', 'alice', 'data1', 'read', 'deny'], ['0', 'alice', 'data1', 'write', 'deny']])
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertFalse(e.enforce('alice', 'data1', 'write'))
+
+    def test_enforce_with_set_based_effector(self):
+        class SetBasedAllowOverrideEffector(casbin.Effector):
+            def intermediate_effect(self, effects):
+                return casbin.Effector.INDETERMINATE
+
+            def final_effect(self, effects):
+                return casbin.Effector.ALLOW if casbin.Effector.ALLOW in effects else casbin.Effector.DENY
+
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        e.set_effector(SetBasedAllowOverrideEffector())
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+        self.assertEqual(e.enforce_ex('alice', 'data2', 'read'), (True, []))
+
     def test_enforce_rbac(self):
         e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
         self.assertTrue(e.enforce('alice', 'data1', 'read'))
@@ -141,6 +276,71 @@ class TestConfig(TestCaseBase):
         self.assertTrue(e.enforce('alice', 'data2', 'write'))
         self.assertFalse(e.enforce('bogus', 'data2', 'write'))  # test non-existant subject
 
+    def test_enforce_without_policy_index(self):
+        e = self.get_enforcer(get_examples("rbac_with_domains_model.conf"),
+                              get_examples("rbac_with_domains_policy.csv"))
+        requests = [(sub, dom, obj, act) for sub in ('alice', 'bob', 'admin') for dom in ('domain1', 'domain2')
+                    for obj in ('data1', 'data2') for act in ('read', 'write')]
+
+        indexed = [e.enforce_ex(*request) for request in requests]
+        e.enable_policy_index(False)
+        self.assertEqual([e.enforce_ex(*request) for request in requests], indexed)
+
+    def test_enforce_ex_with_policy_index(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        self.assertTupleEqual(e.enforce_ex('alice', 'data2', 'write'), (True, ['data2_admin', 'data2', 'write']))
+
+        e.enable_auto_save(False)
+        e.add_policy('alice', 'data3', 'read')
+        e.update_policy(['bob', 'data2', 'write'], ['bob', 'data3', 'write'])
+        self.assertTupleEqual(e.enforce_ex('bob', 'data3', 'write'), (True, ['bob', 'data3', 'write']))
+        self.assertTupleEqual(e.enforce_ex('alice', 'data3', 'read'), (True, ['alice', 'data3', 'read']))
+        self.assertFalse(e.enforce('bob', 'data2', 'write'))
+
+        e.remove_policy('alice', 'data1', 'read')
+        self.assertTupleEqual(e.enforce_ex('alice', 'data3', 'read'), (True, ['alice', 'data3', 'read']))
+        self.assertFalse(e.enforce('alice', 'data1', 'read'))
+
+    def test_enforce_ip_match_with_policy_index(self):
+        e = self.get_enforcer(get_examples("ipmatch_model.conf"), get_examples("ipmatch_policy.csv"))
+        e.enable_auto_save(False)
+        e.add_policies([['192.168.0.0/16', 'data1', 'read'], ['10.0.1.2', 'data2', 'write'], ['::1', 'data3', 'read']])
+        e.update_policy(['192.168.2.0/24', 'data1', 'read'], ['192.168.3.0/24', 'data1', 'read'])
+
+        self.assertTupleEqual(e.enforce_ex('192.168.3.1', 'data1', 'read'), (True, ['192.168.3.0/24', 'data1', 'read']))
+        self.assertTupleEqual(e.enforce_ex('192.168.2.1', 'data1', 'read'), (True, ['192.168.0.0/16', 'data1', 'read']))
+        self.assertTupleEqual(e.enforce_ex('10.0.1.2', 'data2', 'write'), (True, ['10.0.0.0/16', 'data2', 'write']))
+        self.assertFalse(e.enforce('10.1.1.2', 'data2', 'write'))
+        self.assertTrue(e.enforce('::1', 'data3', 'read'))
+        self.assertFalse(e.enforce('127.0.0.1', 'data3', 'read'))
+        self.assertRaises(ValueError, e.enforce, 'localhost', 'data1', 'read')
+        # as without the index, ipMatch raises for the first rule
+        self.assertRaises(ValueError, e.enforce, 'localhost', 'data4', 'read')
+
+    def test_enforce_invalid_policy_size_with_policy_index(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"))
+        self.assertFalse(e.enforce('alice', 'data2', 'read'))
+
+        # a rule left out by the index still raises when the scan would reach it
+        e.get_model().add_policy('p', 'p', ['cathy', 'data3'])
+        self.assertRaises(RuntimeError, e.enforce, 'alice', 'data1', 'write')
+
+        e.get_model().remove_policy('p', 'p', ['cathy', 'data3'])
+        self.assertFalse(e.enforce('alice', 'data2', 'write'))
+
+        e.get_model().update_policy('p', 'p', ['bob', 'data2', 'write'], ['bob', 'data2'])
+        self.assertRaises(RuntimeError, e.enforce, 'alice', 'data3', 'write')
+
+    def test_enforce_rbac_after_role_change(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+
+        e.add_role_for_user('bob', 'data2_admin')
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+
+        e.load_policy()
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+
     def test_enforce_rbac__empty_policy(self):
         e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("empty_policy.csv"))
         self.assertFalse(e.enforce('alice', 'data1', 'read'))
@@ -169,6 +369,38 @@ class TestConfig(TestCaseBase):
         self.assertTrue(e.enforce('bob', 'domain2', 'data2', 'read'))
         self.assertTrue(e.enforce('bob', 'domain2', 'data2', 'write'))
 
+    def test_enforce_rbac_with_domain_pattern(self):
+        e = self.get_enforcer(get_examples("rbac_with_domains_model.conf"),
+                              get_examples("rbac_with_domains_policy.csv"))
+        e.add_named_domain_matching_func("g", casbin.util.key_match)
+        e.add_grouping_policy("carol", "admin", "domain*")
+
+        self.assertTrue(e.enforce('carol', 'domain1', 'data1', 'read'))
+        self.assertTrue(e.enforce('carol', 'domain2', 'data2', 'write'))
+        self.assertFalse(e.enforce('alice', 'domain2', 'data2', 'read'))
+        self.assertEqual(e.get_roles_for_user_in_domain('carol', 'domain3'), ['admin'])
+        self.assertCountEqual(e.get_users_for_role_in_domain('admin', 'domain1'), ['alice', 'carol'])
+
+        e.remove_grouping_policy("carol", "admin", "domain*")
+        self.assertFalse(e.enforce('carol', 'domain1', 'data1', 'read'))
+        self.assertTrue(e.enforce('alice', 'domain1', 'data1', 'read'))
+
+    def test_enforce_rbac_with_roles_lookup(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        rm = CountingRoleManager(10)
+        e.set_role_manager(rm)
+        e.build_role_links()
+
+        e.add_policy('data3_admin', 'data2', 'delete')
+        e.add_policy('data4_admin', 'data2', 'delete')
+        self.assertFalse(e.enforce('alice', 'data2', 'delete'))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
+        # the roles of the subject are looked up once for all the rules of a request
+        self.assertEqual(rm.lookups, ['alice', 'alice'])
+
+        e.delete_role_for_user('alice', 'data2_admin')
+        self.assertFalse(e.enforce('alice', 'data2', 'read'))
+
     def test_enforce_rbac_with_not_deny(self):
         e = self.get_enforcer(get_examples("rbac_with_not_deny_model.conf"), get_examples("rbac_with_deny_policy.csv"))
         self.assertFalse(e.enforce('alice', 'data2', 'write'))
@@ -242,6 +474,28 @@ class TestConfig(TestCaseBase):
         self.assertFalse(e.enforce(sub3, "/data1", "write"))
         self.assertFalse(e.enforce(sub3, "/data2", "write"))
 
+    def test_abac_with_changed_sub_rules(self):
+        e = self.get_enforcer(get_examples("abac_rule_model.conf"),
+                              get_examples("abac_rule_policy.csv"))
+        e.enable_auto_save(False)
+
+        sub1 = TestSub("alice", 16)
+        sub2 = TestSub("bob", 20)
+        self.assertFalse(e.enforce(sub1, "/data1", "read"))
+        self.assertTrue(e.enforce(sub2, "/data1", "read"))
+
+        e.remove_policy("r.sub.age > 18", "/data1", "read")
+        e.add_policy("r.sub.age > 10 && r.sub.age < 18", "/data1", "read")
+        self.assertTrue(e.enforce(sub1, "/data1", "read"))
+        self.assertFalse(e.enforce(sub2, "/data1", "read"))
+
+        e.add_policies([["r.sub.age == " + str(age), "/data3", "read"] for age in range(10, 20)])
+        self.assertTrue(e.enforce(sub1, "/data3", "read"))
+        e.remove_filtered_policy(1, "/data3")
+        self.assertTrue(e.enforce(sub1, "/data1", "read"))
+        self.assertFalse(e.enforce(sub1, "/data3", "read"))
+        self.assertTrue(e.enforce(sub1, "/data2", "write"))
+
     def test_abac_with_multiple_sub_rules(self):
         e = self.get_enforcer(get_examples("abac_multiple_rules_model.conf"),
                               get_examples("abac_multiple_rules_policy.csv"))
@@ -292,3 +546,89 @@ class TestConfigSynced(TestConfig):
         # thread needs a moment to exit
         time.sleep(10 / 1000)
         self.assertFalse(e.is_auto_loading_running())
+
+    def test_reload_policy(self):
+        with tempfile.TemporaryDirectory() as path:
+            policy_path = os.path.join(path, "policy.csv")
+            with open(get_examples("basic_policy.csv")) as src, open(policy_path, "w") as dst:
+                dst.write(src.read())
+
+            e = self.get_enforcer(get_examples("basic_model.conf"), policy_path)
+            self.assertFalse(e.reload_policy())
+            self.assertFalse(e.enforce('bob', 'data1', 'read'))
+
+            with open(policy_path, "a") as file:
+                file.write("\np, bob, data1, read\n")
+
+            self.assertTrue(e.reload_policy())
+            self.assertTrue(e.enforce('bob', 'data1', 'read'))
+            self.assertFalse(e.reload_policy())
+
+            # the policy changed in memory is replaced by the stored one
+            e.enable_auto_save(False)
+            e.remove_policy('bob', 'data1', 'read')
+            self.assertFalse(e.enforce('bob', 'data1', 'read'))
+            self.assertTrue(e.reload_policy())
+            self.assertTrue(e.enforce('bob', 'data1', 'read'))
+
+    def test_reload_policy_with_concurrent_write(self):
+        class WritingAdapter(casbin.persist.Adapter):
+            enforcer = None
+
+            def load_policy(self, model):
+                casbin.persist.load_policy_line("p, alice, data1, read", model)
+                if self.enforcer is not None:
+                    enforcer, self.enforcer = self.enforcer, None
+                    enforcer.add_policy('bob', 'data1', 'read')
+
+        adapter = WritingAdapter()
+        e = self.get_enforcer(get_examples("basic_model.conf"), adapter)
+        e.enable_auto_save(False)
+        adapter.enforcer = e
+
+        # the write made while loading isn't dropped by replacing the enforcer
+        self.assertFalse(e.reload_policy())
+        self.assertTrue(e.enforce('bob', 'data1', 'read'))
+        self.assertTrue(e.reload_policy())
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+
+
+class TestConfigCopyOnWrite(TestConfigSynced):
+
+    def get_enforcer(self, model=None, adapter=None):
+        e = casbin.SyncedEnforcer(
+            model,
+            adapter,
+        )
+        e.enable_copy_on_write()
+        return e
+
+    def test_copy_on_write(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        e.enable_auto_save(False)
+        model = e.get_model()
+
+        e.add_role_for_user('bob', 'data2_admin')
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+        self.assertIsNot(e.get_model(), model)
+        # the replaced model is left unchanged for the readers still using it
+        self.assertFalse(model.has_policy('g', 'g', ['bob', 'data2_admin']))
+
+        class FailingWatcher:
+            def update(self):
+                raise RuntimeError("update failed")
+
+        # a change that fails is dropped as a whole
+        e.set_watcher(FailingWatcher())
+        e.enable_auto_save(True)
+        model = e.get_model()
+        self.assertRaises(RuntimeError, e.add_policy, 'bob', 'data1', 'read')
+        self.assertIs(e.get_model(), model)
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+
+        # the role links are rebuilt in a copy as well
+        rm = e.get_role_manager()
+        e.build_role_links()
+        self.assertIsNot(e.get_role_manager(), rm)
+        self.assertTrue(rm.has_link('alice', 'data2_admin'))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
@@ -145,4 +145,15 @@ class TestManagementApiSynced(TestManagementApi):
         return casbin.SyncedEnforcer(
             model,
             adapter,
-        )
\ No newline at end of file
+        )
+
+
+class TestManagementApiCopyOnWrite(TestManagementApi):
+
+    def get_enforcer(self, model=None, adapter=None):
+        e = casbin.SyncedEnforcer(
+            model,
+            adapter,
+        )
+        e.enable_copy_on_write()
+        return e
@@ -0,0 +1,79 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import casbin
+from tests.test_enforcer import get_examples
+
+
+def is_owner(name1, name2):
+    return name1 + "_owner" == name2
+
+
+class TestProcessPoolEnforcer(TestCase):
+
+    def get_enforcer(self, model=None, adapter=None):
+        e = casbin.ProcessPoolEnforcer(
+            model,
+            adapter,
+            processes=2,
+        )
+        self.addCleanup(e.close)
+        return e
+
+    def test_enforce(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
+        self.assertFalse(e.enforce('bob', 'data1', 'read'))
+        self.assertEqual(e.enforce_ex('alice', 'data1', 'read'), (True, ['alice', 'data1', 'read']))
+
+        requests = [('alice', 'data1', 'read'), ('alice', 'data2', 'write'), ('bob', 'data1', 'read'),
+                    ('bob', 'data2', 'write'), ('carol', 'data2', 'read')]
+        self.assertEqual(e.enforce_batch(requests), [True, True, False, True, False])
+        self.assertEqual(e.enforce_batch(requests[:1]), [True])
+        self.assertEqual(e.enforce_batch([]), [])
+        self.assertEqual(e.enforce_ex_batch(requests[1:3]), [(True, ['data2_admin', 'data2', 'write']), (False, [])])
+
+    def test_policy_changes(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        e.enable_auto_save(False)
+
+        self.assertTrue(e.add_policy('bob', 'data1', 'read'))
+        self.assertFalse(e.add_policy('bob', 'data1', 'read'))
+        self.assertTrue(e.add_role_for_user('carol', 'data2_admin'))
+        self.assertTrue(e.delete_role_for_user('alice', 'data2_admin'))
+        self.assertEqual(e.enforce_batch([('bob', 'data1', 'read')] * 2), [True, True])
+        self.assertEqual(e.enforce_batch([('carol', 'data2', 'read')] * 2), [True, True])
+        self.assertEqual(e.enforce_batch([('alice', 'data2', 'read')] * 2), [False, False])
+        self.assertEqual(e.get_policy()[-1], ['bob', 'data1', 'read'])
+
+        e.load_policy()
+        self.assertEqual(e.enforce_batch([('bob', 'data1', 'read')] * 2), [False, False])
+        self.assertEqual(e.enforce_batch([('alice', 'data2', 'read')] * 2), [True, True])
+
+        e.enable_enforce(False)
+        self.assertEqual(e.enforce_batch([('alice', 'data1', 'read')] * 2), [False, False])
+
+    def test_add_function(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"))
+        e.add_function("isOwner", is_owner)
+        self.assertEqual(e.enforce_batch([('alice', 'data1', 'read')] * 2), [True, True])
+
+    def test_error(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"))
+        self.assertRaises(RuntimeError, e.enforce, 'alice', 'data1')
+        self.assertTrue(e.enforce('alice', 'data1', 'read'))
+
+    def test_load_snapshot(self):
+        e = self.get_enforcer(get_examples("basic_model.conf"), get_examples("basic_policy.csv"))
+        with tempfile.TemporaryDirectory() as path:
+            snapshot_path = os.path.join(path, "policy.snapshot")
+            e.enable_auto_save(False)
+            e.add_policy('bob', 'data1', 'read')
+            e.save_snapshot(snapshot_path)
+
+            e.remove_policy('bob', 'data1', 'read')
+            self.assertFalse(e.enforce('bob', 'data1', 'read'))
+            e.load_snapshot(snapshot_path)
+            self.assertEqual(e.enforce_batch([('bob', 'data1', 'read')] * 2), [True, True])
@@ -57,6 +57,62 @@ class TestRbacApi(TestCaseBase):
         self.assertFalse(e.enforce('bob', 'data2', 'read'))
         self.assertTrue(e.enforce('bob', 'data2', 'write'))
 
+    def test_role_links_after_grouping_changes(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        self.assertTrue(e.add_grouping_policy('bob', 'data2_admin'))
+        self.assertFalse(e.add_grouping_policy('bob', 'data2_admin'))
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+        self.assertFalse(e.add_grouping_policies([['cathy', 'data2_admin'], ['bob', 'data2_admin']]))
+        self.assertFalse(e.enforce('cathy', 'data2', 'read'))
+
+        self.assertTrue(e.remove_grouping_policy('alice', 'data2_admin'))
+        self.assertFalse(e.enforce('alice', 'data2', 'read'))
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+
+        self.assertTrue(e.remove_filtered_grouping_policy(1, 'data2_admin'))
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+
+        e = self.get_enforcer(get_examples("rbac_with_pattern_model.conf"),
+                              get_examples("rbac_with_pattern_policy.csv"))
+        e.add_named_matching_func('g2', casbin.util.key_match2)
+        self.assertTrue(e.enforce('alice', '/book/1', 'GET'))
+
+        self.assertTrue(e.remove_named_grouping_policy('g2', '/book/:id', 'book_group'))
+        self.assertFalse(e.enforce('alice', '/book/1', 'GET'))
+        self.assertTrue(e.add_named_grouping_policy('g2', '/book/:id', 'book_group'))
+        self.assertTrue(e.enforce('alice', '/book/1', 'GET'))
+
+    def test_remove_grouping_policy_without_role_links(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        e.enable_auto_build_role_links(False)
+        self.assertTrue(e.add_grouping_policy('bob', 'data2_admin'))
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+
+        e.enable_auto_build_role_links(True)
+        self.assertTrue(e.remove_grouping_policy('bob', 'data2_admin'))
+        self.assertFalse(e.enforce('bob', 'data2', 'read'))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
+
+        e.set_role_manager(casbin.rbac.default_role_manager.RoleManager(10))
+        self.assertTrue(e.remove_grouping_policy('alice', 'data2_admin'))
+        self.assertFalse(e.enforce('alice', 'data2', 'read'))
+
+    def test_add_grouping_policy_without_role_links(self):
+        e = self.get_enforcer(get_examples("rbac_model.conf"), get_examples("rbac_policy.csv"))
+        e.enable_auto_build_role_links(False)
+        e.load_policy()
+        e.enable_auto_build_role_links(True)
+        self.assertTrue(e.add_role_for_user('bob', 'data2_admin'))
+        self.assertTrue(e.enforce('bob', 'data2', 'read'))
+        self.assertTrue(e.enforce('alice', 'data2', 'read'))
+
+        e.enable_auto_build_role_links(False)
+        self.assertTrue(e.add_role_for_user('cathy', 'data2_admin'))
+        e.enable_auto_build_role_links(True)
+        self.assertTrue(e.add_role_for_user('dave', 'data2_admin'))
+        self.assertTrue(e.enforce('cathy', 'data2', 'read'))
+        self.assertTrue(e.enforce('dave', 'data2', 'read'))
+
     def test_delete_permission(self):
         e = self.get_enforcer(get_examples("basic_without_resources_model.conf"),
                          get_examples("basic_without_resources_policy.csv"))
@@ -214,10 +270,33 @@ class TestRbacApi(TestCaseBase):
         self.assertEqual(["alice"], e.get_implicit_users_for_permission("data2", "read"))
         self.assertEqual(["alice", "bob"], e.get_implicit_users_for_permission("data2", "write"))
 
+        # users only having roles are found as well
+        e.add_role_for_user("carol", "data2_admin")
+        self.assertEqual(["alice", "bob", "carol"], e.get_implicit_users_for_permission("data2", "write"))
+        self.assertEqual([], e.get_implicit_users_for_permission("data3", "read"))
+
+    def test_implicit_user_api_with_deny(self):
+        e = self.get_enforcer(get_examples("rbac_with_deny_model.conf"), get_examples("rbac_with_deny_policy.csv"))
+        e.add_role_for_user("carol", "data2_admin")
+
+        self.assertEqual(["alice", "carol"], e.get_implicit_users_for_permission("data2", "read"))
+        self.assertEqual(["bob", "carol"], e.get_implicit_users_for_permission("data2", "write"))
+
 class TestRbacApiSynced(TestRbacApi):
 
     def get_enforcer(self, model=None, adapter=None):
         return casbin.SyncedEnforcer(
             model,
             adapter,
-        )
\ No newline at end of file
+        )
+
+
+class TestRbacApiCopyOnWrite(TestRbacApi):
+
+    def get_enforcer(self, model=None, adapter=None):
+        e = casbin.SyncedEnforcer(
+            model,
+            adapter,
+        )
+        e.enable_copy_on_write()
+        return e
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+import simpleeval
+
+from casbin import util
+from casbin.util import CompiledExpression
+
+
+class TestCompiledExpression(TestCase):
+
+    def test_compile(self):
+        e = CompiledExpression("r_sub == p_sub and keyMatch(r_obj, p_obj)", {"keyMatch": util.key_match},
+                               ["r_sub", "r_obj", "p_sub", "p_obj"])
+        self.assertIsNotNone(e.code)
+        self.assertTrue(e.func("alice", "/data/1", "alice", "/data/*"))
+        self.assertFalse(e.func("bob", "/data/1", "alice", "/data/*"))
+
+    def test_attribute(self):
+        e = CompiledExpression("r_obj.Owner == r_sub", {}, ["r_sub", "r_obj"])
+        self.assertIsNotNone(e.code)
+        self.assertTrue(e.func("alice", {"Owner": "alice"}))
+        self.assertRaises(simpleeval.AttributeDoesNotExist, e.func, "alice", {})
+
+    def test_operators(self):
+        e = CompiledExpression("r_age + 1 > 18 and not r_name in ('bob',)", {}, ["r_age", "r_name"])
+        self.assertIsNone(e.code)  # tuples are not supported by SimpleEval either
+        self.assertRaises(simpleeval.FeatureNotAvailable, e.func, 20, "alice")
+
+        e = CompiledExpression("r_age + 1 > 18 and not r_name == 'bob'", {}, ["r_age", "r_name"])
+        self.assertIsNotNone(e.code)
+        self.assertTrue(e.func(20, "alice"))
+        self.assertFalse(e.func(20, "bob"))
+        self.assertFalse(e.func(10, "alice"))
+        self.assertRaises(simpleeval.NumberTooHigh, CompiledExpression("r_a ** r_b", {}, ["r_a", "r_b"]).func,
+                          10, 10 ** 8)
+
+    def test_unsafe_expression(self):
+        e = CompiledExpression("r_sub.__class__", {}, ["r_sub"])
+        self.assertIsNone(e.code)
+        self.assertRaises(simpleeval.FeatureNotAvailable, e.func, "alice")
+
+        e = CompiledExpression("undefined(r_sub)", {}, ["r_sub"])
+        self.assertIsNone(e.code)
+        self.assertRaises(simpleeval.FunctionNotDefined, e.func, "alice")
+
+        e = CompiledExpression("r_sub == p_sub", {}, ["r_sub"])
+        self.assertIsNone(e.code)
+        self.assertRaises(simpleeval.NameNotDefined, e.func, "alice")
+
+    def test_bind(self):
+        e = CompiledExpression("g(r_sub, p_sub)", {"g": lambda a, b: a == b}, ["r_sub", "p_sub"])
+        f = e.bind({"g": lambda a, b: a != b})
+        self.assertTrue(e.func("alice", "alice"))
+        self.assertFalse(f("alice", "alice"))
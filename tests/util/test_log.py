@@ -0,0 +1,82 @@
+import logging
+from unittest import TestCase
+
+from casbin.util.log import DecisionLogger
+
+
+class TestDecisionLogger(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("casbin.test_decision_logger")
+
+    def test_log_decision(self):
+        decision_logger = DecisionLogger(self.logger)
+        with self.assertLogs(self.logger, logging.INFO) as cm:
+            decision_logger.log_decision(("alice", "data1", "read"), True)
+            decision_logger.log_decision(("bob", "data1", "read"), False)
+
+        self.assertEqual(cm.output, [
+            "INFO:casbin.test_decision_logger:Request: alice, data1, read ---> True",
+            "ERROR:casbin.test_decision_logger:Request: bob, data1, read ---> False",
+        ])
+
+        with self.assertLogs(self.logger, logging.ERROR) as cm:
+            decision_logger.log_decision(("alice", "data1", "read"), True)
+            decision_logger.log_decision(("bob", "data1", "read"), False)
+
+        self.assertEqual(len(cm.output), 1)
+        self.assertEqual(decision_logger.dropped, 0)
+
+    def test_sample_rate(self):
+        decision_logger = DecisionLogger(self.logger)
+        decision_logger.set_sample_rate(0)
+        with self.assertLogs(self.logger, logging.INFO) as cm:
+            self.logger.info("start")
+            for _ in range(10):
+                decision_logger.log_decision(("alice", "data1", "read"), True)
+
+        self.assertEqual(len(cm.output), 1)
+        self.assertEqual(decision_logger.dropped, 10)
+        self.assertRaises(ValueError, decision_logger.set_sample_rate, 2)
+
+    def test_rate_limit(self):
+        decision_logger = DecisionLogger(self.logger)
+        decision_logger.set_rate_limit(5)
+        with self.assertLogs(self.logger, logging.INFO) as cm:
+            for _ in range(10):
+                decision_logger.log_decision(("alice", "data1", "read"), True)
+
+        self.assertEqual(len(cm.output), 5)
+        self.assertEqual(decision_logger.dropped, 5)
+
+    def test_queue(self):
+        decision_logger = DecisionLogger(self.logger)
+        with self.assertLogs(self.logger, logging.INFO) as cm:
+            decision_logger.start_queue()
+            decision_logger.log_decision(("alice", "data1", "read"), True)
+            decision_logger.log_decision(("bob", "data1", "read"), False)
+            decision_logger.stop_queue()
+
+        self.assertEqual(cm.output, [
+            "INFO:casbin.test_decision_logger:Request: alice, data1, read ---> True",
+            "ERROR:casbin.test_decision_logger:Request: bob, data1, read ---> False",
+        ])
+
+    def test_queue_record(self):
+        decision_logger = DecisionLogger(self.logger)
+        self.logger.addFilter(lambda record: record.args[0] != "bob, data1, read")
+        try:
+            with self.assertLogs(self.logger, logging.INFO) as cm:
+                decision_logger.start_queue()
+                decision_logger.log_decision(("alice", "data1", "read"), True)
+                decision_logger.log_decision(("bob", "data1", "read"), False)
+                decision_logger.stop_queue()
+        finally:
+            self.logger.filters.clear()
+
+        self.assertEqual(len(cm.records), 1)
+        record = cm.records[0]
+        # the record is formatted by the handlers of the logger rather than when it is queued
+        self.assertEqual(record.args, ("alice, data1, read", True))
+        self.assertEqual(record.funcName, "log_decision")
+        self.assertNotEqual(record.lineno, 0)
@@ -1,3 +1,4 @@
+import gc
 from unittest import TestCase
 from casbin import util
 
@@ -44,3 +45,17 @@ class TestUtil(TestCase):
         self.assertEqual(util.get_eval_value("eval(a) && eval(b) && a && b && c"), ["a", "b"])
         self.assertEqual(util.get_eval_value("a && eval(a) && eval(b) && b && c"), ["a", "b"])
         self.assertEqual(util.get_eval_value("eval(p.sub_rule) || p.obj == r.obj && eval(p.domain_rule)"), ["p.sub_rule", "p.domain_rule"])
+
+    def test_gc_paused(self):
+        self.assertTrue(gc.isenabled())
+        with util.gc_paused():
+            self.assertFalse(gc.isenabled())
+        self.assertTrue(gc.isenabled())
+
+        gc.disable()
+        try:
+            with util.gc_paused():
+                pass
+            self.assertFalse(gc.isenabled())
+        finally:
+            gc.enable()